@@ -0,0 +1,100 @@
+import hmac
+from typing import Annotated
+
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy import select
+
+from config import ADMIN_TOKEN, AUTH_CACHE_TTL, AUTH_CACHE_NEGATIVE_TTL, AUTH_CACHE_SIZE
+from database.cache import AsyncTTLCache
+from database.db import ReadRouter, get_read_router
+from database.models import User
+from database.tracing import traced
+
+# Кэш пользователей по API-ключу; неизвестные ключи кэшируются как негативные записи
+auth_cache = AsyncTTLCache(
+    ttl=AUTH_CACHE_TTL,
+    negative_ttl=AUTH_CACHE_NEGATIVE_TTL,
+    maxsize=AUTH_CACHE_SIZE,
+    name="auth",
+)
+
+
+class CurrentUser:
+    """
+    Аутентифицированный пользователь запроса.
+
+    Аргументы:
+        user_id (int): Идентификатор пользователя.
+        name (str): Имя пользователя.
+    """
+
+    __slots__ = ("user_id", "name")
+
+    def __init__(self, user_id: int, name: str):
+        self.user_id = user_id
+        self.name = name
+
+
+@traced("auth.load_user")
+async def _load_user(api_key: str, router: ReadRouter) -> CurrentUser | None:
+    """
+    Загружает пользователя по API-ключу в отдельной короткой сессии чтения.
+    """
+    session_factory = await router.session_factory()
+    async with session_factory() as session:
+        row = (
+            await session.execute(
+                select(User.user_id, User.name).where(User.api_key == api_key)
+            )
+        ).first()
+    return CurrentUser(row.user_id, row.name) if row else None
+
+
+async def get_current_user(
+    router: Annotated[ReadRouter, Depends(get_read_router)],
+    api_key: Annotated[str | None, Header()] = None,
+) -> CurrentUser:
+    """
+    Зависимость FastAPI: определяет пользователя по заголовку api-key.
+
+    Объявляется в обработчике раньше сессии базы данных, поэтому запросы
+    без ключа или с неизвестным ключом отклоняются до обращения к пулу,
+    а повторные запросы с тем же ключом обслуживаются из кэша.
+
+    Аргументы:
+        router (ReadRouter): Маршрутизатор чтения; сессия открывается только при промахе кэша.
+        api_key (str | None): API-ключ пользователя.
+
+    Возвращает:
+        CurrentUser: Пользователь, которому принадлежит ключ.
+
+    Исключения:
+        HTTPException: Ключ не передан или не найден (401).
+    """
+    if not api_key:
+        raise HTTPException(status_code=401, detail="API key is missing")
+
+    user = await auth_cache.get_or_load(api_key, lambda: _load_user(api_key, router))
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    return user
+
+
+async def require_admin_token(
+    x_admin_token: Annotated[str | None, Header()] = None,
+):
+    """
+    Зависимость FastAPI для служебных эндпоинтов: проверяет заголовок
+    X-Admin-Token. Доступ не зависит от того, проксирует ли nginx путь:
+    порт приложения может быть доступен напрямую.
+
+    Аргументы:
+        x_admin_token (str | None): Токен администратора.
+
+    Исключения:
+        HTTPException: ADMIN_TOKEN не задан (404) или токен неверный (403).
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
@@ -1,10 +1,23 @@
+import asyncio
+import mimetypes
 import os
 from typing import Annotated
 from uuid import uuid4
 
-from fastapi import Header, Depends, UploadFile, File, HTTPException, Path, APIRouter, Request
+import aiofiles.os
+from fastapi import Header, Depends, UploadFile, File, HTTPException, Path, APIRouter, Request, Query
+from fastapi.responses import PlainTextResponse, RedirectResponse, Response
 from loguru import logger
-import sys
+
+from config import (
+    MEDIA_ACCEL_REDIRECT,
+    MEDIA_ACCEL_PREFIX,
+    UPLOAD_MAX_SIZE,
+    UPLOAD_CHUNK_MAX_SIZE,
+    PROFILE_MAX_SECONDS,
+    TOKEN,
+    YADISK_UPLOAD,
+)
 from app.models_pydentic import (
     TweetRequest,
     MediaResponse,
@@ -12,17 +25,63 @@ from app.models_pydentic import (
     LikeResponse,
     FollowerResponse,
     UserResponse,
+    UploadCreateRequest,
+    UploadResponse,
 )
-from database.db import AsyncSession, get_db
-from database.func import UserDAL, TweetDAL, MediaDAL, LikeDAL, FollowerDAL
+from app.auth import CurrentUser, get_current_user, require_admin_token
+from app.logs import setup_logging
+from app.loopmonitor import loop_monitor
+from app.memprofile import memory_profiler
+from app.metrics import UPLOAD_BYTES, registry
+from app.middleware import TracedRoute
+from app.profiler import profiler
+from app.shards import get_author_db, get_tweet_db, get_media_db
+from app.responses import ranged_file_response
+from database.db import AsyncSession, get_db, get_read_db, engine, pool_status, get_last_write
+from database.migrations import LATEST_VERSION, get_schema_version
+from database.func import TweetDAL, MediaDAL, LikeDAL, FollowerDAL, UploadDAL
+from database.reads import ReadDAL
+from database.shards import ShardRouter, get_shard_router
+from database.slowlog import slow_query_log
+from database.storage import media_storage
+from database.yadisc import YadiskDAL
+
+
+user_router = APIRouter(route_class=TracedRoute)
+image_router = APIRouter(route_class=TracedRoute)
+# Служебные эндпоинты: только с токеном администратора, даже если nginx их не проксирует
+internal_router = APIRouter(
+    prefix="/internal",
+    route_class=TracedRoute,
+    dependencies=[Depends(require_admin_token)],
+)
+# Проверка готовности для оркестратора доступна без токена
+health_router = APIRouter(prefix="/internal", route_class=TracedRoute)
+metrics_router = APIRouter()
+
+setup_logging()
 
+yadisk_dal = YadiskDAL(token=TOKEN)
+
+
+async def publish_to_yadisk(file_path: str, user_id: int) -> str | None:
+    """
+    Копирует сохраненный медиафайл на Яндекс.Диск, если включен YADISK_UPLOAD.
 
-user_router = APIRouter()
-image_router = APIRouter()
+    Аргументы:
+        file_path (str): Абсолютный путь к файлу в хранилище.
+        user_id (int): Идентификатор пользователя, загрузившего файл.
 
-logger.remove()  # Удалите все существующие обработчики
-logger.add(sys.stdout, level="INFO", format="{time} {level} {message}", backtrace=True, diagnose=True)
-logger.add("app.log", rotation="500 MB", level="INFO", format="{time} {level} {message}", backtrace=True, diagnose=True)
+    Возвращает:
+        str | None: Публичный ключ ресурса или None, если копирование выключено.
+    """
+    if not YADISK_UPLOAD:
+        return None
+    await yadisk_dal.create_folder_on_yadisk(str(user_id))
+    _, _, public_key = await yadisk_dal.upload_file_to_yadisk(
+        file_path, str(user_id), os.path.basename(file_path)
+    )
+    return public_key
 
 
 @image_router.post(
@@ -31,70 +90,315 @@ logger.add("app.log", rotation="500 MB", level="INFO", format="{time} {level} {m
     response_model_exclude_unset=True,
 )
 async def upload_media(
-        api_key: Annotated[str | None, Header()],
+        user: Annotated[CurrentUser, Depends(get_current_user)],
         file: UploadFile = File(...),
-        session: AsyncSession = Depends(get_db),
+        session: AsyncSession = Depends(get_author_db),
 ) -> MediaResponse:
     """
     Эндпоинт для загрузки медиафайла.
 
     Аргументы:
-        api_key (str): API-ключ пользователя.
+        user (CurrentUser): Аутентифицированный пользователь.
         file (UploadFile): Загружаемый файл.
         session (AsyncSession): Асинхронная сессия для работы с базой данных.
 
     Возвращает:
         MediaResponse: Ответ с идентификатором медиа и URL файла.
     """
-    logger.info("Received upload_media request", extra={"api_key": api_key, "filename": file.filename})
-    if not api_key:
-        raise HTTPException(status_code=401, detail="API key is missing")
+    logger.info("Received upload_media request", extra={"user_id": user.user_id, "filename": file.filename})
 
-    user_dal = UserDAL(session)
     media_dal = MediaDAL(session)
 
-    user = await user_dal.get_user_by_api_key(api_key)
-    if user is None:
-        logger.error("Invalid API key")
-        raise HTTPException(status_code=401, detail="Invalid API key")
-
     logger.info("User fetched", extra={"user_id": user.user_id})
 
     try:
+        # Сохранение файла в шардированный каталог хранилища
+        relative_path, file_path = await media_storage.save_upload(file)
 
-        # Директория для сохранения файлов
-        UPLOAD_DIRECTORY = "/api/pictures"
+        # Тип, размер и длительность определяются один раз при загрузке
+        media_info = await media_storage.probe(file_path, file.content_type)
+        UPLOAD_BYTES.inc("media", amount=media_info["size_bytes"] or 0)
+        public_key = await publish_to_yadisk(file_path, user.user_id)
 
-        # Убедимся, что директория существует
-        if not os.path.exists(UPLOAD_DIRECTORY):
-            os.makedirs(UPLOAD_DIRECTORY)
+        # Сохранение записи о медиа в базе данных
+        new_media = await media_dal.create_media_record(
+            media_storage.url_for(relative_path),
+            file_path,
+            public_key=public_key,
+            user_id=user.user_id,
+            **media_info,
+        )
+        # Файл доступен только через эндпоинт с проверкой доступа
+        file_url = media_storage.media_url(new_media.media_id)
+        await media_dal.set_media_url(new_media, file_url)
+        logger.info("Media uploaded and record created", extra={"media_id": new_media.media_id})
 
-        # Создание уникального имени файла
-        file_extension = file.filename.split('.')[-1]
-        unique_filename = f"{uuid4()}.{file_extension}"
+        return MediaResponse(result=True, media_id=new_media.media_id, url=file_url)
 
-        # Путь для сохранения файла
-        file_path = os.path.join(UPLOAD_DIRECTORY, unique_filename)
+    except HTTPException as e:
+        logger.error(f"HTTP Exception: {e.detail}")
+        raise e
 
-        # Сохранение файла на сервере
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
+    except Exception as e:
+        logger.exception("Internal server error")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-        # Генерация URL для доступа к файлу
 
-        server_ip = "localhost"
-        server_port = "81"
-        file_url = f"http://{server_ip}:{server_port}/pictures/{unique_filename}"
-        logger.info(f"Generated file URL: {file_url}")
+@image_router.get("/api/medias/{media_id}")
+async def get_media(
+    media_id: int,
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    range_header: Annotated[str | None, Header(alias="Range")] = None,
+    session: AsyncSession = Depends(get_media_db),
+) -> Response:
+    """
+    Эндпоинт для получения медиафайла с проверкой доступа.
 
-        # Сохранение записи о медиа в базе данных
-        new_media = await media_dal.create_media_record(file_url, file_path)
-        logger.info("Media uploaded and record created", extra={"media_id": new_media.media_id})
+    Права проверяются в приложении, а передачу файла при включенном
+    MEDIA_ACCEL_REDIRECT выполняет nginx через заголовок X-Accel-Redirect
+    (включая обработку Range). Без nginx приложение само отдает
+    запрошенный диапазон байт, чтобы видеоплеер мог перематывать запись.
 
-        return MediaResponse(result=True, media_id=new_media.media_id, url=file_url)
+    Аргументы:
+        media_id (int): ID медиафайла.
+        user (CurrentUser): Аутентифицированный пользователь.
+        range_header (str | None): Заголовок Range.
+        session (AsyncSession): Асинхронная сессия для работы с базой данных.
+
+    Возвращает:
+        Response: Файл или ответ с заголовком X-Accel-Redirect.
+    """
+
+    media_dal = MediaDAL(session)
+
+    media = await media_dal.get_media_by_id(media_id)
+
+    if media is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    # Медиафайл, еще не прикрепленный к твиту, доступен только загрузившему его
+    if media.tweet_id is None and media.user_id != user.user_id:
+        raise HTTPException(status_code=403, detail="Нет доступа к медиафайлу")
+
+    relative_path = media_storage.relative_path(media.media_path)
+
+    # Копия на Яндекс.Диске заменяет файл, которого нет на локальном диске;
+    # метаданные по публичному ключу берутся из кэша
+    if media.public_key and (
+        relative_path is None or not await aiofiles.os.path.exists(media.media_path)
+    ):
+        meta = await yadisk_dal.get_public_meta(media.public_key)
+        if meta.public_url:
+            return RedirectResponse(meta.public_url, status_code=307)
+
+    if relative_path is None:
+        raise HTTPException(status_code=404, detail="Media file not found")
+
+    media_type = (
+        media.content_type
+        or mimetypes.guess_type(media.media_path)[0]
+        or "application/octet-stream"
+    )
+
+    if MEDIA_ACCEL_REDIRECT:
+        return Response(
+            media_type=media_type,
+            headers={"X-Accel-Redirect": f"{MEDIA_ACCEL_PREFIX}{relative_path}"},
+        )
+
+    # Соединение с базой не удерживается на время передачи файла
+    await session.close()
+
+    return ranged_file_response(
+        media.media_path, media_type, range_header, media.size_bytes
+    )
+
+
+@image_router.post(
+    "/api/medias/uploads",
+    response_model=UploadResponse,
+)
+async def create_upload(
+    upload_request: UploadCreateRequest,
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    session: AsyncSession = Depends(get_author_db),
+) -> UploadResponse:
+    """
+    Эндпоинт для создания сессии возобновляемой загрузки медиафайла.
+
+    Аргументы:
+        upload_request (UploadCreateRequest): Имя и размер загружаемого файла.
+        user (CurrentUser): Аутентифицированный пользователь.
+        session (AsyncSession): Асинхронная сессия для работы с базой данных.
+
+    Возвращает:
+        UploadResponse: Идентификатор сессии загрузки и текущее смещение.
+    """
+
+    if not 0 < upload_request.size <= UPLOAD_MAX_SIZE:
+        raise HTTPException(status_code=413, detail="File is too large")
+
+    upload_dal = UploadDAL(session)
+
+    try:
+        upload_id = uuid4().hex
+        temp_path = await media_storage.create_upload_file(upload_id, upload_request.size)
+        await upload_dal.create_upload(
+            upload_id, user.user_id, upload_request.filename, upload_request.size, temp_path
+        )
+        logger.info("Upload session created", extra={"upload_id": upload_id})
+
+        return UploadResponse(
+            result=True, upload_id=upload_id, offset=0, size=upload_request.size
+        )
+
+    except HTTPException as e:
+        raise e
+
+    except Exception as e:
+        logger.exception("Internal server error")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@image_router.get(
+    "/api/medias/uploads/{upload_id}",
+    response_model=UploadResponse,
+)
+async def get_upload(
+    upload_id: str,
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    session: AsyncSession = Depends(get_author_db),
+) -> UploadResponse:
+    """
+    Эндпоинт для получения состояния загрузки (с какого смещения продолжать).
+
+    Аргументы:
+        upload_id (str): Идентификатор сессии загрузки.
+        user (CurrentUser): Аутентифицированный пользователь.
+        session (AsyncSession): Асинхронная сессия для работы с базой данных.
+
+    Возвращает:
+        UploadResponse: Текущее смещение загрузки.
+    """
+
+    upload = await UploadDAL(session).get_upload(upload_id, user.user_id)
+    await session.close()
+
+    return UploadResponse(
+        result=True, upload_id=upload.upload_id, offset=upload.offset, size=upload.total_size
+    )
+
+
+@image_router.patch(
+    "/api/medias/uploads/{upload_id}",
+    response_model=UploadResponse,
+)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    upload_offset: Annotated[int, Header()],
+    session: AsyncSession = Depends(get_author_db),
+) -> UploadResponse:
+    """
+    Эндпоинт для записи очередной части файла.
+
+    Тело запроса - байты части, заголовок Upload-Offset - смещение, с которого
+    она записывается. Смещение должно совпадать с текущим смещением загрузки.
+
+    Аргументы:
+        upload_id (str): Идентификатор сессии загрузки.
+        request (Request): Объект запроса (тело читается потоком).
+        user (CurrentUser): Аутентифицированный пользователь.
+        upload_offset (int): Смещение части.
+        session (AsyncSession): Асинхронная сессия для работы с базой данных.
+
+    Возвращает:
+        UploadResponse: Новое смещение загрузки.
+    """
+
+    upload_dal = UploadDAL(session)
+
+    upload = await upload_dal.get_upload(upload_id, user.user_id)
+
+    if upload_offset != upload.offset:
+        raise HTTPException(
+            status_code=409, detail=f"Offset mismatch, expected {upload.offset}"
+        )
+
+    # Соединение с базой не удерживается, пока часть читается из сети
+    await session.close()
+
+    limit = min(UPLOAD_CHUNK_MAX_SIZE, upload.total_size - upload.offset)
+    try:
+        written = await media_storage.write_chunk(
+            upload.temp_path, upload.offset, request.stream(), limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=413, detail="Chunk is too large")
+
+    new_offset = upload.offset + written
+    UPLOAD_BYTES.inc("chunk", amount=written)
+    if not await upload_dal.advance_offset(upload_id, upload.offset, new_offset):
+        raise HTTPException(status_code=409, detail="Concurrent upload to the same offset")
+
+    return UploadResponse(
+        result=True, upload_id=upload_id, offset=new_offset, size=upload.total_size
+    )
+
+
+@image_router.post(
+    "/api/medias/uploads/{upload_id}/complete",
+    response_model=MediaResponse,
+)
+async def complete_upload(
+    upload_id: str,
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    session: AsyncSession = Depends(get_author_db),
+) -> MediaResponse:
+    """
+    Эндпоинт для завершения загрузки и создания записи медиафайла.
+
+    Аргументы:
+        upload_id (str): Идентификатор сессии загрузки.
+        user (CurrentUser): Аутентифицированный пользователь.
+        session (AsyncSession): Асинхронная сессия для работы с базой данных.
+
+    Возвращает:
+        MediaResponse: Ответ с идентификатором медиа.
+    """
+
+    upload_dal = UploadDAL(session)
+    media_dal = MediaDAL(session)
+
+    upload = await upload_dal.get_upload(upload_id, user.user_id)
+
+    if upload.offset != upload.total_size:
+        raise HTTPException(
+            status_code=409, detail=f"Upload is incomplete, offset {upload.offset}"
+        )
+
+    try:
+        relative_path, file_path = await media_storage.finalize_upload(
+            upload.temp_path, upload.filename
+        )
+        media_info = await media_storage.probe(file_path)
+        public_key = await publish_to_yadisk(file_path, user.user_id)
+
+        new_media = await media_dal.create_media_record(
+            media_storage.url_for(relative_path),
+            file_path,
+            public_key=public_key,
+            user_id=user.user_id,
+            **media_info,
+        )
+        await media_dal.set_media_url(new_media, media_storage.media_url(new_media.media_id))
+        await upload_dal.delete_upload(upload_id)
+        logger.info("Upload completed", extra={"upload_id": upload_id, "media_id": new_media.media_id})
+
+        return MediaResponse(result=True, media_id=new_media.media_id)
 
     except HTTPException as e:
-        logger.error(f"HTTP Exception: {e.detail}")
         raise e
 
     except Exception as e:
@@ -108,8 +412,8 @@ async def upload_media(
 )
 async def create_tweet(
     tweet_request: TweetRequest,
-    api_key: Annotated[str | None, Header()],
-    session: AsyncSession = Depends(get_db),
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    session: AsyncSession = Depends(get_author_db),
 ) -> TweetResponse:
     """
     Эндпоинт для создания нового твита.
@@ -117,27 +421,30 @@ async def create_tweet(
     Аргументы:
         tweet_request (TweetRequest): Объект запроса на создание твита.
         request (Request): Объект запроса.
+        user (CurrentUser): Аутентифицированный пользователь.
         session (AsyncSession): Асинхронная сессия для работы с базой данных.
 
     Возвращает:
         TweetResponse: Результат операции создания твита и его идентификатор.
     """
 
-    if not api_key:
-        raise HTTPException(status_code=401, detail="API key is missing")
-
-    user_dal = UserDAL(session)
     tweet_dal = TweetDAL(session)
     media_dal = MediaDAL(session)
 
     try:
-        user = await user_dal.get_user_by_api_key(api_key)
         tweet_id = await tweet_dal.save_tweet_to_database(
             user.user_id, tweet_request.tweet_data
         )
 
         if tweet_request.tweet_media_ids:
-            await media_dal.update_media_ids(tweet_id, tweet_request.tweet_media_ids)
+            try:
+                await media_dal.update_media_ids(
+                    tweet_id, tweet_request.tweet_media_ids, user.user_id
+                )
+            except HTTPException:
+                # Твит без запрошенных вложений не сохраняется
+                await tweet_dal.delete_tweet(await tweet_dal.get_tweet_by_id(tweet_id))
+                raise
 
         return TweetResponse(result=True, tweet_id=tweet_id)
 
@@ -153,15 +460,16 @@ async def create_tweet(
     response_model=dict,
 )
 async def delete_tweet(
-    api_key: Annotated[str | None, Header()],
+    user: Annotated[CurrentUser, Depends(get_current_user)],
     tweet_id: int = Path(..., description="ID твита для удаления"),
-    session: AsyncSession = Depends(get_db),
+    session: AsyncSession = Depends(get_tweet_db),
 ) -> dict:
     """
     Эндпоинт для удаления твита.
 
     Аргументы:
         request (Request): Объект запроса.
+        user (CurrentUser): Аутентифицированный пользователь.
         tweet_id (int): ID твита для удаления.
         session (AsyncSession): Асинхронная сессия для работы с базой данных.
 
@@ -169,15 +477,10 @@ async def delete_tweet(
         dict: Результат операции.
     """
 
-    if not api_key:
-        raise HTTPException(status_code=401, detail="API key is missing")
-
-    user_dal = UserDAL(session)
     tweet_dal = TweetDAL(session)
     media_dal = MediaDAL(session)
 
     try:
-        user = await user_dal.get_user_by_api_key(api_key)
         tweet = await tweet_dal.get_tweet_by_id(tweet_id)
 
         if tweet.user_id != user.user_id:
@@ -185,9 +488,10 @@ async def delete_tweet(
                 status_code=403, detail="Вы не можете удалить чужой твит"
             )
 
-        media_urls = await media_dal.get_media_urls_by_tweet_id(tweet_id)
+        media_paths = await media_dal.get_media_urls_by_tweet_id(tweet_id)
 
-        await media_dal.delete_file(media_urls[0])
+        for media_path in media_paths:
+            await media_dal.delete_file(media_path)
 
         await tweet_dal.delete_tweet(tweet)
 
@@ -206,8 +510,8 @@ async def delete_tweet(
 )
 async def like_tweet(
     tweet_id: int,
-    api_key: Annotated[str | None, Header()],
-    session: AsyncSession = Depends(get_db),
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    session: AsyncSession = Depends(get_tweet_db),
 ) -> LikeResponse:
     """
     Эндпоинт для лайка твита.
@@ -215,21 +519,17 @@ async def like_tweet(
     Аргументы:
         tweet_id (int): ID твита для лайка.
         request (Request): Объект запроса.
+        user (CurrentUser): Аутентифицированный пользователь.
         session (AsyncSession): Асинхронная сессия для работы с базой данных.
 
     Возвращает:
         LikeResponse: Результат операции.
     """
 
-    if not api_key:
-        raise HTTPException(status_code=401, detail="API key is missing")
-
-    user_dal = UserDAL(session)
     tweet_dal = TweetDAL(session)
     like_dal = LikeDAL(session)
 
     try:
-        user = await user_dal.get_user_by_api_key(api_key)
         tweet = await tweet_dal.get_tweet_by_id(tweet_id)
 
         if tweet is None:
@@ -253,8 +553,8 @@ async def like_tweet(
 )
 async def unlike_tweet(
     tweet_id: int,
-    api_key: Annotated[str | None, Header()],
-    session: AsyncSession = Depends(get_db),
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    session: AsyncSession = Depends(get_tweet_db),
 ) -> LikeResponse:
     """
     Эндпоинт для удаления лайка с твита.
@@ -262,21 +562,17 @@ async def unlike_tweet(
     Аргументы:
         tweet_id (int): ID твита для удаления лайка.
         request (Request): Объект запроса.
+        user (CurrentUser): Аутентифицированный пользователь.
         session (AsyncSession): Асинхронная сессия для работы с базой данных.
 
     Возвращает:
         LikeResponse: Результат операции.
     """
 
-    if not api_key:
-        raise HTTPException(status_code=401, detail="API key is missing")
-
-    user_dal = UserDAL(session)
     tweet_dal = TweetDAL(session)
     like_dal = LikeDAL(session)
 
     try:
-        user = await user_dal.get_user_by_api_key(api_key)
         tweet = await tweet_dal.get_tweet_by_id(tweet_id)
 
         if tweet is None:
@@ -300,7 +596,7 @@ async def unlike_tweet(
 )
 async def follow_user(
     followee_id: int,
-    api_key: Annotated[str | None, Header()],
+    user: Annotated[CurrentUser, Depends(get_current_user)],
     session: AsyncSession = Depends(get_db),
 ) -> FollowerResponse:
     """
@@ -309,20 +605,16 @@ async def follow_user(
     Аргументы:
         followee_id (int): ID пользователя, на которого подписываются.
         request (Request): Объект запроса.
+        user (CurrentUser): Аутентифицированный пользователь.
         session (AsyncSession): Асинхронная сессия для работы с базой данных.
 
     Возвращает:
         FollowerResponse: Результат операции.
     """
 
-    if not api_key:
-        raise HTTPException(status_code=401, detail="API key is missing")
-
-    user_dal = UserDAL(session)
     follower_dal = FollowerDAL(session)
 
     try:
-        user = await user_dal.get_user_by_api_key(api_key)
         await follower_dal.create_follower(user.user_id, followee_id)
 
         return FollowerResponse(result=True)
@@ -343,7 +635,7 @@ async def follow_user(
 )
 async def unfollow_user(
     followee_id: int,
-    api_key: Annotated[str | None, Header()],
+    user: Annotated[CurrentUser, Depends(get_current_user)],
     session: AsyncSession = Depends(get_db),
 ) -> FollowerResponse:
     """
@@ -352,20 +644,16 @@ async def unfollow_user(
     Аргументы:
         followee_id (int): ID пользователя, с которого снимается подписка.
         request (Request): Объект запроса.
+        user (CurrentUser): Аутентифицированный пользователь.
         session (AsyncSession): Асинхронная сессия для работы с базой данных.
 
     Возвращает:
         FollowerResponse: Результат операции.
     """
 
-    if not api_key:
-        raise HTTPException(status_code=401, detail="API key is missing")
-
-    user_dal = UserDAL(session)
     follower_dal = FollowerDAL(session)
 
     try:
-        user = await user_dal.get_user_by_api_key(api_key)
         await follower_dal.delete_follower(user.user_id, followee_id)
 
         return FollowerResponse(result=True)
@@ -386,32 +674,28 @@ async def unfollow_user(
 )
 async def get_info_user(
     request: Request,
-    api_key: Annotated[str | None, Header()],
-    session: AsyncSession = Depends(get_db)
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    session: AsyncSession = Depends(get_read_db)
 ) -> UserResponse:
     """
     Эндпоинт для получения информации о текущем пользователе.
 
     Аргументы:
         request (Request): Объект запроса.
+        user (CurrentUser): Аутентифицированный пользователь.
         session (AsyncSession): Асинхронная сессия для работы с базой данных.
 
     Возвращает:
         UserResponse: Информация о пользователе.
     """
-    logger.info("Received get_info_user request", extra={"api_key": api_key, "headers": dict(request.headers), "client_ip": request.client.host})
-
-    print(api_key)
-    if not api_key:
-        logger.error("API key is missing")
-        raise HTTPException(status_code=401, detail="API key is missing")
+    logger.info("Received get_info_user request", extra={"user_id": user.user_id, "client_ip": request.client.host})
 
-    user_dal = UserDAL(session)
+    read_dal = ReadDAL(session)
 
     try:
-        user = await user_dal.get_user_by_api_key(api_key)
-        print(user.name)
-        response_data = await user_dal.get_user_info(user.user_id)
+        response_data = await read_dal.get_user_info(user.user_id)
+        # Соединение возвращается в пул до сериализации и отправки ответа
+        await session.close()
         logger.info("User info fetched", extra={"user_id": user.user_id})
 
         return UserResponse(**response_data)
@@ -431,8 +715,8 @@ async def get_info_user(
 )
 async def get_info_user(
     id: int,
-    api_key: Annotated[str | None, Header()],
-    session: AsyncSession = Depends(get_db),
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    session: AsyncSession = Depends(get_read_db),
 ) -> UserResponse:
     """
     Эндпоинт для получения информации о пользователе по его ID.
@@ -440,19 +724,20 @@ async def get_info_user(
     Аргументы:
         id (int): ID пользователя.
         request (Request): Объект запроса.
+        user (CurrentUser): Аутентифицированный пользователь.
         session (AsyncSession): Асинхронная сессия для работы с базой данных.
 
     Возвращает:
         UserResponse: Информация о пользователе.
     """
-    logger.info("Received get_info_user request", extra={"api_key": api_key})
-    if not api_key:
-        raise HTTPException(status_code=401, detail="API key is missing")
+    logger.info("Received get_info_user request", extra={"user_id": user.user_id})
 
-    user_dal = UserDAL(session)
+    read_dal = ReadDAL(session)
 
     try:
-        response_data = await user_dal.get_user_info(id)
+        response_data = await read_dal.get_user_info(id)
+        # Соединение возвращается в пул до сериализации и отправки ответа
+        await session.close()
 
         return UserResponse(**response_data)
 
@@ -468,33 +753,174 @@ async def get_info_user(
     response_model=dict,
 )
 async def get_tweets(
-    api_key: Annotated[str | None, Header()], session: AsyncSession = Depends(get_db)
+    request: Request,
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    shards: Annotated[ShardRouter, Depends(get_shard_router)],
 ) -> dict:
     """
     Эндпоинт для получения списка твитов.
 
+    Лента собирается со всех шардов параллельно и объединяется
+    в общем порядке: по убыванию количества лайков, затем по ID твита.
+
     Аргументы:
         request (Request): Объект запроса.
-        session (AsyncSession): Асинхронная сессия для работы с базой данных.
+        user (CurrentUser): Аутентифицированный пользователь.
+        shards (ShardRouter): Маршрутизатор шардов.
 
     Возвращает:
         dict: Список твитов.
     """
 
-    if not api_key:
-        raise HTTPException(status_code=401, detail="API key is missing")
-
-    tweet_dal = TweetDAL(session)
-    user_dal = UserDAL(session)
-
     try:
-        user = await user_dal.get_user_by_api_key(api_key)
-        tweets_list = await tweet_dal.get_feed_tweets(user.user_id)
+        parts = await shards.scatter(
+            lambda session: ReadDAL(session).get_feed_rows(), get_last_write(request)
+        )
+        feed = sorted(
+            (tweet for part in parts for tweet in part),
+            key=lambda tweet: (-tweet.likes_count, tweet.id),
+        )
 
-        return tweets_list
+        return {"result": True, "tweets": [tweet.to_dict() for tweet in feed]}
 
     except HTTPException as e:
         raise e
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@internal_router.get(
+    "/pool",
+    response_model=dict,
+)
+async def get_pool_status() -> dict:
+    """
+    Эндпоинт для получения состояния пула соединений с базой данных.
+
+    Возвращает:
+        dict: Занятые и свободные соединения, переполнение и время ожидания соединения.
+    """
+    return pool_status(engine)
+
+
+@internal_router.get(
+    "/slow-queries",
+    response_model=dict,
+)
+async def get_slow_queries() -> dict:
+    """
+    Эндпоинт журнала медленных SQL-запросов с параметрами и планами выполнения.
+
+    Возвращает:
+        dict: Порог в миллисекундах и записи журнала, начиная с последней.
+    """
+    return {
+        "result": True,
+        "threshold_ms": slow_query_log.threshold_ms,
+        "queries": slow_query_log.recent(),
+    }
+
+
+@internal_router.get(
+    "/loop",
+    response_model=dict,
+)
+async def get_loop_status() -> dict:
+    """
+    Эндпоинт состояния цикла событий воркера.
+
+    Возвращает:
+        dict: Последняя и максимальная задержка планирования и стеки обратных
+        вызовов, блокировавших цикл (в режиме LOOP_BLOCK_DEBUG).
+    """
+    return {"result": True, **loop_monitor.status()}
+
+
+@internal_router.get(
+    "/memory",
+    response_model=dict,
+)
+async def get_memory_status() -> dict:
+    """
+    Эндпоинт учета памяти воркера (при MEMORY_PROFILING=1), только для администратора.
+
+    Возвращает:
+        dict: Прирост и пик памяти по маршрутам, места выделения живой памяти
+        и последний отчет о росте памяти между снимками.
+    """
+    # Снимок памяти большого процесса снимается заметное время
+    status = await asyncio.to_thread(memory_profiler.status)
+    return {"result": True, **status}
+
+
+@internal_router.post(
+    "/profile",
+    response_model=dict,
+)
+async def profile_process(
+        seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+        x_profile: Annotated[str | None, Header()] = None,
+) -> dict:
+    """
+    Эндпоинт профилирования всего процесса: стеки всех потоков снимаются
+    заданное время и сохраняются в файл свернутых стеков в PROFILE_DIR.
+
+    Аргументы:
+        seconds (float): Длительность профилирования в секундах.
+        x_profile (str | None): Токен профилирования (PROFILE_TOKEN).
+
+    Возвращает:
+        dict: Путь к файлу на сервере и количество выборок.
+
+    Исключения:
+        HTTPException: Профилирование выключено (404), неверный токен (403),
+            профилировщик уже запущен (409).
+    """
+    if not profiler.token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.check_token(x_profile):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+    try:
+        result = await profiler.profile_process(seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"result": True, **result}
+
+
+@health_router.get(
+    "/ready",
+    response_model=dict,
+)
+async def readiness() -> dict:
+    """
+    Эндпоинт проверки готовности: база данных доступна и схема актуальна.
+
+    Возвращает:
+        dict: Результат проверки и версия схемы.
+
+    Исключения:
+        HTTPException: Приложение не готово обслуживать запросы (503).
+    """
+    try:
+        version = await get_schema_version(engine)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database is not available: {str(e)}")
+
+    if version < LATEST_VERSION:
+        raise HTTPException(status_code=503, detail=f"Schema version {version} is outdated")
+
+    return {"result": True, "schema_version": version}
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Эндпоинт метрик в текстовом формате Prometheus (nginx его не проксирует).
+
+    Возвращает:
+        PlainTextResponse: Метрики всех воркеров приложения.
+    """
+    # Снимки других воркеров читаются с диска - не в цикле событий
+    body = await asyncio.to_thread(registry.render) if registry.directory else registry.render()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
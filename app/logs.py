@@ -0,0 +1,147 @@
+import json
+import random
+import re
+import sys
+import traceback
+from contextvars import ContextVar
+
+from loguru import logger
+
+from config import LOG_LEVEL, LOG_FILE, LOG_JSON, LOG_SAMPLE_RATE, LOG_SAMPLE_RATES
+
+# Поля, значения которых не попадают в лог (сравнение без учета регистра)
+REDACTED_FIELDS = {"api-key", "api_key", "authorization", "cookie", "token"}
+REDACTED = "***"
+REDACTED_RE = re.compile(r"(api[-_]key['\"]?\s*[:=]\s*['\"]?)[^'\",\s}]+", re.IGNORECASE)
+
+# Уровень, начиная с которого записи пишутся всегда, без выборки
+SAMPLING_MAX_LEVEL = logger.level("WARNING").no
+
+# ASGI scope текущего запроса: по нему выбирается доля записей маршрута
+request_scope: ContextVar[dict | None] = ContextVar("request_scope", default=None)
+
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    """
+    Разбирает доли записей по маршрутам: "/api/tweets=0.1,/api/users/me=0.5".
+
+    Аргументы:
+        value (str): Пары шаблон маршрута=доля через запятую.
+
+    Возвращает:
+        dict[str, float]: Доля записей для каждого маршрута.
+    """
+    rates = {}
+    for item in value.split(","):
+        route, _, rate = item.strip().rpartition("=")
+        if route:
+            rates[route] = float(rate)
+    return rates
+
+
+def redact(value):
+    """
+    Возвращает копию значения, в которой скрыты секреты (api-key и т.п.).
+    """
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in REDACTED_FIELDS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return REDACTED_RE.sub(rf"\1{REDACTED}", value)
+    return value
+
+
+def _patch(record):
+    # Поля, переданные как extra={...}, поднимаются на верхний уровень записи
+    fields = record["extra"].pop("extra", None)
+    if isinstance(fields, dict):
+        record["extra"].update(fields)
+    record["extra"] = redact(record["extra"])
+    record["message"] = redact(record["message"])
+
+
+class RouteSampler:
+    """
+    Фильтр записей лога с выборкой по маршрутам.
+
+    Записи ниже WARNING внутри запроса к API пишутся с долей, заданной для его
+    маршрута (LOG_SAMPLE_RATES, иначе LOG_SAMPLE_RATE). Решение принимается
+    один раз на запрос, поэтому записи одного запроса пишутся все или никакие.
+
+    Аргументы:
+        default_rate (float): Доля записей для маршрутов без своей настройки.
+        rates (dict[str, float]): Доля записей по шаблонам маршрутов.
+    """
+
+    def __init__(self, default_rate: float = 1.0, rates: dict[str, float] | None = None):
+        self.default_rate = default_rate
+        self.rates = rates or {}
+
+    def __call__(self, record) -> bool:
+        if record["level"].no >= SAMPLING_MAX_LEVEL:
+            return True
+        scope = request_scope.get()
+        if scope is None:
+            return True
+        sampled = scope.get("log_sampled")
+        if sampled is None:
+            route = getattr(scope.get("route"), "path", None) or scope.get("path")
+            rate = self.rates.get(route, self.default_rate)
+            sampled = scope["log_sampled"] = rate >= 1 or random.random() < rate
+        return sampled
+
+
+def _json_format(record) -> str:
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "message": record["message"],
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        **{key: value for key, value in record["extra"].items() if key != "_json"},
+    }
+    if record["exception"] is not None:
+        entry["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["_json"] = json.dumps(entry, ensure_ascii=False, default=str)
+    return "{extra[_json]}\n"
+
+
+def setup_logging(
+    level: str = LOG_LEVEL,
+    log_file: str = LOG_FILE,
+    json_output: bool = LOG_JSON,
+    sampler: RouteSampler | None = None,
+):
+    """
+    Настраивает лог приложения: stdout и файл с ротацией.
+
+    Записи передаются в отдельный поток через очередь (enqueue=True), поэтому
+    запись в файл не блокирует цикл событий. Вызов logger.debug при уровне
+    INFO завершается сразу, без форматирования сообщения.
+
+    Аргументы:
+        level (str): Минимальный уровень записей.
+        log_file (str): Файл лога (пустая строка - только stdout).
+        json_output (bool): Писать записи в JSON, по одной на строку.
+        sampler (RouteSampler | None): Выборка записей по маршрутам.
+    """
+    sampler = sampler or RouteSampler(LOG_SAMPLE_RATE, parse_sample_rates(LOG_SAMPLE_RATES))
+    log_format = _json_format if json_output else "{time} {level} {message} {extra}"
+
+    logger.remove()
+    logger.configure(patcher=_patch)
+    logger.add(sys.stdout, level=level, format=log_format, filter=sampler, enqueue=True)
+    if log_file:
+        logger.add(
+            log_file,
+            rotation="500 MB",
+            level=level,
+            format=log_format,
+            filter=sampler,
+            enqueue=True,
+        )
@@ -0,0 +1,142 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+
+from loguru import logger
+
+from app.metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG
+from config import LOOP_LAG_INTERVAL, LOOP_BLOCK_DEBUG, LOOP_BLOCK_THRESHOLD_MS
+
+# Сколько последних блокировок цикла событий хранится для /internal/loop
+BLOCKED_LOG_SIZE = 50
+
+
+class LoopMonitor:
+    """
+    Мониторинг цикла событий.
+
+    Задержка планирования измеряется постоянно: задача засыпает на interval
+    и сравнивает фактическое время пробуждения с ожидаемым. Разница - время,
+    которое цикл был занят другими обратными вызовами, - попадает в метрику
+    event_loop_lag_seconds.
+
+    В отладочном режиме отдельный поток раз в block_threshold ставит в цикл
+    событий пустой обратный вызов. Если он не выполнился за порог, цикл занят
+    одним обратным вызовом (блокирующий ввод-вывод, тяжелое вычисление), и его
+    стек снимается в момент блокировки - в отличие от loop.slow_callback_duration,
+    который сообщает о медленном вызове уже после его завершения и без стека.
+
+    Аргументы:
+        interval (float): Период измерения задержки в секундах.
+        debug (bool): Снимать стеки обратных вызовов, блокирующих цикл.
+        block_threshold (float): Порог блокировки в секундах.
+    """
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL,
+        debug: bool = LOOP_BLOCK_DEBUG,
+        block_threshold: float = LOOP_BLOCK_THRESHOLD_MS / 1000,
+    ):
+        self.interval = interval
+        self.debug = debug
+        self.block_threshold = block_threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.blocked: deque[dict] = deque(maxlen=BLOCKED_LOG_SIZE)
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    async def run(self):
+        """
+        Измеряет задержку цикла событий до отмены задачи.
+        """
+        loop = asyncio.get_running_loop()
+        if self.debug:
+            self.start_watchdog(loop)
+        try:
+            while True:
+                started = loop.time()
+                await asyncio.sleep(self.interval)
+                self.observe(loop.time() - started - self.interval)
+        finally:
+            self.stop_watchdog()
+
+    def observe(self, lag: float):
+        lag = max(lag, 0.0)
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        EVENT_LOOP_LAG.observe(value=lag)
+
+    def start_watchdog(self, loop: asyncio.AbstractEventLoop):
+        """
+        Запускает поток, который снимает стеки обратных вызовов, блокирующих цикл.
+        Вызывается из потока цикла событий.
+        """
+        if self._watchdog is not None:
+            return
+        self._stop.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            args=(loop, threading.get_ident()),
+            name="loop-watchdog",
+            daemon=True,
+        )
+        self._watchdog.start()
+
+    def stop_watchdog(self):
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int):
+        while not self._stop.wait(self.block_threshold):
+            beat = threading.Event()
+            scheduled = time.perf_counter()
+            try:
+                loop.call_soon_threadsafe(beat.set)
+            except RuntimeError:
+                # Цикл событий закрыт
+                return
+            if beat.wait(self.block_threshold):
+                continue
+
+            frame = sys._current_frames().get(loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            # Длительность блокировки известна, когда цикл освободится
+            while not beat.wait(self.block_threshold) and not self._stop.is_set():
+                pass
+            self._record_block(time.perf_counter() - scheduled, stack)
+
+    def _record_block(self, duration: float, stack: list[str]):
+        EVENT_LOOP_BLOCKED.inc()
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration * 1000, 1),
+            "stack": [line.rstrip() for line in stack],
+        }
+        self.blocked.append(entry)
+        logger.warning(
+            "Event loop blocked",
+            extra={"duration_ms": entry["duration_ms"], "stack": "".join(stack[-8:])},
+        )
+
+    def status(self) -> dict:
+        """
+        Возвращает последнюю и максимальную задержку и блокировки цикла, начиная с последней.
+        """
+        return {
+            "lag_ms": round(self.last_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "debug": self.debug,
+            "block_threshold_ms": round(self.block_threshold * 1000, 1),
+            "blocked": list(reversed(self.blocked)),
+        }
+
+
+loop_monitor = LoopMonitor()
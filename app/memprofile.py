@@ -0,0 +1,196 @@
+import asyncio
+import tracemalloc
+from datetime import datetime, timezone
+
+from loguru import logger
+
+from config import MEMORY_PROFILING, MEMORY_TRACE_FRAMES, MEMORY_TOP_SITES, MEMORY_LEAK_INTERVAL
+
+# Выделения памяти самим tracemalloc и импортом модулей в отчеты не попадают
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryProfiler:
+    """
+    Учет памяти по маршрутам через tracemalloc (включается MEMORY_PROFILING=1).
+
+    Для запроса запоминается прирост отслеживаемой памяти после его завершения
+    (то, что запрос оставил после себя) и пик во время запроса относительно
+    начала. Пик в tracemalloc общий для процесса, поэтому одновременно
+    измеряется один запрос; параллельные запросы выполняются без измерения,
+    а их выделения памяти входят в пик измеряемого.
+
+    Аргументы:
+        enabled (bool): Включить отслеживание выделений памяти.
+        frames (int): Глубина стека, сохраняемого для каждого выделения.
+        top (int): Количество мест выделения в отчетах.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = MEMORY_PROFILING,
+        frames: int = MEMORY_TRACE_FRAMES,
+        top: int = MEMORY_TOP_SITES,
+    ):
+        self.enabled = enabled
+        self.frames = frames
+        self.top = top
+        # Маршрут -> [запросы, суммарный прирост, суммарный пик, максимальный пик]
+        self.routes: dict[str, list[int]] = {}
+        self.leak_report: dict | None = None
+        self._measuring = False
+        self._previous: tracemalloc.Snapshot | None = None
+
+    def start(self):
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def begin(self) -> int | None:
+        """
+        Начинает измерение запроса; None - запрос не измеряется.
+        """
+        if not self.enabled or self._measuring or not tracemalloc.is_tracing():
+            return None
+        self._measuring = True
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def end(self, route: str, started: int):
+        current, peak = tracemalloc.get_traced_memory()
+        self._measuring = False
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = [0, 0, 0, 0]
+        stats[0] += 1
+        stats[1] += current - started
+        stats[2] += peak - started
+        stats[3] = max(stats[3], peak - started)
+
+    def route_stats(self) -> dict[str, dict]:
+        return {
+            route: {
+                "requests": requests,
+                "allocated_bytes_avg": allocated // requests,
+                "peak_bytes_avg": peak_total // requests,
+                "peak_bytes_max": peak_max,
+            }
+            for route, (requests, allocated, peak_total, peak_max) in sorted(self.routes.items())
+        }
+
+    def snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+    def top_sites(self) -> list[dict]:
+        """
+        Возвращает места, где выделено больше всего живой памяти.
+        """
+        stats = self.snapshot().statistics("traceback" if self.frames > 1 else "lineno")
+        return [
+            {
+                "size_bytes": stat.size,
+                "count": stat.count,
+                "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            }
+            for stat in stats[:self.top]
+        ]
+
+    def compare(self) -> dict | None:
+        """
+        Сравнивает текущий снимок памяти с предыдущим: места, где память
+        выросла больше всего. Первый вызов только запоминает снимок.
+        """
+        snapshot = self.snapshot()
+        previous, self._previous = self._previous, snapshot
+        if previous is None:
+            return None
+        stats = snapshot.compare_to(previous, "lineno")
+        growth = [stat for stat in stats if stat.size_diff > 0][:self.top]
+        self.leak_report = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "traced_bytes": tracemalloc.get_traced_memory()[0],
+            "growth_bytes": sum(stat.size_diff for stat in stats),
+            "sites": [
+                {
+                    "size_bytes": stat.size,
+                    "size_diff_bytes": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                }
+                for stat in growth
+            ],
+        }
+        return self.leak_report
+
+    def status(self) -> dict:
+        """
+        Возвращает учет памяти по маршрутам, места выделения живой памяти
+        и последний отчет о росте памяти.
+        """
+        if not tracemalloc.is_tracing():
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "traced_bytes": tracemalloc.get_traced_memory()[0],
+            "routes": self.route_stats(),
+            "top_sites": self.top_sites(),
+            "leak_report": self.leak_report,
+        }
+
+
+class MemoryMiddleware:
+    """
+    ASGI middleware учета памяти запросов по шаблонам маршрутов (см. MemoryProfiler).
+    При выключенном MEMORY_PROFILING запрос передается приложению без измерений.
+
+    Аргументы:
+        app: ASGI-приложение.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        started = memory_profiler.begin() if scope["type"] == "http" else None
+        if started is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            memory_profiler.end(f"{scope['method']} {route}", started)
+
+
+async def leak_reporter(profiler: MemoryProfiler, interval: float = MEMORY_LEAK_INTERVAL):
+    """
+    Периодически сравнивает снимки памяти и пишет в лог места наибольшего роста.
+    Снимок и сравнение выполняются в потоке, чтобы цикл событий продолжал обслуживать запросы.
+
+    Аргументы:
+        profiler (MemoryProfiler): Учет памяти.
+        interval (float): Период сравнения в секундах.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await asyncio.to_thread(profiler.compare)
+        except Exception as e:
+            logger.error(f"Memory leak report failed: {e}")
+            continue
+        if report is not None:
+            logger.info(
+                "Memory growth report",
+                extra={
+                    "traced_bytes": report["traced_bytes"],
+                    "growth_bytes": report["growth_bytes"],
+                    "sites": report["sites"][:5],
+                },
+            )
+
+
+memory_profiler = MemoryProfiler()
@@ -0,0 +1,313 @@
+import asyncio
+import bisect
+import glob
+import json
+import os
+from typing import Callable
+
+from loguru import logger
+
+from config import METRICS_DIR, METRICS_FLUSH_INTERVAL
+from database.cache import named_caches
+from database.db import engine, pool_status, replica_engine
+from database.shards import shard_router
+
+# Границы корзин гистограммы задержек (секунды), как у клиентов Prometheus
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+class Metric:
+    """
+    Метрика с метками: значения хранятся в словаре по кортежу значений меток.
+
+    Аргументы:
+        name (str): Имя метрики.
+        documentation (str): Описание для строки # HELP.
+        labelnames (tuple[str, ...]): Имена меток.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def samples(self) -> list:
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+
+class Counter(Metric):
+    """
+    Монотонно растущий счетчик.
+    """
+
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, *labels, value: float):
+        """
+        Выставляет накопленное значение (для счетчиков, которые ведут другие объекты).
+        """
+        self.values[labels] = value
+
+
+class Gauge(Metric):
+    """
+    Текущее значение; в нескольких процессах значения живых процессов складываются.
+    """
+
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, *labels, value: float):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма: количество наблюдений по корзинам, сумма и количество.
+
+    Аргументы:
+        buckets (tuple[float, ...]): Верхние границы корзин по возрастанию.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self.values: dict[tuple, list[float]] = {}
+
+    def observe(self, *labels, value: float):
+        # Корзины без накопления, последняя - +Inf; затем сумма и количество
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0] * (len(self.buckets) + 3)
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса с выводом в текстовом формате Prometheus.
+
+    Запись метрики - операция над словарем в памяти процесса, без блокировок
+    и ввода-вывода. При нескольких воркерах uvicorn каждый процесс периодически
+    сохраняет снимок своих метрик в файл каталога METRICS_DIR, а /metrics
+    складывает снимки всех процессов: счетчики и гистограммы - всех, включая
+    завершившиеся, gauge - только живых процессов.
+
+    Аргументы:
+        directory (str): Каталог снимков процессов (пустая строка - один процесс).
+    """
+
+    def __init__(self, directory: str = ""):
+        self.directory = directory
+        self.metrics: dict[str, Metric] = {}
+        # Функции, обновляющие метрики перед снимком (состояние пулов, кэшей)
+        self.collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def snapshot(self) -> dict:
+        """
+        Возвращает значения всех метрик процесса.
+        """
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        return {name: metric.samples() for name, metric in self.metrics.items()}
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics_{pid}.json")
+
+    def write_snapshot(self):
+        """
+        Сохраняет снимок метрик процесса в METRICS_DIR (атомарно, через rename).
+        """
+        path = self._snapshot_path(os.getpid())
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+
+    def _read_snapshots(self) -> list[tuple[bool, dict]]:
+        own_pid = os.getpid()
+        snapshots = [(True, self.snapshot())]
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            pid = int(os.path.basename(path)[len("metrics_"):-len(".json")])
+            if pid == own_pid:
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append((_pid_alive(pid), json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def collect(self) -> dict[str, dict[tuple, float | list[float]]]:
+        """
+        Складывает значения метрик этого процесса и снимков других процессов.
+        """
+        snapshots = self._read_snapshots() if self.directory else [(True, self.snapshot())]
+        merged: dict[str, dict] = {name: {} for name in self.metrics}
+        for alive, snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not alive):
+                    continue
+                values = merged[name]
+                for labels, value in samples:
+                    labels = tuple(labels)
+                    if isinstance(value, list):
+                        current = values.get(labels) or [0] * len(value)
+                        values[labels] = [a + b for a, b in zip(current, value)]
+                    else:
+                        values[labels] = values.get(labels, 0) + value
+        return merged
+
+    def render(self) -> str:
+        """
+        Возвращает метрики в текстовом формате Prometheus (0.0.4).
+        """
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, value in sorted(values.items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip((*metric.buckets, "+Inf"), value[:-2]):
+                    cumulative += count
+                    le = bound if isinstance(bound, str) else repr(float(bound))
+                    lines.append(f"{name}_bucket{_labels([*pairs, ('le', le)])} {_number(cumulative)}")
+                lines.append(f"{name}_sum{_labels(pairs)} {_number(value[-2])}")
+                lines.append(f"{name}_count{_labels(pairs)} {_number(value[-1])}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+async def metrics_flusher(registry: "MetricsRegistry", interval: float = METRICS_FLUSH_INTERVAL):
+    """
+    Периодически сохраняет снимок метрик процесса для /metrics других воркеров.
+    Файл пишется в потоке, чтобы не блокировать цикл событий.
+
+    Аргументы:
+        registry (MetricsRegistry): Реестр метрик.
+        interval (float): Период сохранения в секундах.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(registry.write_snapshot)
+        except Exception as e:
+            logger.error(f"Metrics snapshot failed: {e}")
+
+
+registry = MetricsRegistry(METRICS_DIR)
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+)
+HTTP_IN_PROGRESS = registry.gauge(
+    "http_requests_in_progress", "HTTP requests being processed.", ("method",)
+)
+DB_POOL_CONNECTIONS = registry.gauge(
+    "db_pool_connections", "Database pool connections by state.", ("pool", "state")
+)
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total",
+    "Cache lookups by result: hit, miss (loader called) or coalesced (waited for a running load).",
+    ("cache", "result"),
+)
+UPLOAD_BYTES = registry.counter(
+    "upload_bytes_total", "Bytes of uploaded media files.", ("kind",)
+)
+EVENT_LOOP_LAG = registry.histogram(
+    "event_loop_lag_seconds",
+    "Event loop scheduling lag.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+EVENT_LOOP_BLOCKED = registry.counter(
+    "event_loop_blocked_total", "Callbacks that held the event loop longer than the threshold (debug mode)."
+)
+
+
+def _collect_pools():
+    pools = {"primary": engine, "replica": replica_engine}
+    pools.update({f"shard{shard.index}": shard.engine for shard in shard_router.shards[1:]})
+    for pool, pool_engine in pools.items():
+        if pool_engine is None:
+            continue
+        status = pool_status(pool_engine)
+        for state in ("checked_out", "checked_in", "overflow"):
+            if state in status:
+                DB_POOL_CONNECTIONS.set(pool, state, value=status[state])
+
+
+def _collect_caches():
+    # Кэши с одним именем (например, у нескольких маршрутизаторов чтения) суммируются
+    totals: dict[str, dict[str, int]] = {}
+    for cache in list(named_caches):
+        counts = totals.setdefault(cache.name, {"hit": 0, "miss": 0, "coalesced": 0})
+        counts["hit"] += cache.hits
+        counts["miss"] += cache.misses
+        counts["coalesced"] += cache.coalesced
+    for name, counts in totals.items():
+        for result, value in counts.items():
+            CACHE_REQUESTS.set(name, result, value=value)
+
+
+registry.collectors += [_collect_pools, _collect_caches]
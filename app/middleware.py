@@ -0,0 +1,238 @@
+import time
+from http.cookies import SimpleCookie
+from uuid import uuid4
+
+from fastapi.routing import APIRoute
+from loguru import logger
+
+from app.logs import request_scope
+from app.metrics import HTTP_IN_PROGRESS, HTTP_LATENCY, HTTP_REQUESTS
+from config import REPLICA_MAX_LAG, REPLICA_LAG_CHECK_INTERVAL
+from database.db import CONSISTENCY_COOKIE
+from database.querystats import QueryStats, current_stats, log_repeated_queries
+from database.tracing import current_span, span, tracer, trace_id_from_request_id
+
+# Методы, которые изменяют данные
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ConsistencyTokenMiddleware:
+    """
+    ASGI middleware, которое после успешной записи выставляет cookie
+    со временем записи.
+
+    По этому токену get_read_db направляет следующие чтения пользователя
+    на основную базу, пока реплика может не содержать его изменений.
+
+    Аргументы:
+        app: ASGI-приложение.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # После этого срока реплика с допустимым отставанием гарантированно догнала запись
+        self.max_age = int(REPLICA_MAX_LAG + REPLICA_LAG_CHECK_INTERVAL) + 1
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[CONSISTENCY_COOKIE] = f"{time.time():.3f}"
+                cookie[CONSISTENCY_COOKIE]["path"] = "/"
+                cookie[CONSISTENCY_COOKIE]["max-age"] = self.max_age
+                cookie[CONSISTENCY_COOKIE]["httponly"] = True
+                cookie[CONSISTENCY_COOKIE]["samesite"] = "lax"
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.output(header="").strip().encode("latin-1")),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_token)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware, которое считает запросы, их задержку и количество
+    обрабатываемых запросов для /metrics.
+
+    Маршрут берется из шаблона пути (например, /api/tweets/{tweet_id}),
+    чтобы количество рядов метрик не зависело от идентификаторов в URL.
+
+    Аргументы:
+        app: ASGI-приложение.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_PROGRESS.dec(method)
+            # Роутер Starlette записывает найденный маршрут в scope
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(method, route, str(status))
+            HTTP_LATENCY.observe(method, route, value=time.perf_counter() - started)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware, которое считает SQL-выражения и время в базе данных
+    за запрос и возвращает их в заголовке Server-Timing:
+
+        Server-Timing: db;dur=3.2;desc="5 queries", total;dur=7.9
+
+    Те же значения пишутся в лог полями запроса, а повторы одной формы
+    запроса сверх SQL_REPEAT_THRESHOLD - предупреждением о возможном N+1.
+    Здесь же запоминается scope запроса для выборки записей лога по маршруту.
+
+    Аргументы:
+        app: ASGI-приложение.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_stats.set(stats)
+        scope_token = request_scope.set(scope)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", '
+                    f"total;dur={total:.1f}"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", timing.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            logger.info(
+                "Request finished",
+                extra={
+                    "method": scope["method"],
+                    "route": route,
+                    "status": status,
+                    "queries": stats.count,
+                    "db_ms": round(stats.duration * 1000, 1),
+                    "total_ms": round((time.perf_counter() - started) * 1000, 1),
+                },
+            )
+            log_repeated_queries(stats, route)
+            request_scope.reset(scope_token)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware, которое присваивает запросу X-Request-ID и открывает
+    корневой спан трассировки для выбранной доли запросов (TRACE_SAMPLE_RATE).
+
+    X-Request-ID клиента или nginx (UUID или 32 hex-символа) становится
+    идентификатором трассировки, поэтому трассировку можно найти по заголовку
+    из лога прокси. Заголовок возвращается в ответе.
+
+    Аргументы:
+        app: ASGI-приложение.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        trace_id = trace_id_from_request_id(request_id)
+        if trace_id is None:
+            trace_id = uuid4().hex
+            request_id = request_id or trace_id
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-request-id", request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        if not tracer.sampled():
+            await self.app(scope, receive, send_with_request_id)
+            return
+
+        attributes = {"http.method": scope["method"], "http.target": scope["path"], "request.id": request_id}
+        with tracer.start_trace(f"{scope['method']} {scope['path']}", trace_id, attributes) as root:
+            try:
+                await self.app(scope, receive, send_with_request_id)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root.name = f"{scope['method']} {route}"
+                    root.attributes["http.route"] = route
+                root.attributes["http.status_code"] = status
+
+
+class TracedRoute(APIRoute):
+    """
+    Маршрут FastAPI, обработчик которого (вместе с зависимостями) выполняется
+    в спане "handler <имя обработчика>" трассируемого запроса.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        name = f"handler {self.name}"
+
+        async def traced_handler(request):
+            if current_span.get() is None:
+                return await handler(request)
+            with span(name, **{"http.route": self.path}):
+                return await handler(request)
+
+        return traced_handler
@@ -37,6 +37,36 @@ class MediaResponse(TunedModel):
     media_id: int
 
 
+class UploadCreateRequest(TunedModel):
+    """
+    Запрос на создание сессии возобновляемой загрузки.
+
+    Атрибуты:
+    - filename (str): Имя загружаемого файла.
+    - size (int): Полный размер файла в байтах.
+    """
+
+    filename: str
+    size: int
+
+
+class UploadResponse(TunedModel):
+    """
+    Состояние сессии возобновляемой загрузки.
+
+    Атрибуты:
+    - result (bool): Указывает, была ли операция успешной.
+    - upload_id (str): Идентификатор сессии загрузки.
+    - offset (int): Количество байт, уже принятых сервером.
+    - size (int): Полный размер файла в байтах.
+    """
+
+    result: bool
+    upload_id: str
+    offset: int
+    size: int
+
+
 class TweetRequest(TunedModel):
     """
     Запрос на создание твита.
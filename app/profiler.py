@@ -0,0 +1,248 @@
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl
+
+from loguru import logger
+from starlette.responses import JSONResponse, Response
+
+from config import PROFILE_TOKEN, PROFILE_INTERVAL_MS, PROFILE_DIR, PROFILE_MAX_SECONDS
+
+# Корень проекта: пути файлов в стеках показываются относительно него
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Максимальная глубина стека в выборке
+MAX_STACK_DEPTH = 128
+
+
+class SamplingProfiler:
+    """
+    Статистический профилировщик: фоновый поток раз в interval снимает стеки
+    потоков через sys._current_frames() и считает одинаковые стеки.
+
+    Профилируемый код не инструментируется (в отличие от cProfile), поэтому
+    замедление не зависит от количества вызовов функций. Результат - свернутые
+    стеки ("collapsed stacks"): строка "main;handler;query 12" на каждый стек,
+    формат flamegraph.pl, speedscope и inferno.
+
+    Аргументы:
+        interval (float): Период выборки в секундах.
+        thread_id (int | None): Поток, стеки которого снимаются (None - все потоки процесса).
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000, thread_id: int | None = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.thread_id is not None:
+                frame = frames.get(self.thread_id)
+                if frame is not None:
+                    self.stacks[_stack(frame)] += 1
+            else:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in frames.items():
+                    if thread_id != own_id:
+                        self.stacks[(names.get(thread_id, str(thread_id)), *_stack(frame))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """
+        Возвращает свернутые стеки, по стеку на строку.
+        """
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class Profiler:
+    """
+    Профилирование по запросу администратора.
+
+    Отдельный запрос профилируется, если в заголовке X-Profile или параметре
+    ?profile= передан PROFILE_TOKEN: вместо ответа обработчика возвращаются
+    свернутые стеки потока цикла событий за время запроса. Весь процесс
+    профилируется на заданное время с записью стеков в файл каталога PROFILE_DIR.
+    Одновременно выполняется не больше одного профилирования.
+
+    Аргументы:
+        token (str): Секрет администратора (пустая строка - профилирование запросов выключено).
+        interval (float): Период выборки в секундах.
+        directory (str): Каталог файлов профилирования процесса.
+        max_seconds (float): Максимальная длительность профилирования процесса.
+    """
+
+    def __init__(
+        self,
+        token: str = PROFILE_TOKEN,
+        interval: float = PROFILE_INTERVAL_MS / 1000,
+        directory: str = PROFILE_DIR,
+        max_seconds: float = PROFILE_MAX_SECONDS,
+    ):
+        self.token = token
+        self.interval = interval
+        self.directory = directory
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+
+    def check_token(self, token: str | None) -> bool:
+        """
+        Проверяет токен профилирования (при пустом PROFILE_TOKEN любой токен неверен).
+        """
+        return bool(self.token) and token is not None and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def requested_token(self, scope) -> str | None:
+        """
+        Возвращает переданный в запросе токен профилирования или None.
+        """
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return value.decode("latin-1")
+        query = scope.get("query_string", b"")
+        if b"profile=" in query:
+            return dict(parse_qsl(query.decode("latin-1"))).get("profile")
+        return None
+
+    async def profile_request(self, app, scope, receive, send, token: str):
+        """
+        Выполняет запрос под профилировщиком и отправляет свернутые стеки.
+
+        Ответ обработчика отбрасывается; его код возвращается в заголовке
+        X-Profile-Status. Профилировщик снимает весь поток цикла событий,
+        поэтому в стеки попадают и параллельные запросы этого воркера.
+        """
+        if not self.check_token(token):
+            await JSONResponse({"detail": "Invalid profile token"}, status_code=403)(scope, receive, send)
+            return
+        if not self._lock.acquire(blocking=False):
+            await JSONResponse({"detail": "Profiler is busy"}, status_code=409)(scope, receive, send)
+            return
+
+        status = 500
+
+        async def discard_response(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        sampler = SamplingProfiler(self.interval, threading.get_ident())
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await app(scope, receive, discard_response)
+        finally:
+            sampler.stop()
+            self._lock.release()
+
+        response = Response(
+            sampler.collapsed(),
+            media_type="text/plain",
+            headers={
+                "X-Profile-Status": str(status),
+                "X-Profile-Samples": str(sampler.samples),
+                "X-Profile-Duration-Ms": f"{(time.perf_counter() - started) * 1000:.1f}",
+            },
+        )
+        await response(scope, receive, send)
+
+    async def profile_process(self, seconds: float) -> dict:
+        """
+        Профилирует все потоки процесса заданное время и сохраняет свернутые стеки.
+
+        Аргументы:
+            seconds (float): Длительность профилирования (не больше max_seconds).
+
+        Возвращает:
+            dict: Путь к файлу и количество выборок.
+
+        Исключения:
+            RuntimeError: Профилировщик уже запущен.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("Profiler is busy")
+        sampler = SamplingProfiler(self.interval)
+        sampler.start()
+        try:
+            await asyncio.sleep(min(seconds, self.max_seconds))
+        finally:
+            sampler.stop()
+            self._lock.release()
+
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(self.directory, f"profile_{os.getpid()}_{stamp}.collapsed")
+        await asyncio.to_thread(_write_profile, path, sampler.collapsed())
+        logger.info("Process profile written", extra={"path": path, "samples": sampler.samples})
+        return {"path": path, "samples": sampler.samples}
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware профилирования отдельных запросов (см. Profiler).
+
+    При пустом PROFILE_TOKEN запрос передается приложению без проверок;
+    иначе к обычному запросу добавляется только поиск заголовка X-Profile.
+    Служебные эндпоинты (/internal/) не профилируются: на /internal/profile
+    тот же заголовок разрешает профилирование всего процесса.
+
+    Аргументы:
+        app: ASGI-приложение.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiler.token or scope["path"].startswith("/internal/"):
+            await self.app(scope, receive, send)
+            return
+        token = profiler.requested_token(scope)
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+        await profiler.profile_request(self.app, scope, receive, send, token)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    elif "site-packages" in filename:
+        filename = filename.rsplit("site-packages", 1)[1].lstrip(os.sep)
+    # Строка начала функции, а не текущая: выборки одной функции складываются
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _stack(frame) -> tuple[str, ...]:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return tuple(reversed(names))
+
+
+def _write_profile(path: str, content: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+profiler = Profiler()
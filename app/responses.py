@@ -0,0 +1,107 @@
+import os
+
+import aiofiles
+from fastapi import HTTPException
+from fastapi.responses import Response, StreamingResponse
+
+# Размер блока при чтении файла для ответа
+CHUNK_SIZE = 256 * 1024
+
+
+def parse_range(range_header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Разбирает заголовок Range для одного диапазона байт.
+
+    Несколько диапазонов в одном запросе не поддерживаются: в этом случае
+    возвращается None и файл отдается целиком, что допускается RFC 9110.
+
+    Аргументы:
+        range_header (str | None): Значение заголовка Range.
+        size (int): Размер файла в байтах.
+
+    Возвращает:
+        tuple[int, int] | None: Первый и последний байт диапазона (включительно) или None.
+
+    Исключения:
+        HTTPException: Диапазон не может быть удовлетворен (416).
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec:
+        return None
+
+    start_str, _, end_str = spec.partition("-")
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+        else:
+            # Суффиксный диапазон: последние N байт
+            start = max(size - int(end_str), 0)
+            end = size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end or start < 0:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+    return start, min(end, size - 1)
+
+
+async def _read_file(file_path: str, start: int, length: int):
+    async with aiofiles.open(file_path, "rb") as file:
+        await file.seek(start)
+        while length > 0:
+            chunk = await file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(
+    file_path: str, media_type: str, range_header: str | None, size: int | None = None
+) -> Response:
+    """
+    Отдает файл целиком или запрошенный диапазон байт (206 Partial Content).
+
+    Используется, когда перед приложением нет nginx; иначе файл отдает nginx
+    через X-Accel-Redirect и сам обрабатывает Range.
+
+    Аргументы:
+        file_path (str): Путь к файлу.
+        media_type (str): MIME-тип файла.
+        range_header (str | None): Значение заголовка Range.
+        size (int | None): Размер файла, если он уже известен.
+
+    Возвращает:
+        Response: Потоковый ответ с содержимым файла.
+    """
+    if size is None:
+        size = os.stat(file_path).st_size
+
+    headers = {"Accept-Ranges": "bytes"}
+    byte_range = parse_range(range_header, size)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            _read_file(file_path, 0, size), media_type=media_type, headers=headers
+        )
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _read_file(file_path, start, length),
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
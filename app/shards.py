@@ -0,0 +1,55 @@
+from typing import Annotated, AsyncGenerator
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.auth import CurrentUser, get_current_user
+from database.db import get_last_write
+from database.shards import ShardRouter, get_shard_router
+
+
+async def _shard_session(session_factory: async_sessionmaker) -> AsyncGenerator[AsyncSession, None]:
+    session: AsyncSession = session_factory()
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+async def get_author_db(
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    shards: Annotated[ShardRouter, Depends(get_shard_router)],
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия шарда текущего пользователя: новые твиты, медиа и загрузки пишутся туда.
+    """
+    async for session in _shard_session(shards.shard_for_user(user.user_id).session):
+        yield session
+
+
+async def get_tweet_db(
+    tweet_id: int,
+    shards: Annotated[ShardRouter, Depends(get_shard_router)],
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия шарда, на котором хранится твит tweet_id (вместе с его лайками и медиа).
+    """
+    async for session in _shard_session(shards.shard_for_id(tweet_id).session):
+        yield session
+
+
+async def get_media_db(
+    media_id: int,
+    request: Request,
+    shards: Annotated[ShardRouter, Depends(get_shard_router)],
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для чтения с шарда, на котором хранится медиафайл media_id.
+    """
+    shard = shards.shard_for_id(media_id)
+    session_factory = await shard.read_session(get_last_write(request))
+    async for session in _shard_session(session_factory):
+        yield session
@@ -0,0 +1,359 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+
+# Сценарии по умолчанию и их веса: чтения преобладают, как в реальной ленте
+DEFAULT_MIX = "feed=40,me=15,user=15,like=12,follow=10,tweet=5,media=3"
+# Содержимое загружаемого файла (заголовок PNG и заполнитель)
+MEDIA_CONTENT = b"\x89PNG\r\n\x1a\n" + bytes(1024)
+# Рост задержки или падение RPS больше порога, %, и рост доли ошибок, процентные пункты
+DEFAULT_THRESHOLD = 10.0
+ERROR_RATE_THRESHOLD = 1.0
+
+
+class Recorder:
+    """
+    Результаты запросов по эндпоинтам (шаблонам путей).
+    """
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.statuses: dict[str, Counter] = {}
+
+    def record(self, endpoint: str, started: float, status: int | str):
+        self.latencies.setdefault(endpoint, []).append((time.perf_counter() - started) * 1000)
+        self.statuses.setdefault(endpoint, Counter())[str(status)] += 1
+
+    def summary(self, duration: float) -> dict:
+        endpoints = {
+            endpoint: _stats(latencies, self.statuses[endpoint], duration)
+            for endpoint, latencies in sorted(self.latencies.items())
+        }
+        total_statuses = sum(self.statuses.values(), Counter())
+        total = _stats([value for values in self.latencies.values() for value in values], total_statuses, duration)
+        return {"endpoints": endpoints, "total": total}
+
+
+class Client:
+    """
+    Виртуальный пользователь: API-ключ, его идентификатор и генератор случайных чисел.
+    """
+
+    def __init__(self, http: httpx.AsyncClient, recorder: Recorder, api_key: str, user_id: int,
+                 rng: random.Random, users: int, tweets: int):
+        self.http = http
+        self.recorder = recorder
+        self.api_key = api_key
+        self.user_id = user_id
+        self.rng = rng
+        self.users = users
+        self.tweets = tweets
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, url, headers={"api-key": self.api_key}, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(endpoint, started, type(e).__name__)
+            return None
+        self.recorder.record(endpoint, started, response.status_code)
+        return response
+
+    def other_user(self) -> int:
+        user_id = self.rng.randint(1, self.users)
+        return user_id if user_id != self.user_id else user_id % self.users + 1
+
+
+async def scenario_feed(client: Client):
+    await client.request("GET /api/tweets", "GET", "/api/tweets")
+
+
+async def scenario_me(client: Client):
+    await client.request("GET /api/users/me", "GET", "/api/users/me")
+
+
+async def scenario_user(client: Client):
+    await client.request("GET /api/users/{id}", "GET", f"/api/users/{client.other_user()}")
+
+
+async def scenario_like(client: Client):
+    tweet_id = client.rng.randint(1, client.tweets)
+    await client.request("POST /api/tweets/{id}/likes", "POST", f"/api/tweets/{tweet_id}/likes")
+    await client.request("DELETE /api/tweets/{id}/likes", "DELETE", f"/api/tweets/{tweet_id}/likes")
+
+
+async def scenario_follow(client: Client):
+    user_id = client.other_user()
+    await client.request("POST /api/users/{id}/follow", "POST", f"/api/users/{user_id}/follow")
+    await client.request("DELETE /api/users/{id}/follow", "DELETE", f"/api/users/{user_id}/follow")
+
+
+async def scenario_tweet(client: Client):
+    response = await client.request(
+        "POST /api/tweets", "POST", "/api/tweets", json={"tweet_data": f"Load test {client.rng.random()}"}
+    )
+    if response is not None and response.status_code == 200:
+        tweet_id = response.json()["tweet_id"]
+        await client.request("DELETE /api/tweets/{id}", "DELETE", f"/api/tweets/{tweet_id}")
+
+
+async def scenario_media(client: Client):
+    await client.request(
+        "POST /api/medias", "POST", "/api/medias", files={"file": ("load.png", MEDIA_CONTENT, "image/png")}
+    )
+
+
+SCENARIOS = {
+    "feed": scenario_feed,
+    "me": scenario_me,
+    "user": scenario_user,
+    "like": scenario_like,
+    "follow": scenario_follow,
+    "tweet": scenario_tweet,
+    "media": scenario_media,
+}
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """
+    Разбирает смесь сценариев: "feed=40,like=10".
+
+    Аргументы:
+        value (str): Пары сценарий=вес через запятую.
+
+    Возвращает:
+        dict[str, float]: Вес каждого сценария.
+
+    Исключения:
+        ValueError: Неизвестный сценарий или неположительная сумма весов.
+    """
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if sum(mix.values()) <= 0:
+        raise ValueError("Scenario weights must add up to a positive number")
+    return mix
+
+
+async def run_load(
+    base_url: str,
+    api_keys: list[str],
+    mix: dict[str, float],
+    concurrency: int = 50,
+    duration: float = 30,
+    tweets: int = 1000,
+    seed: int = 0,
+    timeout: float = 10,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict:
+    """
+    Нагружает API смесью сценариев и возвращает задержки, ошибки и RPS по эндпоинтам.
+
+    Каждый из concurrency виртуальных пользователей в цикле выбирает сценарий
+    по весам и выполняет его от имени случайного API-ключа, не дожидаясь паузы
+    (закрытая модель нагрузки). Пользователь с ключом api_keys[i] считается
+    пользователем с идентификатором i + 1, как в данных database.generate.
+
+    Аргументы:
+        base_url (str): Адрес приложения.
+        api_keys (list[str]): API-ключи пользователей.
+        mix (dict[str, float]): Веса сценариев.
+        concurrency (int): Количество одновременных виртуальных пользователей.
+        duration (float): Длительность нагрузки в секундах.
+        tweets (int): Твиты для лайков выбираются из идентификаторов 1..tweets.
+        seed (int): Начальное значение генераторов случайных чисел.
+        timeout (float): Таймаут запроса в секундах.
+        transport: Транспорт httpx (для нагрузки приложения в том же процессе).
+
+    Возвращает:
+        dict: Параметры запуска, показатели по эндпоинтам и итог.
+    """
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits, transport=transport) as http:
+        deadline = time.perf_counter() + duration
+
+        async def worker(index: int):
+            rng = random.Random(seed * 1_000_003 + index)
+            while time.perf_counter() < deadline:
+                user_index = rng.randrange(len(api_keys))
+                client = Client(http, recorder, api_keys[user_index], user_index + 1, rng, len(api_keys), tweets)
+                await SCENARIOS[rng.choices(names, weights)[0]](client)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "meta": {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "base_url": base_url,
+            "mix": mix,
+            "concurrency": concurrency,
+            "duration_s": round(elapsed, 3),
+            "users": len(api_keys),
+            "tweets": tweets,
+            "seed": seed,
+        },
+        **recorder.summary(elapsed),
+    }
+
+
+def compare(base: dict, new: dict, threshold: float = DEFAULT_THRESHOLD) -> tuple[list[dict], bool]:
+    """
+    Сравнивает два результата run_load по эндпоинтам.
+
+    Регрессия - рост p50/p95/p99 или падение RPS больше threshold процентов,
+    либо рост доли ошибок больше чем на ERROR_RATE_THRESHOLD процентных пунктов.
+
+    Аргументы:
+        base (dict): Базовый результат.
+        new (dict): Новый результат.
+        threshold (float): Допустимое изменение в процентах.
+
+    Возвращает:
+        tuple[list[dict], bool]: Изменения по эндпоинтам и наличие регрессий.
+    """
+    rows = []
+    for endpoint in sorted(set(base["endpoints"]) | set(new["endpoints"])):
+        before = base["endpoints"].get(endpoint)
+        after = new["endpoints"].get(endpoint)
+        if before is None or after is None:
+            rows.append({"endpoint": endpoint, "missing": "base" if before is None else "new", "regressions": []})
+            continue
+        row = {"endpoint": endpoint, "regressions": []}
+        for key in ("p50_ms", "p95_ms", "p99_ms", "rps"):
+            change = _change(before[key], after[key])
+            row[key] = {"base": before[key], "new": after[key], "change_pct": change}
+            worse = -change if key == "rps" else change
+            if worse is not None and worse > threshold:
+                row["regressions"].append(key)
+        error_change = (after["error_rate"] - before["error_rate"]) * 100
+        row["error_rate"] = {"base": before["error_rate"], "new": after["error_rate"]}
+        if error_change > ERROR_RATE_THRESHOLD:
+            row["regressions"].append("error_rate")
+        rows.append(row)
+    return rows, any(row["regressions"] for row in rows)
+
+
+def format_comparison(rows: list[dict]) -> str:
+    lines = [f"{'endpoint':<32}{'p50, ms':>20}{'p95, ms':>20}{'p99, ms':>20}{'rps':>20}{'errors':>16}"]
+    for row in rows:
+        if "missing" in row:
+            lines.append(f"{row['endpoint']:<32}  missing in {row['missing']}")
+            continue
+        cells = "".join(
+            f"{row[key]['new']:>10.1f}{_format_change(row[key]['change_pct']):>10}"
+            for key in ("p50_ms", "p95_ms", "p99_ms", "rps")
+        )
+        errors = f"{row['error_rate']['base']:.1%}->{row['error_rate']['new']:.1%}"
+        flag = f"  REGRESSION: {', '.join(row['regressions'])}" if row["regressions"] else ""
+        lines.append(f"{row['endpoint']:<32}{cells}{errors:>16}{flag}")
+    return "\n".join(lines)
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    # Метод ближайшего ранга по отсортированным значениям
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def _stats(latencies: list[float], statuses: Counter, duration: float) -> dict:
+    latencies = sorted(latencies)
+    requests = len(latencies)
+    errors = sum(count for status, count in statuses.items() if not (status.isdigit() and int(status) < 400))
+    return {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "rps": round(requests / duration, 2) if duration else 0.0,
+        "mean_ms": round(sum(latencies) / requests, 2) if requests else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def _change(before: float, after: float) -> float | None:
+    if not before:
+        return None
+    return round((after - before) / before * 100, 1)
+
+
+def _format_change(change: float | None) -> str:
+    return "n/a" if change is None else f"{change:+.1f}%"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочное тестирование API смесью сценариев")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="нагрузить приложение и сохранить результат в JSON")
+    run_parser.add_argument("--base-url", default="http://localhost:8000")
+    run_parser.add_argument("--users", type=int, default=1000, help="количество API-ключей")
+    run_parser.add_argument("--key-template", default="key-{}", help="шаблон API-ключа пользователя N")
+    run_parser.add_argument("--tweets", type=int, default=1000, help="твиты для лайков: идентификаторы 1..N")
+    run_parser.add_argument("--mix", default=DEFAULT_MIX, help=f"веса сценариев ({', '.join(SCENARIOS)})")
+    run_parser.add_argument("--concurrency", type=int, default=50)
+    run_parser.add_argument("--duration", type=float, default=30, help="длительность в секундах")
+    run_parser.add_argument("--timeout", type=float, default=10, help="таймаут запроса в секундах")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="файл результата (по умолчанию stdout)")
+
+    compare_parser = commands.add_parser("compare", help="сравнить два результата и показать регрессии")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="допустимое изменение, %%")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        rows, regressed = compare(base, new, args.threshold)
+        print(format_comparison(rows))
+        return 1 if regressed else 0
+
+    api_keys = [args.key_template.format(n) for n in range(1, args.users + 1)]
+    result = asyncio.run(
+        run_load(
+            args.base_url,
+            api_keys,
+            parse_mix(args.mix),
+            concurrency=args.concurrency,
+            duration=args.duration,
+            tweets=args.tweets,
+            seed=args.seed,
+            timeout=args.timeout,
+        )
+    )
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
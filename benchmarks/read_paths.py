@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from database.models import Base, User, Tweet, Like, Follower, Media
+from database.reads import ReadDAL
+
+# SQL для "сырого" пути: драйвер получает готовую строку без участия SQLAlchemy
+RAW_USER_INFO = (
+    "SELECT 'user', user_id, name FROM users WHERE user_id = ? "
+    "UNION ALL SELECT 'follower', u.user_id, u.name FROM followers f "
+    "JOIN users u ON f.follower_id = u.user_id WHERE f.followee_id = ? "
+    "UNION ALL SELECT 'following', u.user_id, u.name FROM followers f "
+    "JOIN users u ON f.followee_id = u.user_id WHERE f.follower_id = ?"
+)
+RAW_FEED = (
+    "SELECT t.tweet_id, t.content, t.user_id, u.name, coalesce(l.likes_count, 0) AS likes_count "
+    "FROM tweets t JOIN users u ON t.user_id = u.user_id "
+    "LEFT OUTER JOIN (SELECT tweet_id, count(like_id) AS likes_count FROM likes GROUP BY tweet_id) l "
+    "ON t.tweet_id = l.tweet_id ORDER BY likes_count DESC, t.tweet_id"
+)
+RAW_FEED_MEDIA = (
+    "SELECT tweet_id, media_url FROM media WHERE tweet_id IN ({}) "
+    "ORDER BY tweet_id, position, media_id"
+)
+RAW_FEED_LIKES = (
+    "SELECT l.tweet_id, l.user_id, u.name FROM likes l JOIN users u ON l.user_id = u.user_id "
+    "WHERE l.tweet_id IN ({}) ORDER BY l.tweet_id, l.like_id"
+)
+RAW_BATCH_SIZE = 500
+
+
+def _sql(conn, statement: str) -> str:
+    """
+    Приводит плейсхолдеры "?" к стилю драйвера ($1, $2, ... для asyncpg).
+    """
+    if conn.dialect.driver != "asyncpg":
+        return statement
+    parts = statement.split("?")
+    return "".join(f"{part}${i}" for i, part in enumerate(parts[:-1], 1)) + parts[-1]
+
+
+async def raw_user_info(session: AsyncSession, user_id: int) -> dict:
+    conn = await session.connection()
+    rows = await conn.exec_driver_sql(_sql(conn, RAW_USER_INFO), (user_id, user_id, user_id))
+    user = {"followers": [], "following": []}
+    for kind, row_user_id, name in rows:
+        if kind == "user":
+            user.update(id=row_user_id, name=name)
+        else:
+            user["followers" if kind == "follower" else "following"].append(
+                {"id": row_user_id, "name": name}
+            )
+    return {"result": True, "user": user}
+
+
+async def raw_feed(session: AsyncSession) -> dict:
+    conn = await session.connection()
+    feed = {}
+    for tweet_id, content, author_id, author_name, _ in await conn.exec_driver_sql(RAW_FEED):
+        feed[tweet_id] = {
+            "id": tweet_id,
+            "content": content,
+            "author": {"id": author_id, "name": author_name},
+            "attachments": [],
+            "likes": [],
+        }
+
+    tweet_ids = list(feed)
+    for i in range(0, len(tweet_ids), RAW_BATCH_SIZE):
+        chunk = tuple(tweet_ids[i:i + RAW_BATCH_SIZE])
+        placeholders = ", ".join("?" * len(chunk))
+        for tweet_id, media_url in await conn.exec_driver_sql(
+            _sql(conn, RAW_FEED_MEDIA.format(placeholders)), chunk
+        ):
+            feed[tweet_id]["attachments"].append(media_url)
+        for tweet_id, like_user_id, name in await conn.exec_driver_sql(
+            _sql(conn, RAW_FEED_LIKES.format(placeholders)), chunk
+        ):
+            feed[tweet_id]["likes"].append({"user_id": like_user_id, "name": name})
+
+    return {"result": True, "tweets": list(feed.values())}
+
+
+# Эндпоинт -> путь -> вызов
+PATHS = {
+    "GET /api/users/{id}": {
+        "core": lambda session, user_id: ReadDAL(session).get_user_info(user_id),
+        "raw": raw_user_info,
+    },
+    "GET /api/tweets": {
+        "core": lambda session, user_id: ReadDAL(session).get_feed_tweets(),
+        "raw": lambda session, user_id: raw_feed(session),
+    },
+}
+
+
+async def seed(engine, users: int, tweets: int, likes_per_tweet: int, follows_per_user: int):
+    """
+    Заполняет пустую базу синтетическими данными.
+    """
+    rng = random.Random(36)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(User),
+            [{"user_id": i, "api_key": f"key-{i}", "name": f"User{i}"} for i in range(1, users + 1)],
+        )
+        await conn.execute(
+            insert(Tweet),
+            [
+                {"tweet_id": i, "user_id": rng.randint(1, users), "content": f"Tweet {i}"}
+                for i in range(1, tweets + 1)
+            ],
+        )
+        like_pairs = {
+            (rng.randint(1, users), tweet_id)
+            for tweet_id in range(1, tweets + 1)
+            for _ in range(likes_per_tweet)
+        }
+        await conn.execute(
+            insert(Like), [{"user_id": user_id, "tweet_id": tweet_id} for user_id, tweet_id in like_pairs]
+        )
+        follow_pairs = {
+            (user_id, rng.randint(1, users))
+            for user_id in range(1, users + 1)
+            for _ in range(follows_per_user)
+        }
+        await conn.execute(
+            insert(Follower),
+            [{"follower_id": a, "followee_id": b} for a, b in follow_pairs if a != b],
+        )
+        await conn.execute(
+            insert(Media),
+            [
+                {
+                    "media_url": f"/pictures/{i}.jpg",
+                    "media_path": f"/pictures/{i}.jpg",
+                    "tweet_id": i,
+                }
+                for i in range(1, tweets + 1, 3)
+            ],
+        )
+
+
+async def run(url: str | None, users: int, tweets: int, iterations: int):
+    if url is None:
+        url = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+        engine = create_async_engine(url)
+        await seed(engine, users, tweets, likes_per_tweet=5, follows_per_user=20)
+    else:
+        engine = create_async_engine(url)
+
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    rng = random.Random(0)
+
+    print(f"{'endpoint':<22}{'path':<6}{'mean, ms':>10}{'p50, ms':>10}{'p95, ms':>10}")
+    for endpoint, paths in PATHS.items():
+        for name, call in paths.items():
+            timings = []
+            # Первый вызов прогревает кэш компиляции и соединения пула
+            for i in range(iterations + 1):
+                user_id = rng.randint(1, users)
+                async with session_factory() as session:
+                    started = time.perf_counter()
+                    await call(session, user_id)
+                    elapsed = time.perf_counter() - started
+                if i:
+                    timings.append(elapsed * 1000)
+            timings.sort()
+            print(
+                f"{endpoint:<22}{name:<6}{statistics.fmean(timings):>10.2f}"
+                f"{timings[len(timings) // 2]:>10.2f}{timings[int(len(timings) * 0.95)]:>10.2f}"
+            )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Сравнение путей чтения Core и драйвера для горячих GET-эндпоинтов"
+    )
+    parser.add_argument("--url", help="заполненная база данных (по умолчанию временная SQLite)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tweets", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.users, args.tweets, args.iterations))
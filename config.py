@@ -10,3 +10,137 @@ USER = os.environ.get("USER")
 PASSWORD = os.environ.get("PASSWORD")
 TOKEN = os.environ.get("TOKEN")
 REDIS_URL = os.environ.get("REDIS_URL")
+
+# Копирование загруженных медиафайлов на Яндекс.Диск (публичный ключ сохраняется в записи медиа)
+YADISK_UPLOAD = os.environ.get("YADISK_UPLOAD", "0") == "1"
+
+# Кэш метаданных публичных ресурсов Яндекс.Диска
+YADISK_META_TTL = int(os.environ.get("YADISK_META_TTL", 86400))
+YADISK_META_NEGATIVE_TTL = int(os.environ.get("YADISK_META_NEGATIVE_TTL", 60))
+YADISK_META_CACHE_SIZE = int(os.environ.get("YADISK_META_CACHE_SIZE", 10000))
+
+# Хранение медиафайлов на локальном диске
+MEDIA_ROOT = os.environ.get("MEDIA_ROOT", "/api/pictures")
+MEDIA_BASE_URL = os.environ.get("MEDIA_BASE_URL", "http://localhost:81/pictures")
+# Публичные ссылки на медиафайлы ведут на эндпоинт с проверкой доступа
+MEDIA_API_URL = os.environ.get("MEDIA_API_URL", "http://localhost:81/api/medias")
+# Раздача /pictures через FastAPI в обход проверки доступа (только для отладки)
+SERVE_MEDIA_STATIC = os.environ.get("SERVE_MEDIA_STATIC", "0") == "1"
+# Передача файлов nginx через X-Accel-Redirect вместо чтения их в Python
+MEDIA_ACCEL_REDIRECT = os.environ.get("MEDIA_ACCEL_REDIRECT", "0") == "1"
+MEDIA_ACCEL_PREFIX = os.environ.get("MEDIA_ACCEL_PREFIX", "/protected/pictures/")
+
+# Возобновляемая загрузка медиафайлов по частям
+# По умолчанию каталог внутри MEDIA_ROOT: перенос готового файла остается атомарным
+UPLOAD_TMP_DIR = os.environ.get("UPLOAD_TMP_DIR")
+UPLOAD_MAX_SIZE = int(os.environ.get("UPLOAD_MAX_SIZE", 100 * 1024 * 1024))
+UPLOAD_CHUNK_MAX_SIZE = int(os.environ.get("UPLOAD_CHUNK_MAX_SIZE", 5 * 1024 * 1024))
+# Загрузки без новых частей дольше UPLOAD_SESSION_TTL секунд удаляются вместе с временными файлами
+# раз в UPLOAD_CLEANUP_INTERVAL секунд (0 - без очистки)
+UPLOAD_SESSION_TTL = float(os.environ.get("UPLOAD_SESSION_TTL", 86400))
+UPLOAD_CLEANUP_INTERVAL = float(os.environ.get("UPLOAD_CLEANUP_INTERVAL", 3600))
+
+# Определение длительности видео при загрузке (пустое значение отключает)
+FFPROBE_BINARY = os.environ.get("FFPROBE_BINARY", "ffprobe")
+FFPROBE_TIMEOUT = float(os.environ.get("FFPROBE_TIMEOUT", 10))
+
+# Движок и пул соединений базы данных
+DB_ECHO = os.environ.get("DB_ECHO", "0") == "1"
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+# Таймаут выполнения запроса в миллисекундах (0 - без ограничения, только PostgreSQL)
+DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", 0))
+# Размер кэша подготовленных выражений asyncpg (0 - для pgbouncer в режиме transaction)
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 100))
+
+# Реплика для чтения (URL2): максимально допустимое отставание и период его проверки, в секундах
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", 5))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get("REPLICA_LAG_CHECK_INTERVAL", 2))
+
+# Секционирование tweets и likes по диапазонам tweet_id (только PostgreSQL, новая база)
+TWEET_PARTITIONING = os.environ.get("TWEET_PARTITIONING", "0") == "1"
+TWEET_PARTITION_SIZE = int(os.environ.get("TWEET_PARTITION_SIZE", 10_000_000))
+# Сколько секций создается заранее сверх текущей
+TWEET_PARTITIONS_AHEAD = int(os.environ.get("TWEET_PARTITIONS_AHEAD", 2))
+# Период проверки будущих секций в секундах
+TWEET_PARTITION_CHECK_INTERVAL = float(os.environ.get("TWEET_PARTITION_CHECK_INTERVAL", 3600))
+
+# Дополнительные шарды (через запятую): шард 0 - URL, шарды 1..N - SHARD_URLS.
+# Твиты, лайки и медиа нового контента пишутся на шард user_id % количество шардов
+SHARD_URLS = [url.strip() for url in os.environ.get("SHARD_URLS", "").split(",") if url.strip()]
+
+# Лента по последним FEED_WINDOW твитам (0 - по всем твитам)
+FEED_WINDOW = int(os.environ.get("FEED_WINDOW", 0))
+
+# Токен администратора для служебных эндпоинтов /internal/* (заголовок X-Admin-Token).
+# Пустое значение - служебные эндпоинты выключены, кроме /internal/ready
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Кэш аутентификации по API-ключу, в секундах
+AUTH_CACHE_TTL = int(os.environ.get("AUTH_CACHE_TTL", 300))
+AUTH_CACHE_NEGATIVE_TTL = int(os.environ.get("AUTH_CACHE_NEGATIVE_TTL", 30))
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", 100000))
+
+# Лог: уровень, файл (пустое значение - только stdout), JSON по записи на строку
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FILE = os.environ.get("LOG_FILE", "app.log")
+LOG_JSON = os.environ.get("LOG_JSON", "1") == "1"
+# Доля записей ниже WARNING для запросов к API: общая и по маршрутам ("/api/tweets=0.1,/api/users/me=0.5")
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 1.0))
+LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "")
+
+# Трассировка запросов: файл OTLP/JSON (пустое значение - выключена) и доля трассируемых запросов
+SERVICE_NAME = os.environ.get("SERVICE_NAME", "twits")
+TRACE_FILE = os.environ.get("TRACE_FILE", "")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.01))
+
+# Журнал медленных запросов: порог в миллисекундах (0 - выключен), размер кольцевого буфера,
+# снятие планов EXPLAIN и ограничение времени EXPLAIN ANALYZE на PostgreSQL
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 500))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", 100))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "1") == "1"
+SLOW_QUERY_EXPLAIN_TIMEOUT = int(os.environ.get("SLOW_QUERY_EXPLAIN_TIMEOUT", 10000))
+
+# Метрики Prometheus (/metrics). При нескольких воркерах uvicorn - общий каталог снимков процессов,
+# который очищается перед запуском; пустое значение - метрики только текущего процесса
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+# Период сохранения снимка метрик процесса в секундах
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+
+# Детектор N+1: одна форма SQL-запроса повторяется в запросе к API больше SQL_REPEAT_THRESHOLD раз
+# (0 - без проверки). SQL_REPEAT_RAISE=1 (тесты) превращает предупреждение в ошибку
+SQL_REPEAT_THRESHOLD = int(os.environ.get("SQL_REPEAT_THRESHOLD", 20))
+SQL_REPEAT_RAISE = os.environ.get("SQL_REPEAT_RAISE", "0") == "1"
+
+# Мониторинг цикла событий: период измерения задержки в секундах; LOOP_BLOCK_DEBUG=1 снимает стеки
+# обратных вызовов, которые держат цикл дольше LOOP_BLOCK_THRESHOLD_MS миллисекунд
+LOOP_LAG_INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", 0.5))
+LOOP_BLOCK_DEBUG = os.environ.get("LOOP_BLOCK_DEBUG", "0") == "1"
+LOOP_BLOCK_THRESHOLD_MS = float(os.environ.get("LOOP_BLOCK_THRESHOLD_MS", 100))
+
+# Учет памяти запросов через tracemalloc (замедляет выделение памяти, включается для диагностики):
+# глубина сохраняемого стека, количество мест выделения в отчетах и период отчета о росте памяти
+# в секундах (0 - без отчета)
+MEMORY_PROFILING = os.environ.get("MEMORY_PROFILING", "0") == "1"
+MEMORY_TRACE_FRAMES = int(os.environ.get("MEMORY_TRACE_FRAMES", 1))
+MEMORY_TOP_SITES = int(os.environ.get("MEMORY_TOP_SITES", 20))
+MEMORY_LEAK_INTERVAL = float(os.environ.get("MEMORY_LEAK_INTERVAL", 300))
+
+# Профилирование по запросу: секрет администратора для профилирования отдельного запроса
+# (заголовок X-Profile или параметр ?profile=; пустое значение - выключено), период выборки стеков
+# в миллисекундах, каталог и максимальная длительность (секунды) профилирования всего процесса
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 60))
+
+# Профиль файловой базы SQLite: WAL, параметры PRAGMA, один писатель и несколько читателей
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+# Отрицательное значение - размер кэша страниц в КиБ
+SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", -64000))
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000))
+SQLITE_READERS = int(os.environ.get("SQLITE_READERS", 4))
@@ -0,0 +1,180 @@
+import asyncio
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+# Именованные кэши процесса: их счетчики экспортируются в метрики
+named_caches: "weakref.WeakSet[AsyncTTLCache]" = weakref.WeakSet()
+
+
+class AsyncTTLCache:
+    """
+    Асинхронный кэш в памяти процесса с временем жизни записей.
+
+    Поддерживает негативное кэширование (запоминание ответа "не найдено")
+    и объединение запросов: конкурентные обращения к одному ключу
+    ожидают один общий вызов загрузчика. Счетчики: hits - ответ из кэша,
+    misses - вызов загрузчика, coalesced - ожидание уже идущей загрузки.
+
+    Аргументы:
+        ttl (float): Время жизни положительной записи в секундах.
+        negative_ttl (float): Время жизни негативной записи в секундах.
+        maxsize (int): Максимальное количество записей (вытесняются самые старые).
+        negative_exceptions (tuple): Исключения загрузчика, которые кэшируются как негативный результат.
+        name (str | None): Имя кэша в метриках; безымянный кэш в метриках не учитывается.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        negative_ttl: float = 60,
+        maxsize: int = 10000,
+        negative_exceptions: tuple[type[BaseException], ...] = (),
+        name: str | None = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self.negative_exceptions = negative_exceptions
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._data: OrderedDict[Hashable, tuple[float, bool, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        if name is not None:
+            named_caches.add(self)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key: Hashable) -> tuple[bool, bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, False, None
+        expires_at, negative, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return False, False, None
+        self._data.move_to_end(key)
+        return True, negative, value
+
+    def _store(self, key: Hashable, value: Any, negative: bool, ttl: float):
+        self._data[key] = (time.monotonic() + ttl, negative, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Возвращает значение из кэша без обращения к загрузчику.
+
+        Аргументы:
+            key (Hashable): Ключ записи.
+            default (Any): Значение, если запись отсутствует, устарела или негативна.
+
+        Возвращает:
+            Any: Закэшированное значение или default.
+        """
+        found, negative, value = self._lookup(key)
+        if not found or negative:
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """
+        Сохраняет положительное значение в кэш.
+
+        Аргументы:
+            key (Hashable): Ключ записи.
+            value (Any): Сохраняемое значение.
+            ttl (float | None): Время жизни записи; по умолчанию используется ttl кэша.
+        """
+        self._store(key, value, False, self.ttl if ttl is None else ttl)
+
+    def set_negative(self, key: Hashable, error: BaseException | None = None):
+        """
+        Запоминает, что значение для ключа отсутствует.
+
+        Аргументы:
+            key (Hashable): Ключ записи.
+            error (BaseException | None): Исключение, которое будет возбуждаться при попадании в запись.
+        """
+        self._store(key, error, True, self.negative_ttl)
+
+    def invalidate(self, key: Hashable):
+        """
+        Удаляет запись из кэша.
+
+        Аргументы:
+            key (Hashable): Ключ записи.
+        """
+        self._data.pop(key, None)
+
+    def clear(self):
+        """
+        Очищает кэш и счетчики попаданий.
+        """
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Возвращает значение из кэша или загружает его, объединяя конкурентные запросы.
+
+        Если загрузчик вернул None или возбудил одно из negative_exceptions,
+        результат кэшируется как негативный на negative_ttl секунд.
+
+        Аргументы:
+            key (Hashable): Ключ записи.
+            loader (Callable[[], Awaitable[Any]]): Корутина-загрузчик значения.
+
+        Возвращает:
+            Any: Закэшированное или загруженное значение.
+
+        Исключения:
+            Exception: Исключение загрузчика или закэшированное негативное исключение.
+        """
+        found, negative, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            if negative and value is not None:
+                raise value.with_traceback(None)
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            # Загрузка идет в отдельной задаче: отмена любого из ожидающих,
+            # включая начавшего загрузку, не отменяет ее для остальных
+            task = asyncio.create_task(self._load(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_load(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+        except self.negative_exceptions as e:
+            self.set_negative(key, e)
+            raise
+        if value is None:
+            self.set_negative(key)
+        else:
+            self.set(key, value)
+        return value
+
+    def _finish_load(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Исключение уже передано ожидающим; без них оно не должно попадать в лог
+        if not task.cancelled():
+            task.exception()
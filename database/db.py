@@ -1,15 +1,216 @@
-from typing import AsyncGenerator
+import time
+from typing import Annotated, AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from fastapi import Depends, Request
+from loguru import logger
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import (
+    URL,
+    URL2,
+    REPLICA_MAX_LAG,
+    REPLICA_LAG_CHECK_INTERVAL,
+    DB_ECHO,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_MMAP_SIZE,
+    SQLITE_CACHE_SIZE,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_READERS,
+)
+from database.cache import AsyncTTLCache
+
+# Cookie с временем последней записи пользователя (токен согласованности чтения)
+CONSISTENCY_COOKIE = "last_write"
+
+# Отставание реплики PostgreSQL в секундах; 0, если все полученные изменения применены
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, который дополнительно считает время получения соединения.
+
+    Атрибуты:
+        acquire_count (int): Количество выданных соединений.
+        acquire_time_total (float): Суммарное время ожидания соединения в секундах.
+        acquire_time_max (float): Максимальное время ожидания соединения в секундах.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquire_count = 0
+        self.acquire_time_total = 0.0
+        self.acquire_time_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.acquire_count += 1
+            self.acquire_time_total += waited
+            self.acquire_time_max = max(self.acquire_time_max, waited)
+
+
+def is_sqlite_file(url: str | None) -> bool:
+    """
+    Проверяет, что URL указывает на файловую базу SQLite.
+    """
+    if not url:
+        return False
+    database_url = make_url(url)
+    return database_url.get_backend_name() == "sqlite" and database_url.database not in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def _configure_sqlite(engine: AsyncEngine, read_only: bool):
+    """
+    Настраивает соединения файловой базы SQLite.
+
+    WAL позволяет читателям работать параллельно с писателем. Транзакции
+    начинаются явно: писатель сразу берет блокировку записи (BEGIN IMMEDIATE),
+    чтобы не получить SQLITE_BUSY при повышении блокировки посреди транзакции.
+    """
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        # Драйвер не открывает транзакции сам, их начинает обработчик begin
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
 
-from config import URL
+    @event.listens_for(engine.sync_engine, "begin")
+    def on_begin(conn):
+        conn.exec_driver_sql("BEGIN" if read_only else "BEGIN IMMEDIATE")
+
+
+def create_engine_from_settings(url: str, read_only: bool = False, **overrides) -> AsyncEngine:
+    """
+    Создает асинхронный движок SQLAlchemy с параметрами пула из настроек.
+
+    Для файловой базы SQLite движок записи получает одно соединение: пул
+    становится очередью писателей, а ожидание в нем не занимает блокировку
+    базы. Движок чтения (read_only) получает SQLITE_READERS соединений.
+
+    Аргументы:
+        url (str): URL подключения к базе данных.
+        read_only (bool): Движок только для чтения (для SQLite).
+        overrides: Параметры create_async_engine, заменяющие значения из настроек.
+
+    Возвращает:
+        AsyncEngine: Асинхронный движок SQLAlchemy.
+    """
+    database_url = make_url(url)
+    kwargs = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    sqlite_file = is_sqlite_file(url)
+
+    # База SQLite в памяти существует только в рамках одного соединения
+    if database_url.database not in (None, "", ":memory:"):
+        kwargs.update(
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+
+    if sqlite_file:
+        kwargs.update(
+            pool_size=SQLITE_READERS if read_only else 1,
+            max_overflow=0,
+        )
+
+    if database_url.drivername == "postgresql+asyncpg":
+        # Кэш подготовленных выражений адаптера SQLAlchemy и самого asyncpg
+        database_url = database_url.update_query_dict(
+            {"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)}
+        )
+        connect_args = {"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+        if DB_STATEMENT_TIMEOUT:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(DB_STATEMENT_TIMEOUT)
+            }
+        kwargs["connect_args"] = connect_args
+
+    kwargs.update(overrides)
+    engine = create_async_engine(database_url, **kwargs)
+    if sqlite_file:
+        _configure_sqlite(engine, read_only)
+    return engine
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    """
+    Возвращает текущее состояние пула соединений движка.
+
+    Аргументы:
+        engine (AsyncEngine): Асинхронный движок SQLAlchemy.
+
+    Возвращает:
+        dict: Размер пула, занятые и свободные соединения, переполнение и время ожидания.
+    """
+    pool = engine.sync_engine.pool
+    status = {"pool": type(pool).__name__}
+
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+
+    if isinstance(pool, InstrumentedAsyncQueuePool):
+        status.update(
+            acquire_count=pool.acquire_count,
+            acquire_time_avg=(
+                pool.acquire_time_total / pool.acquire_count if pool.acquire_count else 0.0
+            ),
+            acquire_time_max=pool.acquire_time_max,
+        )
+
+    return status
 
 
 # Параметры подключения к базе данных PostgreSQL
 DATABASE_URL = URL
 
 # Создание асинхронного движка SQLAlchemy
-engine = create_async_engine(DATABASE_URL, future=True, echo=True)
+engine = create_engine_from_settings(DATABASE_URL)
 
 # Создание асинхронной сессии SQLAlchemy
 async_session = async_sessionmaker(
@@ -21,7 +222,133 @@ async_session = async_sessionmaker(
 )
 
 
+# Реплика для чтения (необязательная).
+# Для файловой базы SQLite без реплики ее роль играет пул читателей того же файла.
+if URL2:
+    replica_engine = create_engine_from_settings(URL2)
+elif is_sqlite_file(DATABASE_URL):
+    replica_engine = create_engine_from_settings(DATABASE_URL, read_only=True)
+else:
+    replica_engine = None
+replica_session = (
+    async_sessionmaker(
+        replica_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=True,
+    )
+    if replica_engine is not None
+    else None
+)
+
+
+class ReadRouter:
+    """
+    Класс для выбора базы данных для запросов на чтение.
+
+    Чтение уходит на реплику, если она доступна, ее отставание не превышает
+    допустимого и пользователь не выполнял запись позже, чем реплика успела
+    ее применить. Иначе чтение выполняется на основной базе.
+
+    Аргументы:
+        primary_session (async_sessionmaker): Фабрика сессий основной базы.
+        replica_session (async_sessionmaker | None): Фабрика сессий реплики.
+        max_lag (float): Максимально допустимое отставание реплики в секундах.
+        lag_check_interval (float): Период проверки отставания реплики в секундах.
+        same_database (bool): Реплика читает ту же базу (пул читателей SQLite) и не отстает.
+    """
+
+    def __init__(
+        self,
+        primary_session: async_sessionmaker,
+        replica_session: async_sessionmaker | None,
+        max_lag: float = REPLICA_MAX_LAG,
+        lag_check_interval: float = REPLICA_LAG_CHECK_INTERVAL,
+        same_database: bool = False,
+    ):
+        self.primary_session = primary_session
+        self.replica_session = replica_session
+        self.same_database = same_database
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        # Отставание проверяется не чаще раза в интервал, конкурентные проверки объединяются
+        self._lag_cache = AsyncTTLCache(
+            ttl=lag_check_interval,
+            negative_ttl=lag_check_interval,
+            maxsize=1,
+            name="replica_lag",
+        )
+
+    async def _measure_lag(self) -> float | None:
+        try:
+            async with self.replica_session() as session:
+                if session.bind.dialect.name != "postgresql":
+                    await session.execute(text("SELECT 1"))
+                    return 0.0
+                return float((await session.execute(REPLICA_LAG_QUERY)).scalar())
+        except Exception as e:
+            logger.warning(f"Replica is unavailable: {e}")
+            return None
+
+    async def replica_lag(self) -> float | None:
+        """
+        Возвращает отставание реплики в секундах.
+
+        Возвращает:
+            float | None: Отставание или None, если реплика недоступна.
+        """
+        if self.replica_session is None:
+            return None
+        return await self._lag_cache.get_or_load("lag", self._measure_lag)
+
+    async def session_factory(self, last_write: float | None = None) -> async_sessionmaker:
+        """
+        Выбирает фабрику сессий для запроса на чтение.
+
+        Аргументы:
+            last_write (float | None): Время последней записи пользователя (unix time).
+
+        Возвращает:
+            async_sessionmaker: Фабрика сессий реплики или основной базы.
+        """
+        if self.same_database and self.replica_session is not None:
+            return self.replica_session
+
+        lag = await self.replica_lag()
+        if lag is None or lag > self.max_lag:
+            return self.primary_session
+
+        # Запись могла еще не дойти до реплики: читаем свои изменения с основной базы
+        if last_write is not None and time.time() - last_write <= lag + self.lag_check_interval:
+            return self.primary_session
+
+        return self.replica_session
+
+
+read_router = ReadRouter(
+    async_session, replica_session, same_database=not URL2 and replica_engine is not None
+)
+
+
+def get_last_write(request: Request) -> float | None:
+    """
+    Время последней записи пользователя из cookie согласованности (unix time).
+    """
+    try:
+        return float(request.cookies[CONSISTENCY_COOKIE])
+    except (KeyError, ValueError):
+        return None
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия базы данных для обработчика.
+
+    Соединение берется из пула только при первом запросе к базе, поэтому
+    запросы, отклоненные зависимостями раньше (аутентификация), пул не занимают.
+    Обработчики чтения закрывают сессию сразу после последнего обращения к DAL.
+    """
     session: AsyncSession = async_session()
     try:
         yield session
@@ -30,3 +357,27 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         raise
     finally:
         await session.close()
+
+
+def get_read_router() -> ReadRouter:
+    """
+    Зависимость FastAPI: маршрутизатор чтения (в тестах подменяется через dependency_overrides).
+    """
+    return read_router
+
+
+async def get_read_db(
+    request: Request, router: Annotated[ReadRouter, Depends(get_read_router)]
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для обработчиков, которые только читают данные (реплика или основная база).
+    """
+    session_factory = await router.session_factory(get_last_write(request))
+    session: AsyncSession = session_factory()
+    try:
+        yield session
+    except Exception as e:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
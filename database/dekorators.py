@@ -1,5 +1,5 @@
-import tempfile
-import os
+import aiofiles.os
+import aiofiles.tempfile
 
 
 from fastapi import HTTPException
@@ -14,19 +14,20 @@ def with_tempfile(func):
     ):
         temp_file_path = None
         try:
-            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                temp_file.write(media_request)
+            # Файл пишется в потоке, чтобы не блокировать цикл событий
+            async with aiofiles.tempfile.NamedTemporaryFile(delete=False) as temp_file:
                 temp_file_path = temp_file.name
-                return await func(
-                    self, temp_file_path, user_id, dst_filename, *args, **kwargs
-                )
+                await temp_file.write(media_request)
+            return await func(
+                self, temp_file_path, user_id, dst_filename, *args, **kwargs
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Ошибка при создании или загрузке временного файла: {str(e)}",
             )
         finally:
-            if temp_file_path and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+            if temp_file_path and await aiofiles.os.path.exists(temp_file_path):
+                await aiofiles.os.remove(temp_file_path)
 
     return wrapper
@@ -1,39 +1,48 @@
 import asyncio
 from datetime import datetime
-import os
 import aiofiles
+import aiofiles.os
 from fastapi import HTTPException
-from sqlalchemy import select, update, delete, desc, func, text
+from loguru import logger
+from sqlalchemy import select, update, delete, text, case
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
-import sqlalchemy
 
-from database.db import engine, async_session
-from database.models import Base, User, Tweet, Media, Like, Follower
+from config import FEED_WINDOW
+from database.db import engine
+from database.models import User, Tweet, Media, Like, Follower, UploadSession, utcnow
+from database.reads import ReadDAL
+from database.tracing import traced_methods
 
 
-async def wait_for_db():
+async def wait_for_db(initial_delay: float = 0.1, max_delay: float = 5, timeout: float = 120):
+    """
+    Ожидает готовности базы данных, повторяя проверку с экспоненциальной задержкой.
+
+    Первая проверка выполняется сразу, поэтому при доступной базе ожидания нет.
+
+    Аргументы:
+        initial_delay (float): Задержка перед второй попыткой в секундах.
+        max_delay (float): Максимальная задержка между попытками в секундах.
+        timeout (float): Общее время ожидания в секундах.
+
+    Исключения:
+        TimeoutError: База данных не стала доступна за отведенное время.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = initial_delay
 
     while True:
         try:
             async with engine.connect() as conn:
                 await conn.execute(text("SELECT 1"))
-
-                break
+            return
         except Exception as e:
-
-            await asyncio.sleep(5)  # Подождите 5 секунд перед повторной попыткой
-
-
-async def check_tables_exist() -> bool:
-    async with engine.connect() as conn:
-        def sync_inspect(connection):
-            inspector = sqlalchemy.inspect(connection)
-            tables = inspector.get_table_names()
-            return "diploma_db" in tables
-
-        return await conn.run_sync(sync_inspect)
+            if loop.time() + delay > deadline:
+                raise TimeoutError(f"Database is not available: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
 
 
 # Функция для заполнения тестовыми данными
@@ -111,40 +120,7 @@ async def fill_data():
     await engine.dispose()
 
 
-async def create_tables():
-    async with async_session() as session:
-        async with session.begin():  # Начало транзакции
-            # Выполняем запрос для получения списка таблиц
-            query = "SELECT table_name FROM information_schema.tables WHERE table_schema='public'"
-            result = await session.execute(text(query))
-            existing_tables = result.fetchall()
-
-            # Извлекаем имена таблиц
-            table_names = [row[0] for row in existing_tables]
-
-            if 'users' not in table_names:
-
-                async with engine.begin() as conn:
-                    await conn.run_sync(Base.metadata.create_all)
-                await fill_data()
-
-
-async def create_and_fill_tables():
-    async with async_session() as session:
-        async with session.begin():
-
-            query = "SELECT table_name FROM information_schema.tables WHERE table_schema='public'"
-            result = await session.execute(text(query))
-            existing_tables = result.fetchall()
-            table_names = [row[0] for row in existing_tables]
-
-            if 'users' not in table_names:
-
-                async with engine.begin() as conn:
-                    await conn.run_sync(Base.metadata.create_all)
-                await fill_data()
-
-
+@traced_methods
 class UserDAL:
     """
     Класс для работы с пользователями в базе данных.
@@ -156,64 +132,6 @@ class UserDAL:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_user_info(self, user_id: int) -> dict:
-        """
-        Получает детализированную информацию о пользователе, включая его подписчиков и подписки.
-
-        Аргументы:
-            user_id (int): Идентификатор пользователя.
-
-        Возвращает:
-            dict: Словарь с информацией о пользователе, его подписчиках и подписках.
-
-        Исключения:
-            HTTPException: Если пользователь не найден или возникает ошибка базы данных.
-        """
-        try:
-            query = (
-                select(User)
-                .options(
-                    joinedload(User.followers).joinedload(Follower.follower),
-                    joinedload(User.followees).joinedload(Follower.followee),
-                )
-                .where(User.user_id == user_id)
-            )
-            result = await self.session.execute(query)
-            user = result.unique().scalar_one_or_none()
-
-            if not user:
-                raise HTTPException(status_code=404, detail="Пользователь не найден")
-
-            user_info = {
-                "result": True,
-                "user": {
-                    "id": user.user_id,
-                    "name": user.name,
-                    "followers": [
-                        {
-                            "id": follower.follower.user_id,
-                            "name": follower.follower.name,
-                        }
-                        for follower in user.followers
-                    ],
-                    "following": [
-                        {
-                            "id": followee.followee.user_id,
-                            "name": followee.followee.name,
-                        }
-                        for followee in user.followees
-                    ],
-                },
-            }
-
-            return user_info
-
-        except SQLAlchemyError as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Ошибка получения информации о пользователе: {str(e)}",
-            )
-
     async def get_user_by_api_key(self, api_key: str) -> User:
         """
         Получает пользователя из базы данных по его api_key.
@@ -241,6 +159,7 @@ class UserDAL:
             )
 
 
+@traced_methods
 class TweetDAL:
     """
     Класс для работы с твитами в базе данных.
@@ -316,7 +235,7 @@ class TweetDAL:
         try:
             await self.session.delete(tweet)
             await self.session.commit()
-            print(f"Tweet с ID {tweet.tweet_id} был успешно удален.")
+            logger.debug("Tweet {} deleted", tweet.tweet_id)
         except SQLAlchemyError:
             await self.session.rollback()
             raise HTTPException(
@@ -348,12 +267,16 @@ class TweetDAL:
                 status_code=500, detail="Ошибка получения твита из базы данных"
             )
 
-    async def get_feed_tweets(self, user_id: int) -> dict:
+    async def get_feed_tweets(self, user_id: int, window: int = FEED_WINDOW) -> dict:
         """
         Получает ленту твитов для указанного пользователя, включая информацию о лайках и медиафайлах.
 
+        Лента собирается одной реализацией ReadDAL (запросы Core, пакетные IN-запросы
+        вложений и лайков, авторы через UserLoader).
+
         Аргументы:
             user_id (int): Идентификатор пользователя.
+            window (int): Количество последних твитов в ленте (0 - все твиты).
 
         Возвращает:
             dict: Словарь с лентой твитов.
@@ -361,65 +284,10 @@ class TweetDAL:
         Исключения:
             HTTPException: Если возникает ошибка базы данных при получении ленты твитов.
         """
-        try:
-
-            # Основной запрос для получения твитов
-            query = (
-                select(
-                    Tweet.tweet_id,
-                    Tweet.content,
-                    Tweet.user_id,
-                    User.name.label("user_name"),
-                    func.coalesce(Media.media_url, "").label("media_url"),
-                    func.count(Like.like_id).label("likes_count"),
-                )
-                .join(User, Tweet.user_id == User.user_id)
-                .outerjoin(Media, Tweet.tweet_id == Media.tweet_id)
-                .outerjoin(Like, Tweet.tweet_id == Like.tweet_id)
-                .group_by(Tweet.tweet_id, Tweet.content, Tweet.user_id, User.name, Media.media_url)
-                .order_by(desc(func.count(Like.like_id)))
-            )
-
-            result = await self.session.execute(query)
-            tweets = result.all()
-
-            tweets_list = []
-            for tweet in tweets:
-                # Подготовка данных твита
-                tweet_info = {
-                    "id": tweet.tweet_id,
-                    "content": tweet.content,
-                    "author": {
-                        "id": tweet.user_id,
-                        "name": tweet.user_name,
-                    },
-                    "attachments": [tweet.media_url] if tweet.media_url else [],
-                    "likes": [],
-                }
-
-                # Запрос для получения лайков твита
-                likes_query = (
-                    select(Like.user_id, User.name)
-                    .join(User, Like.user_id == User.user_id)
-                    .where(Like.tweet_id == tweet.tweet_id)
-                )
-                likes_result = await self.session.execute(likes_query)
-                likes = likes_result.all()
-
-                # Подготовка данных о лайках
-                tweet_info["likes"] = [
-                    {"user_id": like.user_id, "name": like.name} for like in likes
-                ]
-
-                tweets_list.append(tweet_info)
-                print(tweet.media_url)
-            return {"result": True, "tweets": tweets_list}
-
-        except Exception as e:
-            await self.session.rollback()
-            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        return await ReadDAL(self.session).get_feed_tweets(window)
 
 
+@traced_methods
 class MediaDAL:
     """
     Класс для работы с медиафайлами в базе данных.
@@ -440,10 +308,10 @@ class MediaDAL:
         :return: Строка с результатом удаления.
         """
         try:
-            # Проверяем, существует ли файл
-            if os.path.exists(file_path):
+            # Проверяем, существует ли файл (без блокировки цикла событий)
+            if await aiofiles.os.path.exists(file_path):
                 # Удаляем файл
-                os.remove(file_path)
+                await aiofiles.os.remove(file_path)
                 return f"File '{file_path}' deleted successfully."
             else:
                 return f"File '{file_path}' does not exist."
@@ -451,13 +319,27 @@ class MediaDAL:
             # Ловим любые ошибки и возвращаем их
             return f"An error occurred: {str(e)}"
 
-    async def create_media_record(self, yadisk_link: str, media_path: str) -> Media:
+    async def create_media_record(
+        self,
+        yadisk_link: str,
+        media_path: str,
+        public_key: str | None = None,
+        user_id: int | None = None,
+        content_type: str | None = None,
+        size_bytes: int | None = None,
+        duration: float | None = None,
+    ) -> Media:
         """
         Создает запись медиафайла в базе данных.
 
         Аргументы:
             yadisk_link (str): Ссылка на медиафайл в Яндекс.Диске.
             media_path (str): Путь к медиафайлу.
+            public_key (str | None): Публичный ключ ресурса на Яндекс.Диске.
+            user_id (int | None): Идентификатор пользователя, загрузившего медиафайл.
+            content_type (str | None): MIME-тип файла.
+            size_bytes (int | None): Размер файла в байтах.
+            duration (float | None): Длительность видео или аудио в секундах.
 
         Возвращает:
             Media: Объект созданного медиафайла.
@@ -465,7 +347,15 @@ class MediaDAL:
         Исключения:
             HTTPException: Если возникает ошибка базы данных при создании записи медиафайла.
         """
-        new_media = Media(media_url=yadisk_link, media_path=media_path)
+        new_media = Media(
+            media_url=yadisk_link,
+            media_path=media_path,
+            public_key=public_key,
+            user_id=user_id,
+            content_type=content_type,
+            size_bytes=size_bytes,
+            duration=duration,
+        )
         self.session.add(new_media)
         try:
             await self.session.commit()
@@ -475,25 +365,94 @@ class MediaDAL:
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
         return new_media
 
-    async def update_media_ids(self, tweet_id: int, tweet_media_ids: list[int]):
+    async def set_media_url(self, media: Media, media_url: str) -> Media:
+        """
+        Сохраняет публичный URL медиафайла, известный только после создания записи.
+
+        Аргументы:
+            media (Media): Объект медиафайла.
+            media_url (str): Публичный URL медиафайла.
+
+        Возвращает:
+            Media: Обновленный объект медиафайла.
+
+        Исключения:
+            HTTPException: Если возникает ошибка базы данных при обновлении записи.
+        """
+        media.media_url = media_url
+        try:
+            await self.session.commit()
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        return media
+
+    async def get_media_by_id(self, media_id: int) -> Media | None:
+        """
+        Получает запись медиафайла по его идентификатору.
+
+        Аргументы:
+            media_id (int): Идентификатор медиафайла.
+
+        Возвращает:
+            Media | None: Объект медиафайла или None, если он не найден.
+
+        Исключения:
+            HTTPException: Если возникает ошибка базы данных.
+        """
+        try:
+            result = await self.session.execute(
+                select(Media).where(Media.media_id == media_id)
+            )
+            return result.scalar_one_or_none()
+        except SQLAlchemyError:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=500, detail="Ошибка получения медиафайла из базы данных"
+            )
+
+    async def update_media_ids(self, tweet_id: int, tweet_media_ids: list[int], user_id: int):
         """
         Обновляет идентификаторы медиафайлов для указанного твита.
 
+        Порядок вложений в ленте соответствует порядку идентификаторов в списке.
+        Прикрепить можно только свои еще не прикрепленные медиафайлы: иначе
+        чужая неприкрепленная загрузка стала бы доступна всем через твит.
+
         Аргументы:
             tweet_id (int): Идентификатор твита.
             tweet_media_ids (list[int]): Список идентификаторов медиафайлов.
+            user_id (int): Идентификатор автора твита.
 
         Исключения:
-            HTTPException: Если возникает ошибка базы данных при обновлении идентификаторов медиафайлов.
+            HTTPException: Медиафайл не найден, чужой или уже прикреплен (400)
+                или возникает ошибка базы данных при обновлении идентификаторов медиафайлов.
         """
         try:
             stmt = (
                 update(Media)
-                .where(Media.media_id.in_(tweet_media_ids))
-                .values(tweet_id=tweet_id)
+                .where(
+                    Media.media_id.in_(tweet_media_ids),
+                    Media.user_id == user_id,
+                    Media.tweet_id.is_(None),
+                )
+                .values(
+                    tweet_id=tweet_id,
+                    position=case(
+                        {media_id: i for i, media_id in enumerate(tweet_media_ids)},
+                        value=Media.media_id,
+                    ),
+                )
             )
-            await self.session.execute(stmt)
+            result = await self.session.execute(stmt)
+            if result.rowcount != len(set(tweet_media_ids)):
+                await self.session.rollback()
+                raise HTTPException(
+                    status_code=400, detail="Медиафайл не найден или недоступен для прикрепления"
+                )
             await self.session.commit()
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
             await self.session.rollback()
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -502,24 +461,27 @@ class MediaDAL:
                 status_code=500, detail=f"Internal server error: {str(e)}"
             )
 
-    async def get_media_urls_by_tweet_id(self, tweet_id: int) -> str:
+    async def get_media_urls_by_tweet_id(self, tweet_id: int) -> list[str]:
         """
-        Получает список URL медиафайлов по идентификатору твита.
+        Получает список путей к медиафайлам по идентификатору твита.
 
         Аргументы:
             tweet_id (int): Идентификатор твита.
 
         Возвращает:
-            str | None: Путь к медиафайлу, или None, если медиафайл не найден.
+            list[str]: Пути к медиафайлам в порядке вложений (пустой, если медиафайлов нет).
 
         Исключения:
             HTTPException: Если возникает ошибка базы данных при получении URL медиафайлов.
         """
         try:
-            query = select(Media.media_path).where(Media.tweet_id == tweet_id)
+            query = (
+                select(Media.media_path)
+                .where(Media.tweet_id == tweet_id)
+                .order_by(Media.position, Media.media_id)
+            )
             result = await self.session.execute(query)
-            media_path = result.scalar()  # Получаем единственное значение
-            return media_path  # Возвращаем путь или None
+            return list(result.scalars().all())
         except SQLAlchemyError:
             await self.session.rollback()
             raise HTTPException(
@@ -528,6 +490,161 @@ class MediaDAL:
             )
 
 
+@traced_methods
+class UploadDAL:
+    """
+    Класс для работы с сессиями возобновляемой загрузки в базе данных.
+
+    Аргументы:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy для взаимодействия с базой данных.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create_upload(
+        self, upload_id: str, user_id: int, filename: str, total_size: int, temp_path: str
+    ) -> UploadSession:
+        """
+        Создает сессию загрузки в базе данных.
+
+        Аргументы:
+            upload_id (str): Идентификатор сессии загрузки.
+            user_id (int): Идентификатор пользователя.
+            filename (str): Исходное имя файла.
+            total_size (int): Полный размер файла в байтах.
+            temp_path (str): Путь к временному файлу.
+
+        Возвращает:
+            UploadSession: Объект созданной сессии загрузки.
+
+        Исключения:
+            HTTPException: Если возникает ошибка базы данных при создании сессии.
+        """
+        upload = UploadSession(
+            upload_id=upload_id,
+            user_id=user_id,
+            filename=filename,
+            total_size=total_size,
+            offset=0,
+            temp_path=temp_path,
+        )
+        self.session.add(upload)
+        try:
+            await self.session.commit()
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        return upload
+
+    async def get_upload(self, upload_id: str, user_id: int) -> UploadSession:
+        """
+        Получает сессию загрузки пользователя.
+
+        Аргументы:
+            upload_id (str): Идентификатор сессии загрузки.
+            user_id (int): Идентификатор пользователя.
+
+        Возвращает:
+            UploadSession: Объект сессии загрузки.
+
+        Исключения:
+            HTTPException: Если сессия не найдена или возникает ошибка базы данных.
+        """
+        try:
+            result = await self.session.execute(
+                select(UploadSession).where(
+                    UploadSession.upload_id == upload_id,
+                    UploadSession.user_id == user_id,
+                )
+            )
+            upload = result.scalar_one_or_none()
+        except SQLAlchemyError:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=500, detail="Ошибка получения сессии загрузки из базы данных"
+            )
+        if upload is None:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return upload
+
+    async def advance_offset(self, upload_id: str, expected_offset: int, new_offset: int) -> bool:
+        """
+        Сдвигает смещение загрузки, если оно не изменилось с начала записи части.
+
+        Аргументы:
+            upload_id (str): Идентификатор сессии загрузки.
+            expected_offset (int): Смещение, с которого записывалась часть.
+            new_offset (int): Новое смещение.
+
+        Возвращает:
+            bool: True, если смещение обновлено, иначе False (конкурентная запись).
+
+        Исключения:
+            HTTPException: Если возникает ошибка базы данных.
+        """
+        try:
+            result = await self.session.execute(
+                update(UploadSession)
+                .where(
+                    UploadSession.upload_id == upload_id,
+                    UploadSession.offset == expected_offset,
+                )
+                .values(offset=new_offset, updated_at=utcnow())
+            )
+            await self.session.commit()
+            return result.rowcount == 1
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    async def delete_stale_uploads(self, inactive_since: datetime) -> list[str]:
+        """
+        Удаляет сессии загрузки, не получавшие частей с указанного времени.
+
+        Аргументы:
+            inactive_since (datetime): Граница времени последней активности (UTC).
+
+        Возвращает:
+            list[str]: Пути временных файлов удаленных сессий.
+
+        Исключения:
+            HTTPException: Если возникает ошибка базы данных.
+        """
+        try:
+            result = await self.session.execute(
+                delete(UploadSession)
+                .where(UploadSession.updated_at < inactive_since)
+                .returning(UploadSession.temp_path)
+            )
+            temp_paths = list(result.scalars().all())
+            await self.session.commit()
+            return temp_paths
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    async def delete_upload(self, upload_id: str):
+        """
+        Удаляет сессию загрузки из базы данных.
+
+        Аргументы:
+            upload_id (str): Идентификатор сессии загрузки.
+
+        Исключения:
+            HTTPException: Если возникает ошибка базы данных.
+        """
+        try:
+            await self.session.execute(
+                delete(UploadSession).where(UploadSession.upload_id == upload_id)
+            )
+            await self.session.commit()
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@traced_methods
 class LikeDAL:
     """
     Класс для работы с лайками в базе данных.
@@ -571,6 +688,7 @@ class LikeDAL:
         await self.session.commit()
 
 
+@traced_methods
 class FollowerDAL:
     """
     Класс для работы с подписками в базе данных.
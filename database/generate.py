@@ -0,0 +1,300 @@
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+
+from loguru import logger
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config import URL, MEDIA_API_URL, SHARD_URLS, TWEET_PARTITIONING, TWEET_PARTITION_SIZE, TWEET_PARTITIONS_AHEAD
+from database.db import create_engine_from_settings
+from database.migrations import ensure_schema
+from database.models import User, Tweet, Like, Follower, Media
+from database.partitions import ensure_partitions
+
+# Таблицы в порядке загрузки: ссылаемые раньше ссылающихся
+TABLES = (User, Follower, Tweet, Media, Like)
+# Столбцы с последовательностями, которые выравниваются после загрузки с явными идентификаторами
+SERIAL_COLUMNS = (("users", "user_id"), ("tweets", "tweet_id"), ("likes", "like_id"), ("media", "media_id"))
+
+# Фиксированное начало ленты: одни и те же параметры всегда дают одни и те же строки
+START_TIME = datetime(2024, 1, 1)
+WORDS = (
+    "coffee", "release", "weekend", "python", "music", "deadline", "travel", "cat", "meetup",
+    "database", "morning", "rain", "pizza", "football", "book", "sunset", "bug", "deploy",
+)
+
+
+class PowerLaw:
+    """
+    Выбор пользователей с вероятностью, убывающей по закону Ципфа: пользователь
+    ранга r выбирается с весом 1 / r^exponent. Ранги случайно перемешаны,
+    поэтому популярность не совпадает с порядком идентификаторов.
+
+    Массивы вместо списков: на миллионах пользователей они в несколько раз компактнее.
+
+    Аргументы:
+        rng (random.Random): Генератор случайных чисел.
+        users (int): Количество пользователей (идентификаторы 1..users).
+        exponent (float): Показатель закона Ципфа.
+        cum_weights (array | None): Накопленные веса другого распределения с тем же показателем.
+    """
+
+    def __init__(self, rng: random.Random, users: int, exponent: float, cum_weights: array | None = None):
+        self.rng = rng
+        self.ranked = array("l", range(1, users + 1))
+        rng.shuffle(self.ranked)
+        self.cum_weights = cum_weights or array(
+            "d", itertools.accumulate(1 / rank ** exponent for rank in range(1, users + 1))
+        )
+
+    def sample(self, k: int) -> list[int]:
+        return self.rng.choices(self.ranked, cum_weights=self.cum_weights, k=k)
+
+
+def heavy_tail(rng: random.Random, mean: float, alpha: float, cap: int) -> int:
+    """
+    Случайное количество с распределением Парето и заданным средним
+    (степень узла графа подписок, количество лайков твита).
+    """
+    if mean <= 0:
+        return 0
+    value = rng.paretovariate(alpha) * mean * (alpha - 1) / alpha
+    # Вероятностное округление сохраняет среднее
+    return min(cap, int(value + rng.random()))
+
+
+class BatchWriter:
+    """
+    Запись строк пачками: COPY на PostgreSQL (asyncpg), executemany на остальных базах.
+
+    Аргументы:
+        conn (AsyncConnection): Соединение с открытой транзакцией.
+        batch_size (int): Количество строк в пачке.
+    """
+
+    def __init__(self, conn: AsyncConnection, batch_size: int):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.copy = conn.dialect.driver == "asyncpg"
+        self.buffers: dict[type, list[dict]] = {model: [] for model in TABLES}
+        self.counts: dict[str, int] = {model.__tablename__: 0 for model in TABLES}
+
+    async def add(self, model, row: dict):
+        buffer = self.buffers[model]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """
+        Записывает накопленные строки всех таблиц в порядке TABLES,
+        чтобы внешние ключи ссылались на уже записанные строки.
+        """
+        for model, rows in self.buffers.items():
+            if not rows:
+                continue
+            if self.copy:
+                columns = list(rows[0])
+                raw = await self.conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    model.__tablename__,
+                    records=[tuple(row[column] for column in columns) for row in rows],
+                    columns=columns,
+                )
+            else:
+                await self.conn.execute(insert(model), rows)
+            self.counts[model.__tablename__] += len(rows)
+            rows.clear()
+
+
+async def generate(
+    engine: AsyncEngine,
+    users: int,
+    tweets: int,
+    follows: float = 20,
+    likes: float = 5,
+    media: float = 0.2,
+    seed: int = 0,
+    exponent: float = 1.0,
+    alpha: float = 2.0,
+    batch_size: int = 10000,
+) -> dict[str, int]:
+    """
+    Заполняет пустую базу синтетическими данными (один шард: идентификаторы
+    выдаются подряд, пользователи на другие шарды не копируются).
+
+    Генерация детерминирована: при одинаковых параметрах и seed строки
+    совпадают на любой базе. Подписки и лайки распределены по степенному
+    закону: количество подписок пользователя и лайков твита - по Парето,
+    выбор, на кого подписаться и кто лайкает, - по закону Ципфа. Строки
+    не накапливаются в памяти, а пишутся пачками по мере генерации.
+
+    Аргументы:
+        engine (AsyncEngine): Движок базы данных со схемой приложения.
+        users (int): Количество пользователей.
+        tweets (int): Количество твитов.
+        follows (float): Среднее количество подписок пользователя.
+        likes (float): Среднее количество лайков твита.
+        media (float): Доля твитов с вложениями (от одного до четырех).
+        seed (int): Начальное значение генератора случайных чисел.
+        exponent (float): Показатель закона Ципфа для популярности пользователей.
+        alpha (float): Показатель распределения Парето (больше 1, меньше - тяжелее хвост).
+        batch_size (int): Количество строк в пачке записи.
+
+    Возвращает:
+        dict[str, int]: Количество записанных строк по таблицам.
+    """
+    rng = random.Random(seed)
+    popularity = PowerLaw(rng, users, exponent)
+    activity = PowerLaw(rng, users, exponent, popularity.cum_weights)
+    step = timedelta(days=365) / max(tweets, 1)
+    media_id = 0
+
+    async with engine.begin() as conn:
+        writer = BatchWriter(conn, batch_size)
+
+        for user_id in range(1, users + 1):
+            await writer.add(User, {"user_id": user_id, "api_key": f"key-{user_id}", "name": f"User{user_id}"})
+        for follower_id in range(1, users + 1):
+            followees = set(popularity.sample(heavy_tail(rng, follows, alpha, users - 1)))
+            followees.discard(follower_id)
+            for followee_id in sorted(followees):
+                await writer.add(Follower, {"follower_id": follower_id, "followee_id": followee_id})
+        await writer.flush()
+
+        # Активные пользователи пишут больше твитов, популярные получают больше лайков
+        for tweet_id in range(1, tweets + 1):
+            author_id = activity.sample(1)[0]
+            await writer.add(
+                Tweet,
+                {
+                    "tweet_id": tweet_id,
+                    "user_id": author_id,
+                    "content": " ".join(rng.choices(WORDS, k=rng.randint(3, 12))),
+                    "timestamp": START_TIME + step * tweet_id,
+                },
+            )
+            if rng.random() < media:
+                for position in range(rng.randint(1, 4)):
+                    media_id += 1
+                    path = f"generated/{media_id % 256:02x}/{media_id}.jpg"
+                    await writer.add(
+                        Media,
+                        {
+                            "media_id": media_id,
+                            "media_url": f"{MEDIA_API_URL}/{media_id}",
+                            "media_path": path,
+                            "tweet_id": tweet_id,
+                            "position": position,
+                            "user_id": author_id,
+                            "content_type": "image/jpeg",
+                            "size_bytes": rng.randint(20_000, 2_000_000),
+                        },
+                    )
+            for user_id in sorted(set(popularity.sample(heavy_tail(rng, likes, alpha, users)))):
+                await writer.add(Like, {"user_id": user_id, "tweet_id": tweet_id})
+        await writer.flush()
+
+    await _finish(engine)
+    return writer.counts
+
+
+async def _finish(engine: AsyncEngine):
+    # Идентификаторы выданы явно: последовательности продолжают после них
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            for table, column in SERIAL_COLUMNS:
+                await conn.execute(
+                    text(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+                        f"coalesce(max({column}), 0) + 1, false) FROM {table}"
+                    )
+                )
+        # Статистика планировщика по загруженным данным
+        await conn.execute(text("ANALYZE"))
+
+
+async def reset_data(engine: AsyncEngine):
+    """
+    Удаляет данные приложения (схема и версия миграций остаются).
+    """
+    tables = ("likes", "media", "upload_sessions", "followers", "tweets", "users")
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY"))
+        else:
+            for table in tables:
+                await conn.execute(text(f"DELETE FROM {table}"))
+
+
+def pareto_alpha(value: str) -> float:
+    """
+    Проверяет показатель распределения Парето: при alpha <= 1 среднее бесконечно.
+    """
+    alpha = float(value)
+    if alpha <= 1:
+        raise argparse.ArgumentTypeError("показатель распределения Парето должен быть больше 1")
+    return alpha
+
+
+async def run(args: argparse.Namespace) -> bool:
+    # Строки шардированной установки пришлось бы раскладывать по шардам автора
+    # с идентификаторами id % количество шардов и копировать пользователей
+    if SHARD_URLS:
+        logger.error("Synthetic data generation supports a single database only, unset SHARD_URLS")
+        return False
+    engine = create_engine_from_settings(args.url)
+    try:
+        await ensure_schema(engine)
+        if args.reset:
+            await reset_data(engine)
+        else:
+            async with engine.connect() as conn:
+                if (await conn.execute(select(func.count(User.user_id)))).scalar():
+                    logger.info("Database already contains data, use --reset to overwrite it")
+                    return False
+        if TWEET_PARTITIONING and engine.dialect.name == "postgresql":
+            await ensure_partitions(engine, ahead=args.tweets // TWEET_PARTITION_SIZE + TWEET_PARTITIONS_AHEAD)
+
+        started = time.perf_counter()
+        counts = await generate(
+            engine,
+            users=args.users,
+            tweets=args.tweets,
+            follows=args.follows,
+            likes=args.likes,
+            media=args.media,
+            seed=args.seed,
+            exponent=args.exponent,
+            alpha=args.alpha,
+            batch_size=args.batch_size,
+        )
+        logger.info("Synthetic data created", extra={"rows": counts, "seconds": round(time.perf_counter() - started, 1)})
+        return True
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных для нагрузочных тестов")
+    parser.add_argument("--url", default=URL, help="база данных (по умолчанию URL из настроек)")
+    parser.add_argument("--users", type=int, default=10_000, help="количество пользователей")
+    parser.add_argument("--tweets", type=int, default=100_000, help="количество твитов")
+    parser.add_argument("--follows", type=float, default=20, help="среднее количество подписок пользователя")
+    parser.add_argument("--likes", type=float, default=5, help="среднее количество лайков твита")
+    parser.add_argument("--media", type=float, default=0.2, help="доля твитов с вложениями")
+    parser.add_argument("--seed", type=int, default=0, help="начальное значение генератора")
+    parser.add_argument("--exponent", type=float, default=1.0, help="показатель закона Ципфа для популярности")
+    parser.add_argument("--alpha", type=pareto_alpha, default=2.0, help="показатель распределения Парето (> 1)")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="количество строк в пачке записи")
+    parser.add_argument("--reset", action="store_true", help="удалить существующие данные перед генерацией")
+    args = parser.parse_args()
+
+    # Ненулевой код возврата, если генерация отказалась запускаться
+    sys.exit(0 if asyncio.run(run(args)) else 1)
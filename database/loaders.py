@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+
+class DataLoader:
+    """
+    Пакетный загрузчик в духе DataLoader, живущий в пределах одного запроса.
+
+    Ключи, запрошенные через load() в течение одного оборота цикла событий,
+    собираются в один вызов batch_load; результаты запоминаются, и повторный
+    запрос того же ключа не обращается к базе.
+
+    Аргументы:
+        batch_load (Callable[[list], Awaitable[dict]]): Загружает значения для списка ключей
+            и возвращает словарь ключ -> значение (отсутствующие ключи дают None).
+        max_batch_size (int): Максимальное количество ключей в одном вызове batch_load.
+    """
+
+    def __init__(
+        self,
+        batch_load: Callable[[list], Awaitable[dict]],
+        max_batch_size: int = 500,
+    ):
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self._results: dict[Hashable, asyncio.Future] = {}
+        self._queue: list[Hashable] = []
+        self._dispatch_scheduled = False
+        self._tasks: set[asyncio.Task] = set()
+        # Пакеты выполняются по очереди: они используют одну сессию базы данных
+        self._lock = asyncio.Lock()
+
+    def load(self, key: Hashable) -> Awaitable[Any]:
+        """
+        Возвращает future со значением для ключа.
+
+        Аргументы:
+            key (Hashable): Ключ (например, идентификатор пользователя).
+
+        Возвращает:
+            Awaitable[Any]: Значение или None, если ключ не найден.
+        """
+        future = self._results.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._results[key] = future
+            self._queue.append(key)
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                # Отправка откладывается до следующего оборота цикла событий,
+                # чтобы собрать все ключи, запрошенные синхронно до него
+                loop.call_soon(self._dispatch)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> dict:
+        """
+        Загружает значения для нескольких ключей одним пакетом.
+
+        Аргументы:
+            keys (Iterable[Hashable]): Ключи.
+
+        Возвращает:
+            dict: Словарь ключ -> значение.
+        """
+        keys = list(dict.fromkeys(keys))
+        values = await asyncio.gather(*(self.load(key) for key in keys))
+        return dict(zip(keys, values))
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        self._dispatch_scheduled = False
+        task = asyncio.ensure_future(self._run(keys))
+        # Ссылка на задачу хранится до ее завершения
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, keys: list):
+        async with self._lock:
+            for i in range(0, len(keys), self.max_batch_size):
+                chunk = keys[i:i + self.max_batch_size]
+                try:
+                    self.batches += 1
+                    values = await self.batch_load(chunk)
+                except Exception as e:
+                    for key in chunk:
+                        # Неудачный ключ не запоминается: следующий load() повторит запрос
+                        future = self._results.pop(key)
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for key in chunk:
+                    future = self._results[key]
+                    if not future.done():
+                        future.set_result(values.get(key))
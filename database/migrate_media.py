@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.db import async_session
+from database.models import Media
+from database.shards import ShardRouter
+from database.storage import LocalStorage, media_storage
+
+# Количество записей, обрабатываемых в одной транзакции
+BATCH_SIZE = 1000
+
+
+async def migrate_media(
+    storage: LocalStorage = media_storage,
+    dry_run: bool = False,
+    session_factory: async_sessionmaker = async_session,
+) -> int:
+    """
+    Переносит медиафайлы из плоского каталога в шардированную структуру
+    и обновляет пути и URL в базе данных.
+
+    Записи обходятся пакетами по идентификатору, каждый пакет фиксируется
+    отдельной транзакцией. Прерванную миграцию можно безопасно перезапустить.
+
+    Аргументы:
+        storage (LocalStorage): Хранилище медиафайлов.
+        dry_run (bool): Только посчитать файлы, которые будут перенесены.
+        session_factory (async_sessionmaker): Фабрика сессий базы данных.
+
+    Возвращает:
+        int: Количество перенесенных (или подлежащих переносу) файлов.
+    """
+    migrated = 0
+    last_id = 0
+
+    async with session_factory() as session:
+        while True:
+            result = await session.execute(
+                select(Media)
+                .where(Media.media_id > last_id)
+                .order_by(Media.media_id)
+                .limit(BATCH_SIZE)
+            )
+            batch = result.scalars().all()
+            if not batch:
+                break
+            last_id = batch[-1].media_id
+
+            for media in batch:
+                relative_path = storage.relative_path(media.media_path)
+                # Файлы вне хранилища и уже разложенные по каталогам пропускаем
+                if relative_path is None or "/" in relative_path:
+                    continue
+
+                if dry_run:
+                    migrated += 1
+                    continue
+
+                try:
+                    new_relative_path = await storage.move_to_shard(media.media_path)
+                except FileNotFoundError:
+                    logger.warning(f"Media file not found: {media.media_path}")
+                    continue
+
+                media.media_path = storage.absolute_path(new_relative_path)
+                media.media_url = storage.media_url(media.media_id)
+                migrated += 1
+
+            await session.commit()
+            logger.info(f"Media migration: processed up to media_id={last_id}")
+
+    return migrated
+
+
+async def migrate_all_shards(
+    router: ShardRouter, storage: LocalStorage = media_storage, dry_run: bool = False
+) -> int:
+    """
+    Переносит медиафайлы всех шардов: записи медиа лежат на шарде автора.
+
+    Аргументы:
+        router (ShardRouter): Маршрутизатор шардов.
+        storage (LocalStorage): Хранилище медиафайлов.
+        dry_run (bool): Только посчитать файлы, которые будут перенесены.
+
+    Возвращает:
+        int: Количество перенесенных (или подлежащих переносу) файлов на всех шардах.
+    """
+    migrated = 0
+    for shard in router.shards:
+        migrated += await migrate_media(storage, dry_run=dry_run, session_factory=shard.session)
+    return migrated
+
+
+if __name__ == "__main__":
+    from database.shards import shard_router
+
+    parser = argparse.ArgumentParser(
+        description="Перенос медиафайлов в шардированную структуру каталогов"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="только показать количество файлов"
+    )
+    args = parser.parse_args()
+
+    count = asyncio.run(migrate_all_shards(shard_router, dry_run=args.dry_run))
+    logger.info(f"Media files to migrate: {count}" if args.dry_run else f"Migrated media files: {count}")
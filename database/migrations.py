@@ -0,0 +1,214 @@
+from typing import Awaitable, Callable
+
+import sqlalchemy
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from database.models import Base
+
+# Ключ advisory-блокировки PostgreSQL: миграции выполняет только один воркер
+MIGRATION_LOCK_ID = 7_315_002
+
+
+async def _create_base_schema(conn: AsyncConnection):
+    """
+    Создает отсутствующие таблицы (существующие таблицы не изменяются).
+    """
+    await conn.run_sync(Base.metadata.create_all)
+
+
+def _column_exists(sync_conn, table_name: str, column_name: str) -> bool:
+    """
+    Проверяет, есть ли столбец в таблице базы данных.
+    """
+    columns = sqlalchemy.inspect(sync_conn).get_columns(table_name)
+    return any(column["name"] == column_name for column in columns)
+
+
+async def _add_column(conn: AsyncConnection, table_name: str, column_name: str, definition: str):
+    """
+    Добавляет столбец, если его еще нет (в новой базе его создает базовая схема).
+    """
+    if await conn.run_sync(_column_exists, table_name, column_name):
+        return
+    ddl = f'ALTER TABLE {table_name} ADD COLUMN "{column_name}" {definition}'
+    logger.info(f"Migration: {ddl}")
+    await conn.execute(text(ddl))
+
+
+async def _create_indexes(conn: AsyncConnection, indexes: list[tuple[str, str, str]]):
+    """
+    Создает индексы из списка (имя, таблица, столбцы), если их еще нет.
+    """
+    for index_name, table_name, columns in indexes:
+        await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"))
+
+
+# Версия 2: столбцы вложений, хранилища и видео в таблице media
+MEDIA_COLUMNS = [
+    ("public_key", "VARCHAR"),
+    ("position", "INTEGER NOT NULL DEFAULT 0"),
+    ("user_id", "INTEGER REFERENCES users (user_id)"),
+    ("content_type", "VARCHAR"),
+    ("size_bytes", "BIGINT"),
+    ("duration", "FLOAT"),
+]
+
+
+async def _add_media_columns(conn: AsyncConnection):
+    """
+    Добавляет в таблицу media столбцы порядка вложений, владельца, Яндекс.Диска и видео.
+    """
+    for column_name, definition in MEDIA_COLUMNS:
+        await _add_column(conn, "media", column_name, definition)
+
+
+# Версия 3: индексы по новым столбцам и столбцам, по которым идет поиск
+INDEXES_V3 = [
+    ("ix_tweets_timestamp", "tweets", '"timestamp"'),
+    ("ix_likes_user_id", "likes", "user_id"),
+    ("ix_media_user_id", "media", "user_id"),
+    ("ix_upload_sessions_user_id", "upload_sessions", "user_id"),
+    ("ix_upload_sessions_created_at", "upload_sessions", "created_at"),
+]
+
+
+async def _create_lookup_indexes(conn: AsyncConnection):
+    """
+    Создает индексы для выборок по автору, времени и владельцу медиафайла.
+    """
+    await _create_indexes(conn, INDEXES_V3)
+
+
+# Версия 4: составные индексы
+COMPOSITE_INDEXES = [
+    ("ix_tweets_user_id_timestamp", "tweets", 'user_id, "timestamp" DESC'),
+    ("ix_followers_followee_id_follower_id", "followers", "followee_id, follower_id"),
+    ("ix_likes_tweet_id_user_id", "likes", "tweet_id, user_id"),
+    ("ix_media_tweet_id_position_media_id", "media", 'tweet_id, "position", media_id'),
+]
+
+# Одностолбцовые индексы, ставшие префиксами составных индексов или первичных ключей
+OBSOLETE_INDEXES = [
+    "ix_tweets_user_id",
+    "ix_likes_tweet_id",
+    "ix_followers_follower_id",
+    "ix_followers_followee_id",
+    "ix_media_media_id",
+    "ix_media_tweet_id",
+]
+
+
+async def _replace_single_column_indexes(conn: AsyncConnection):
+    """
+    Создает составные индексы и удаляет избыточные одностолбцовые индексы.
+    """
+    await _create_indexes(conn, COMPOSITE_INDEXES)
+    for index_name in OBSOLETE_INDEXES:
+        await conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+
+async def _add_upload_updated_at(conn: AsyncConnection):
+    """
+    Добавляет в сессии загрузки время последней активности.
+
+    Существующим сессиям проставляется время создания, индекс по времени
+    создания больше не нужен: очистка идет по времени активности.
+    """
+    column_type = sqlalchemy.DateTime().compile(dialect=conn.dialect)
+    await _add_column(conn, "upload_sessions", "updated_at", column_type)
+    await conn.execute(
+        text("UPDATE upload_sessions SET updated_at = created_at WHERE updated_at IS NULL")
+    )
+    await _create_indexes(conn, [("ix_upload_sessions_updated_at", "upload_sessions", "updated_at")])
+    await conn.execute(text("DROP INDEX IF EXISTS ix_upload_sessions_created_at"))
+
+
+# Упорядоченный список миграций: (версия, описание, функция).
+# Каждая миграция идемпотентна, новые миграции добавляются только в конец.
+MIGRATIONS: list[tuple[int, str, Callable[[AsyncConnection], Awaitable[None]]]] = [
+    (1, "base schema", _create_base_schema),
+    (2, "media columns for attachments, storage and video", _add_media_columns),
+    (3, "lookup indexes for timelines, likes, media and uploads", _create_lookup_indexes),
+    (4, "composite indexes for feed, likes, followers and media", _replace_single_column_indexes),
+    (5, "upload session activity time", _add_upload_updated_at),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+async def get_schema_version(engine: AsyncEngine) -> int:
+    """
+    Возвращает текущую версию схемы базы данных.
+
+    Аргументы:
+        engine (AsyncEngine): Асинхронный движок SQLAlchemy.
+
+    Возвращает:
+        int: Версия схемы; 0, если схема еще не создавалась.
+    """
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT version FROM schema_version"))
+            return result.scalar() or 0
+    except DBAPIError:
+        # Таблицы версий еще нет
+        return 0
+
+
+async def migrate(engine: AsyncEngine) -> int:
+    """
+    Применяет к базе данных все недостающие миграции.
+
+    Аргументы:
+        engine (AsyncEngine): Асинхронный движок SQLAlchemy.
+
+    Возвращает:
+        int: Версия схемы после применения миграций.
+    """
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID}
+            )
+
+        await conn.execute(
+            text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+        )
+        current = (await conn.execute(text("SELECT version FROM schema_version"))).scalar()
+        if current is None:
+            await conn.execute(text("INSERT INTO schema_version (version) VALUES (0)"))
+            current = 0
+
+        # Другой воркер мог применить миграции, пока мы ждали блокировку
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info(f"Applying migration {version}: {description}")
+            await step(conn)
+            await conn.execute(
+                text("UPDATE schema_version SET version = :version"), {"version": version}
+            )
+            current = version
+
+    return current
+
+
+async def ensure_schema(engine: AsyncEngine) -> int:
+    """
+    Проверяет версию схемы и при необходимости применяет миграции.
+
+    В обычном случае выполняет один запрос к таблице версий.
+
+    Аргументы:
+        engine (AsyncEngine): Асинхронный движок SQLAlchemy.
+
+    Возвращает:
+        int: Версия схемы.
+    """
+    version = await get_schema_version(engine)
+    if version >= LATEST_VERSION:
+        return version
+    return await migrate(engine)
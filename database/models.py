@@ -1,8 +1,13 @@
+from datetime import datetime, timezone
+
 from sqlalchemy import (
+    BigInteger,
     Column,
+    Float,
     Integer,
     ForeignKey,
     DateTime,
+    Index,
     Text,
     String,
     UniqueConstraint,
@@ -11,9 +16,28 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
+from config import TWEET_PARTITIONING
+
 Base = declarative_base()
 
 
+def utcnow() -> datetime:
+    """
+    Возвращает текущее время в UTC без часового пояса.
+
+    Метки времени сессий загрузки формируются на стороне приложения: func.now()
+    в PostgreSQL возвращает время в часовом поясе сессии, и сравнение с границей
+    из приложения зависело бы от настроек сервера.
+
+    Возвращает:
+        datetime: Текущее время UTC (naive).
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+# Параметры таблиц, секционируемых по диапазонам tweet_id
+PARTITION_ARGS = {"postgresql_partition_by": "RANGE (tweet_id)"} if TWEET_PARTITIONING else {}
+
+
 class User(Base):
     """
     Модель пользователя
@@ -56,7 +80,7 @@ class Tweet(Base):
     __tablename__ = "tweets"
 
     tweet_id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=func.now(), index=True)
 
@@ -67,6 +91,13 @@ class Tweet(Base):
         back_populates="tweet",
         cascade="all, delete-orphan",
         single_parent=True,
+        order_by="[Media.position, Media.media_id]",
+    )
+
+    # Твиты автора от новых к старым; заменяет индекс по одному user_id
+    __table_args__ = (
+        Index("ix_tweets_user_id_timestamp", user_id, timestamp.desc()),
+        PARTITION_ARGS,
     )
 
 
@@ -80,12 +111,9 @@ class Follower(Base):
 
     __tablename__ = "followers"
 
-    follower_id = Column(
-        Integer, ForeignKey("users.user_id"), primary_key=True, index=True
-    )
-    followee_id = Column(
-        Integer, ForeignKey("users.user_id"), primary_key=True, index=True
-    )
+    # Первичный ключ (follower_id, followee_id) обслуживает список подписок
+    follower_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    followee_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
 
     follower = relationship(
         "User", foreign_keys=[follower_id], back_populates="followers", lazy="joined"
@@ -94,6 +122,11 @@ class Follower(Base):
         "User", foreign_keys=[followee_id], back_populates="followees", lazy="joined"
     )
 
+    # Покрывающий индекс для списка подписчиков пользователя
+    __table_args__ = (
+        Index("ix_followers_followee_id_follower_id", followee_id, follower_id),
+    )
+
 
 class Like(Base):
     """
@@ -106,33 +139,86 @@ class Like(Base):
 
     __tablename__ = "likes"
 
-    like_id = Column(Integer, primary_key=True)
+    like_id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False, index=True)
+    # Первичный ключ секционированной таблицы обязан включать ключ секционирования
     tweet_id = Column(
-        Integer, ForeignKey("tweets.tweet_id"), nullable=False, index=True
+        Integer,
+        ForeignKey("tweets.tweet_id"),
+        nullable=False,
+        primary_key=TWEET_PARTITIONING,
     )
 
     user = relationship("User", back_populates="likes")
     tweet = relationship("Tweet", back_populates="likes")
 
-    # Добавление уникального индекса на столбцы user_id и tweet_id
-    __table_args__ = (UniqueConstraint("user_id", "tweet_id", name="unique_like"),)
+    __table_args__ = (
+        # Добавление уникального индекса на столбцы user_id и tweet_id
+        UniqueConstraint("user_id", "tweet_id", name="unique_like"),
+        # Покрывающий индекс для подсчета и выборки лайков по твиту
+        Index("ix_likes_tweet_id_user_id", tweet_id, user_id),
+        PARTITION_ARGS,
+    )
 
 
 class Media(Base):
     """
-    Модель медиа (изображения)
+    Модель медиа (изображения или видео)
 
     :param media_id: Идентификатор медиа (первичный ключ)
     :param media_url: URL медиа (уникальный)
+    :param media_path: Путь к файлу медиа (уникальный)
     :param tweet_id: Идентификатор твита (внешний ключ)
+    :param public_key: Публичный ключ ресурса на Яндекс.Диске (кэш метаданных)
+    :param position: Порядковый номер вложения в твите
+    :param user_id: Идентификатор пользователя, загрузившего медиа (внешний ключ)
+    :param content_type: MIME-тип файла
+    :param size_bytes: Размер файла в байтах
+    :param duration: Длительность видео или аудио в секундах
     """
 
     __tablename__ = "media"
 
-    media_id = Column(Integer, primary_key=True, index=True)
+    media_id = Column(Integer, primary_key=True)
     media_url = Column(String, nullable=False, unique=True)
     media_path = Column(String, nullable=False, unique=True)
-    tweet_id = Column(Integer, ForeignKey("tweets.tweet_id"), index=True)
+    tweet_id = Column(Integer, ForeignKey("tweets.tweet_id"))
+    public_key = Column(String, nullable=True)
+    position = Column(Integer, nullable=False, default=0, server_default="0")
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=True, index=True)
+    content_type = Column(String, nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
+    duration = Column(Float, nullable=True)
 
     tweet = relationship("Tweet", back_populates="media")
+
+    # Вложения твита в порядке отображения без отдельной сортировки
+    __table_args__ = (
+        Index("ix_media_tweet_id_position_media_id", tweet_id, position, media_id),
+    )
+
+
+class UploadSession(Base):
+    """
+    Модель сессии возобновляемой загрузки медиафайла
+
+    :param upload_id: Идентификатор сессии загрузки (первичный ключ)
+    :param user_id: Идентификатор пользователя, выполняющего загрузку (внешний ключ)
+    :param filename: Исходное имя загружаемого файла
+    :param total_size: Полный размер файла в байтах
+    :param offset: Количество байт, уже записанных подряд с начала файла
+    :param temp_path: Путь к временному файлу загрузки
+    :param created_at: Временная метка создания сессии (UTC)
+    :param updated_at: Временная метка последней принятой части (UTC)
+    """
+
+    __tablename__ = "upload_sessions"
+
+    upload_id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    offset = Column(BigInteger, nullable=False, default=0)
+    temp_path = Column(String, nullable=False)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, index=True)
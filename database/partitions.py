@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import re
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config import TWEET_PARTITION_SIZE, TWEET_PARTITIONS_AHEAD, TWEET_PARTITION_CHECK_INTERVAL
+
+# Таблицы, секционированные по диапазонам tweet_id, с одинаковыми границами секций.
+# Порядок важен при отсоединении: сначала ссылающиеся таблицы, затем tweets.
+PARTITIONED_TABLES = ("likes", "tweets")
+
+# Схема, в которую переносятся отсоединенные секции
+ARCHIVE_SCHEMA = "archive"
+
+# Сколько ждать блокировку родительской таблицы, чтобы не выстраивать очередь запросов
+LOCK_TIMEOUT = "5s"
+
+# Ключ advisory-блокировки PostgreSQL: секции создает только один воркер
+PARTITION_LOCK_ID = 7_315_003
+
+BOUND_RE = re.compile(r"FROM \((\d+)\) TO \((\d+)\)")
+
+
+def partition_name(table: str, start: int, size: int = TWEET_PARTITION_SIZE) -> str:
+    """
+    Возвращает имя секции таблицы, начинающейся с идентификатора start.
+
+    Аргументы:
+        table (str): Имя секционированной таблицы.
+        start (int): Нижняя граница секции (включительно).
+        size (int): Размер секции в идентификаторах.
+
+    Возвращает:
+        str: Имя секции, например "tweets_p3".
+    """
+    return f"{table}_p{start // size}"
+
+
+def partition_start(name: str, size: int = TWEET_PARTITION_SIZE) -> int:
+    """
+    Возвращает нижнюю границу секции по ее имени (обратное к partition_name).
+
+    Аргументы:
+        name (str): Имя секции, например "tweets_p3".
+        size (int): Размер секции в идентификаторах.
+
+    Возвращает:
+        int: Нижняя граница секции.
+    """
+    return int(name.rsplit("_p", 1)[1]) * size
+
+
+def partition_ranges(max_id: int, ahead: int, size: int = TWEET_PARTITION_SIZE) -> list[tuple[int, int]]:
+    """
+    Возвращает границы секций от секции с max_id до ahead секций вперед.
+
+    Аргументы:
+        max_id (int): Наибольший существующий идентификатор твита.
+        ahead (int): Количество секций, создаваемых заранее.
+        size (int): Размер секции в идентификаторах.
+
+    Возвращает:
+        list[tuple[int, int]]: Нижние (включительно) и верхние (исключительно) границы.
+    """
+    first = max_id // size
+    return [(n * size, (n + 1) * size) for n in range(first, first + ahead + 1)]
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    """
+    Проверяет, является ли таблица секционированной.
+    """
+    result = await conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace"
+        ),
+        {"table": table},
+    )
+    return result.scalar() is not None
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> list[tuple[str, int, int]]:
+    """
+    Возвращает секции таблицы с их границами, упорядоченные по нижней границе.
+
+    Аргументы:
+        conn (AsyncConnection): Соединение с базой данных.
+        table (str): Имя секционированной таблицы.
+
+    Возвращает:
+        list[tuple[str, int, int]]: Имя секции, нижняя и верхняя граница.
+    """
+    result = await conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table AND p.relnamespace = 'public'::regnamespace"
+        ),
+        {"table": table},
+    )
+    partitions = []
+    for name, bound in result:
+        match = BOUND_RE.search(bound or "")
+        if match:
+            partitions.append((name, int(match.group(1)), int(match.group(2))))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def ensure_partitions(
+    engine: AsyncEngine,
+    ahead: int = TWEET_PARTITIONS_AHEAD,
+    size: int = TWEET_PARTITION_SIZE,
+) -> list[str]:
+    """
+    Создает секцию для текущих твитов и ahead секций вперед, если их еще нет.
+
+    Секции создаются заранее, поэтому вставка твита никогда не упирается
+    в отсутствующую секцию, а короткая блокировка родительской таблицы
+    приходится на фоновую задачу, а не на запрос пользователя. Воркеры,
+    запущенные одновременно, создают секции по очереди (advisory-блокировка).
+
+    Аргументы:
+        engine (AsyncEngine): Асинхронный движок SQLAlchemy.
+        ahead (int): Количество секций, создаваемых заранее.
+        size (int): Размер секции в идентификаторах.
+
+    Возвращает:
+        list[str]: Имена созданных секций.
+    """
+    created = []
+    async with engine.begin() as conn:
+        # Список секций читается после блокировки: другой воркер мог их уже создать
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": PARTITION_LOCK_ID}
+        )
+        for table in PARTITIONED_TABLES:
+            if not await is_partitioned(conn, table):
+                logger.warning(
+                    f"Table {table} is not partitioned: partitioning applies only to a new database"
+                )
+                return created
+
+        max_id = (await conn.execute(text("SELECT coalesce(max(tweet_id), 0) FROM tweets"))).scalar()
+        await conn.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+
+        # tweets раньше likes: так секции ссылаемой таблицы всегда существуют
+        for table in reversed(PARTITIONED_TABLES):
+            existing = {name for name, _, _ in await list_partitions(conn, table)}
+            for start, end in partition_ranges(max_id, ahead, size):
+                name = partition_name(table, start, size)
+                if name in existing:
+                    continue
+                await conn.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM ({start}) TO ({end})"
+                    )
+                )
+                created.append(name)
+
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+
+async def archive_partitions(
+    engine: AsyncEngine, before_id: int, size: int = TWEET_PARTITION_SIZE
+) -> list[str]:
+    """
+    Отсоединяет секции с твитами младше before_id и переносит их в схему archive.
+
+    DETACH PARTITION CONCURRENTLY (PostgreSQL 14+) не блокирует чтение и запись
+    родительской таблицы. Отсоединенные таблицы остаются в базе: их можно
+    выгрузить pg_dump и удалить или перенести в другое табличное пространство.
+    Медиа этих твитов переносятся в архивную таблицу media_<секция>.
+
+    Каждый шаг проверяет, не выполнен ли он уже, поэтому прерванный запуск
+    можно повторить: незавершенное отсоединение доводится до конца (FINALIZE),
+    а отсоединенные, но не перенесенные секции подбираются из схемы public.
+
+    Аргументы:
+        engine (AsyncEngine): Асинхронный движок SQLAlchemy.
+        before_id (int): Архивируются секции, целиком лежащие ниже этого идентификатора.
+        size (int): Размер секции в идентификаторах.
+
+    Возвращает:
+        list[str]: Имена заархивированных секций.
+    """
+    # CONCURRENTLY нельзя выполнять внутри транзакции
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+
+        candidates = {
+            name: start
+            for name, start, end in await list_partitions(conn, "tweets")
+            if end <= before_id
+        }
+        # Секции, отсоединенные прерванным запуском, но еще не перенесенные в archive
+        for name in await _detached_partitions(conn, "tweets"):
+            start = partition_start(name, size)
+            if start + size <= before_id:
+                candidates[name] = start
+
+        archived = []
+        for name, start in sorted(candidates.items(), key=lambda candidate: candidate[1]):
+            end = start + size
+
+            # Лайки ссылаются на tweets: отсоединяем их первыми и снимаем внешние ключи,
+            # иначе отсоединение секции tweets нарушит ссылочную целостность
+            likes_name = partition_name("likes", start, size)
+            await _detach_partition(conn, "likes", likes_name)
+
+            # Перенос медиа в одной транзакции: повторный запуск не создаст дубликатов
+            media_name = f"media_p{start // size}"
+            async with engine.begin() as media_conn:
+                await media_conn.execute(
+                    text(
+                        f"CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{media_name} "
+                        f"(LIKE media INCLUDING DEFAULTS)"
+                    )
+                )
+                await media_conn.execute(
+                    text(
+                        f"INSERT INTO {ARCHIVE_SCHEMA}.{media_name} "
+                        f"SELECT * FROM media WHERE tweet_id >= {start} AND tweet_id < {end}"
+                    )
+                )
+                await media_conn.execute(
+                    text(f"DELETE FROM media WHERE tweet_id >= {start} AND tweet_id < {end}")
+                )
+
+            await _detach_partition(conn, "tweets", name)
+
+            for table_name in (likes_name, name):
+                if await _partition_state(conn, table_name) is not None:
+                    await conn.execute(text(f"ALTER TABLE {table_name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+            archived.append(name)
+            logger.info(f"Archived partition {name} (tweet_id {start}..{end - 1})")
+
+    return archived
+
+
+async def _partition_state(conn: AsyncConnection, name: str) -> str | None:
+    """
+    Возвращает состояние секции в схеме public: "attached", "pending"
+    (DETACH CONCURRENTLY прерван), "detached" или None, если таблицы там нет.
+    """
+    result = await conn.execute(
+        text(
+            "SELECT i.inhdetachpending FROM pg_class c "
+            "LEFT JOIN pg_inherits i ON i.inhrelid = c.oid "
+            "WHERE c.relname = :name AND c.relnamespace = 'public'::regnamespace"
+        ),
+        {"name": name},
+    )
+    row = result.first()
+    if row is None:
+        return None
+    if row[0] is None:
+        return "detached"
+    return "pending" if row[0] else "attached"
+
+
+async def _detached_partitions(conn: AsyncConnection, table: str) -> list[str]:
+    """
+    Возвращает имена отсоединенных секций таблицы, оставшихся в схеме public.
+    """
+    result = await conn.execute(
+        text(
+            "SELECT relname FROM pg_class "
+            "WHERE relnamespace = 'public'::regnamespace AND relkind = 'r' "
+            "AND NOT relispartition AND relname ~ :pattern"
+        ),
+        {"pattern": f"^{table}_p[0-9]+$"},
+    )
+    return list(result.scalars().all())
+
+
+async def _detach_partition(conn: AsyncConnection, table: str, name: str):
+    """
+    Отсоединяет секцию, если она еще присоединена, и снимает ее внешние ключи.
+    """
+    state = await _partition_state(conn, name)
+    if state is None:
+        return
+    if state == "attached":
+        await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY"))
+    elif state == "pending":
+        await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name} FINALIZE"))
+    await _drop_foreign_keys(conn, name)
+
+
+async def _drop_foreign_keys(conn: AsyncConnection, table: str):
+    """
+    Удаляет внешние ключи отсоединенной секции.
+    """
+    result = await conn.execute(
+        text(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+        ),
+        {"table": table},
+    )
+    for (constraint,) in result.all():
+        await conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{constraint}"'))
+
+
+async def partition_maintenance(engine: AsyncEngine, interval: float = TWEET_PARTITION_CHECK_INTERVAL):
+    """
+    Периодически создает будущие секции. Запускается фоновой задачей приложения
+    после того, как ensure_partitions выполнена при старте.
+
+    Аргументы:
+        engine (AsyncEngine): Асинхронный движок SQLAlchemy.
+        interval (float): Период проверки в секундах.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await ensure_partitions(engine)
+        except Exception as e:
+            logger.error(f"Partition maintenance failed: {e}")
+
+
+if __name__ == "__main__":
+    from database.db import engine
+
+    parser = argparse.ArgumentParser(description="Обслуживание секций tweets и likes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("ensure", help="создать текущую и будущие секции")
+    archive_parser = subparsers.add_parser("archive", help="отсоединить старые секции")
+    archive_parser.add_argument(
+        "--before-id", type=int, required=True, help="архивировать секции ниже этого tweet_id"
+    )
+    args = parser.parse_args()
+
+    if args.command == "ensure":
+        asyncio.run(ensure_partitions(engine))
+    else:
+        asyncio.run(archive_partitions(engine, args.before_id))
@@ -0,0 +1,99 @@
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import SQL_REPEAT_THRESHOLD, SQL_REPEAT_RAISE
+
+# Списки значений IN (...) разной длины приводятся к одной форме запроса
+IN_LIST_RE = re.compile(r"\((?:\s*(?:\?|\$\d+|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|\$\d+|%s|%\(\w+\)s|:\w+)\s*\)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+class RepeatedQueryError(RuntimeError):
+    """
+    Один и тот же запрос выполнен в запросе к API больше допустимого числа раз (N+1).
+    """
+
+
+class QueryStats:
+    """
+    Счетчики SQL одного запроса к API: количество выражений, время в базе
+    и число повторов каждой формы запроса.
+
+    Аргументы:
+        repeat_threshold (int): Сколько раз форма запроса может повториться (0 - без проверки).
+        raise_on_repeat (bool): Выбросить RepeatedQueryError при превышении порога.
+    """
+
+    __slots__ = ("count", "duration", "shapes", "repeated", "repeat_threshold", "raise_on_repeat")
+
+    def __init__(self, repeat_threshold: int = SQL_REPEAT_THRESHOLD, raise_on_repeat: bool = SQL_REPEAT_RAISE):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter[str] = Counter()
+        self.repeated: dict[str, int] = {}
+        self.repeat_threshold = repeat_threshold
+        self.raise_on_repeat = raise_on_repeat
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        if not self.repeat_threshold:
+            return
+
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        repeats = self.shapes[shape]
+        if repeats > self.repeat_threshold:
+            self.repeated[shape] = repeats
+            if repeats == self.repeat_threshold + 1 and self.raise_on_repeat:
+                raise RepeatedQueryError(f"Statement executed {repeats} times in one request: {shape}")
+
+
+# Счетчики текущего запроса к API (None вне запроса: миграции, заполнение базы)
+current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Возвращает форму запроса: SQL без лишних пробелов и с одинаковыми списками IN.
+    """
+    return IN_LIST_RE.sub("(?)", WHITESPACE_RE.sub(" ", statement).strip())
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats.get()
+    if stats is None or not conn.info.get("query_started"):
+        return
+    stats.record(statement, time.perf_counter() - conn.info["query_started"].pop())
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # Выражение не выполнилось: время его начала больше не нужно
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def log_repeated_queries(stats: QueryStats, route: str):
+    """
+    Пишет предупреждение о формах запроса, превысивших порог повторов.
+    """
+    for shape, repeats in stats.repeated.items():
+        logger.warning(
+            f"Possible N+1: statement repeated {repeats} times",
+            extra={"route": route, "repeats": repeats, "statement": shape},
+        )
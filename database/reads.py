@@ -0,0 +1,311 @@
+from fastapi import HTTPException
+from sqlalchemy import bindparam, desc, func, literal, select, union_all
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import FEED_WINDOW
+from database.loaders import DataLoader
+from database.models import User, Tweet, Media, Like, Follower
+from database.tracing import traced_methods
+
+# Таблицы Core: запросы чтения не создают ORM-объекты и не ведут identity map
+users = User.__table__
+tweets = Tweet.__table__
+media = Media.__table__
+likes = Like.__table__
+followers = Follower.__table__
+
+# Максимальное количество идентификаторов в одном IN-запросе ленты
+FEED_BATCH_SIZE = 500
+# Максимальное количество пользователей в одном запросе UserLoader
+USER_BATCH_SIZE = 10000
+
+
+class UserRow:
+    """
+    Пользователь в ответах API (идентификатор и имя).
+    """
+
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "name": self.name}
+
+
+class LikeRow:
+    """
+    Лайк твита в ленте.
+    """
+
+    __slots__ = ("user_id", "name")
+
+    def __init__(self, user_id: int, name: str):
+        self.user_id = user_id
+        self.name = name
+
+    def to_dict(self) -> dict:
+        return {"user_id": self.user_id, "name": self.name}
+
+
+class UserInfoRow:
+    """
+    Профиль пользователя с подписчиками и подписками.
+    """
+
+    __slots__ = ("id", "name", "followers", "following")
+
+    def __init__(self, user: UserRow, followers: list[UserRow], following: list[UserRow]):
+        self.id = user.id
+        self.name = user.name
+        self.followers = followers
+        self.following = following
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "followers": [user.to_dict() for user in self.followers],
+            "following": [user.to_dict() for user in self.following],
+        }
+
+
+class FeedTweetRow:
+    """
+    Твит ленты с автором, вложениями и лайками.
+    """
+
+    __slots__ = ("id", "content", "author", "likes_count", "attachments", "likes")
+
+    def __init__(self, id: int, content: str, author: UserRow, likes_count: int):
+        self.id = id
+        self.content = content
+        self.author = author
+        self.likes_count = likes_count
+        self.attachments: list[str] = []
+        self.likes: list[LikeRow] = []
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "content": self.content,
+            "author": self.author.to_dict(),
+            "attachments": self.attachments,
+            "likes": [like.to_dict() for like in self.likes],
+        }
+
+
+# Запросы строятся один раз при импорте; SQLAlchemy кэширует их компиляцию,
+# и при выполнении подставляются только значения параметров.
+
+# Имена пользователей по идентификаторам (пакет UserLoader)
+USERS_BY_ID_QUERY = select(users.c.user_id, users.c.name).where(
+    users.c.user_id.in_(bindparam("user_ids", expanding=True))
+)
+
+# Идентификаторы подписчиков и подписок пользователя одним запросом
+USER_LINKS_QUERY = union_all(
+    select(literal("follower").label("kind"), followers.c.follower_id.label("user_id")).where(
+        followers.c.followee_id == bindparam("user_id")
+    ),
+    select(literal("following").label("kind"), followers.c.followee_id.label("user_id")).where(
+        followers.c.follower_id == bindparam("user_id")
+    ),
+)
+
+MAX_TWEET_ID_QUERY = select(func.max(tweets.c.tweet_id))
+
+
+def _feed_query(windowed: bool):
+    likes_count_query = select(
+        likes.c.tweet_id, func.count(likes.c.like_id).label("likes_count")
+    ).group_by(likes.c.tweet_id)
+    if windowed:
+        likes_count_query = likes_count_query.where(likes.c.tweet_id >= bindparam("min_tweet_id"))
+    likes_count = likes_count_query.subquery()
+
+    query = (
+        select(
+            tweets.c.tweet_id,
+            tweets.c.content,
+            tweets.c.user_id,
+            func.coalesce(likes_count.c.likes_count, 0).label("likes_count"),
+        )
+        .outerjoin(likes_count, tweets.c.tweet_id == likes_count.c.tweet_id)
+        .order_by(desc("likes_count"), tweets.c.tweet_id)
+    )
+    if windowed:
+        query = query.where(tweets.c.tweet_id >= bindparam("min_tweet_id"))
+    return query
+
+
+FEED_QUERY = _feed_query(windowed=False)
+FEED_WINDOW_QUERY = _feed_query(windowed=True)
+
+FEED_MEDIA_QUERY = (
+    select(media.c.tweet_id, media.c.media_url)
+    .where(media.c.tweet_id.in_(bindparam("tweet_ids", expanding=True)))
+    .order_by(media.c.tweet_id, media.c.position, media.c.media_id)
+)
+
+FEED_LIKES_QUERY = (
+    select(likes.c.tweet_id, likes.c.user_id)
+    .where(likes.c.tweet_id.in_(bindparam("tweet_ids", expanding=True)))
+    .order_by(likes.c.tweet_id, likes.c.like_id)
+)
+
+
+class UserLoader(DataLoader):
+    """
+    Загрузчик пользователей по идентификатору в пределах одного запроса.
+
+    Все обращения к user(id) за один оборот цикла событий выполняются
+    одним запросом WHERE user_id IN (...), результаты запоминаются.
+
+    Аргументы:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy для взаимодействия с базой данных.
+    """
+
+    def __init__(self, session: AsyncSession):
+        super().__init__(self._load_users, max_batch_size=USER_BATCH_SIZE)
+        self.session = session
+
+    async def _load_users(self, user_ids: list[int]) -> dict[int, UserRow]:
+        conn = await self.session.connection()
+        result = await conn.execute(USERS_BY_ID_QUERY, {"user_ids": user_ids})
+        return {user_id: UserRow(user_id, name) for user_id, name in result}
+
+    def user(self, user_id: int):
+        """
+        Возвращает future с пользователем (None, если пользователь не найден).
+        """
+        return self.load(user_id)
+
+
+@traced_methods
+class ReadDAL:
+    """
+    Класс для чтения данных горячих GET-эндпоинтов через SQLAlchemy Core.
+
+    Единственная реализация профиля пользователя и ленты (TweetDAL.get_feed_tweets
+    обращается сюда же). Строки не проходят через ORM: они сразу собираются в легкие объекты с __slots__.
+    Имена пользователей запросы не соединяют, а берут из UserLoader: на любой ответ
+    приходится один запрос к users.
+
+    Аргументы:
+        session (AsyncSession): Асинхронная сессия SQLAlchemy для взаимодействия с базой данных.
+        users (UserLoader | None): Загрузчик пользователей запроса (по умолчанию создается новый).
+    """
+
+    def __init__(self, session: AsyncSession, users: UserLoader | None = None):
+        self.session = session
+        self.users = users or UserLoader(session)
+
+    async def get_user_info(self, user_id: int) -> dict:
+        """
+        Получает информацию о пользователе, его подписчиках и подписках.
+
+        Аргументы:
+            user_id (int): Идентификатор пользователя.
+
+        Возвращает:
+            dict: Словарь с информацией о пользователе, его подписчиках и подписках.
+
+        Исключения:
+            HTTPException: Если пользователь не найден или возникает ошибка базы данных.
+        """
+        try:
+            conn = await self.session.connection()
+            links = (await conn.execute(USER_LINKS_QUERY, {"user_id": user_id})).all()
+            found = await self.users.load_many([user_id, *(link.user_id for link in links)])
+        except SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Ошибка получения информации о пользователе: {str(e)}",
+            )
+
+        if found[user_id] is None:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+        user = UserInfoRow(
+            found[user_id],
+            [found[link.user_id] for link in links if link.kind == "follower"],
+            [found[link.user_id] for link in links if link.kind == "following"],
+        )
+        return {"result": True, "user": user.to_dict()}
+
+    async def get_feed_tweets(self, window: int = FEED_WINDOW) -> dict:
+        """
+        Получает ленту твитов с авторами, вложениями и лайками.
+
+        Аргументы:
+            window (int): Количество последних твитов в ленте (0 - все твиты).
+
+        Возвращает:
+            dict: Словарь с лентой твитов.
+
+        Исключения:
+            HTTPException: Если возникает ошибка базы данных при получении ленты твитов.
+        """
+        feed = await self.get_feed_rows(window)
+        return {"result": True, "tweets": [tweet.to_dict() for tweet in feed]}
+
+    async def get_feed_rows(self, window: int = FEED_WINDOW) -> list[FeedTweetRow]:
+        """
+        Получает твиты ленты в порядке ленты; используется и для объединения лент шардов.
+
+        Аргументы:
+            window (int): Количество последних твитов в ленте (0 - все твиты).
+
+        Возвращает:
+            list[FeedTweetRow]: Твиты ленты.
+
+        Исключения:
+            HTTPException: Если возникает ошибка базы данных при получении ленты твитов.
+        """
+        try:
+            conn = await self.session.connection()
+
+            if window > 0:
+                max_tweet_id = (await conn.execute(MAX_TWEET_ID_QUERY)).scalar()
+                result = await conn.execute(
+                    FEED_WINDOW_QUERY, {"min_tweet_id": (max_tweet_id or 0) - window + 1}
+                )
+            else:
+                result = await conn.execute(FEED_QUERY)
+
+            rows = result.all()
+            tweet_ids = [row.tweet_id for row in rows]
+            attachments = {tweet_id: [] for tweet_id in tweet_ids}
+            liked_by = {tweet_id: [] for tweet_id in tweet_ids}
+
+            # Вложения и лайки всех твитов загружаем пакетными IN-запросами
+            for i in range(0, len(tweet_ids), FEED_BATCH_SIZE):
+                params = {"tweet_ids": tweet_ids[i:i + FEED_BATCH_SIZE]}
+                for tweet_id, media_url in await conn.execute(FEED_MEDIA_QUERY, params):
+                    attachments[tweet_id].append(media_url)
+                for tweet_id, like_user_id in await conn.execute(FEED_LIKES_QUERY, params):
+                    liked_by[tweet_id].append(like_user_id)
+
+            # Авторы и лайкнувшие - одним запросом к users на всю ленту
+            found = await self.users.load_many(
+                [row.user_id for row in rows]
+                + [user_id for user_ids in liked_by.values() for user_id in user_ids]
+            )
+
+            feed = []
+            for tweet_id, content, author_id, likes_count in rows:
+                tweet = FeedTweetRow(tweet_id, content, found[author_id], likes_count)
+                tweet.attachments = attachments[tweet_id]
+                tweet.likes = [
+                    LikeRow(user_id, found[user_id].name) for user_id in liked_by[tweet_id]
+                ]
+                feed.append(tweet)
+
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+        return feed
@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+
+from loguru import logger
+from sqlalchemy import func, select
+
+from config import TWEET_PARTITIONING
+from database.db import engine, async_session
+from database.func import fill_data, wait_for_db
+from database.migrations import ensure_schema
+from database.models import User
+from database.partitions import ensure_partitions
+from database.shards import shard_router
+
+
+async def seed(reset: bool = False) -> bool:
+    """
+    Заполняет базу демонстрационными данными.
+
+    Аргументы:
+        reset (bool): Удалить существующие данные перед заполнением.
+
+    Возвращает:
+        bool: True, если данные были записаны.
+    """
+    await wait_for_db()
+    await ensure_schema(engine)
+    await shard_router.prepare()
+    if TWEET_PARTITIONING:
+        await ensure_partitions(engine)
+
+    if not reset:
+        async with async_session() as session:
+            users_count = (await session.execute(select(func.count(User.user_id)))).scalar()
+        if users_count:
+            logger.info("Database already contains data, use --reset to overwrite it")
+            return False
+
+    await fill_data()
+    # Демонстрационные твиты остаются на шарде 0 (их идентификаторы выданы для него),
+    # пользователи нужны на всех шардах
+    await shard_router.mirror_users()
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Заполнение базы демонстрационными данными")
+    parser.add_argument(
+        "--reset", action="store_true", help="удалить существующие данные перед заполнением"
+    )
+    args = parser.parse_args()
+
+    if asyncio.run(seed(reset=args.reset)):
+        logger.info("Demo data created")
@@ -0,0 +1,251 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+from loguru import logger
+from sqlalchemy import event, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from config import SHARD_URLS
+from database.db import async_session, create_engine_from_settings, engine, read_router
+from database.migrations import ensure_schema
+from database.models import Media, Tweet, User
+
+T = TypeVar("T")
+
+# Таблицы, строки которых получают идентификаторы с номером шарда: id % количество шардов
+SHARDED_IDS = [(Tweet, "tweet_id"), (Media, "media_id")]
+
+# Движок -> (номер шарда, количество шардов) для выдачи идентификаторов
+_shard_of_engine: dict = {}
+
+
+class Shard:
+    """
+    Один шард: фабрики сессий для записи и для чтения.
+
+    Аргументы:
+        index (int): Номер шарда.
+        engine (AsyncEngine): Движок основной базы шарда.
+        session (async_sessionmaker): Фабрика сессий для записи.
+        read_session (Callable[[float | None], Awaitable[async_sessionmaker]]): Выбор фабрики
+            сессий для чтения по времени последней записи пользователя.
+    """
+
+    __slots__ = ("index", "engine", "session", "read_session")
+
+    def __init__(
+        self,
+        index: int,
+        engine: AsyncEngine,
+        session: async_sessionmaker,
+        read_session: Callable[[float | None], Awaitable[async_sessionmaker]] | None = None,
+    ):
+        self.index = index
+        self.engine = engine
+        self.session = session
+        self.read_session = read_session or self._primary_session
+
+    async def _primary_session(self, last_write: float | None = None) -> async_sessionmaker:
+        return self.session
+
+
+class ShardRouter:
+    """
+    Класс для распределения данных по шардам по идентификатору пользователя.
+
+    Твиты, лайки, медиа и сессии загрузки нового контента пишутся на шард автора
+    (user_id % количество шардов). Идентификаторы твитов и медиа выдаются так,
+    что id % количество шардов равен номеру шарда, поэтому запросы по tweet_id
+    и media_id сразу попадают на нужный шард. Пользователи копируются на все
+    шарды (для внешних ключей и имен в ленте), подписки хранятся на шарде 0.
+    Шард 0 - основная база приложения.
+
+    Аргументы:
+        shards (list[Shard]): Шарды в порядке номеров.
+    """
+
+    def __init__(self, shards: list[Shard]):
+        self.shards = shards
+        if len(shards) > 1:
+            for shard in shards:
+                _shard_of_engine[shard.engine.sync_engine] = (shard.index, len(shards))
+
+    @classmethod
+    def from_urls(
+        cls, urls: list[str], primary: Shard | None = None
+    ) -> "ShardRouter":
+        """
+        Создает маршрутизатор: основной шард и движки дополнительных шардов из URL.
+
+        Аргументы:
+            urls (list[str]): URL дополнительных шардов (шарды 1..N).
+            primary (Shard | None): Шард 0; если не задан, шард 0 - первый URL списка.
+
+        Возвращает:
+            ShardRouter: Маршрутизатор шардов.
+        """
+        shards = [primary] if primary is not None else []
+        for url in urls:
+            shard_engine = create_engine_from_settings(url)
+            shards.append(
+                Shard(
+                    len(shards),
+                    shard_engine,
+                    async_sessionmaker(shard_engine, class_=AsyncSession, expire_on_commit=False),
+                )
+            )
+        return cls(shards)
+
+    @property
+    def count(self) -> int:
+        return len(self.shards)
+
+    @property
+    def primary(self) -> Shard:
+        return self.shards[0]
+
+    def shard_for_user(self, user_id: int) -> Shard:
+        """
+        Возвращает шард, на который пишется контент пользователя.
+        """
+        return self.shards[user_id % self.count]
+
+    def shard_for_id(self, object_id: int) -> Shard:
+        """
+        Возвращает шард, на котором хранится твит или медиафайл с этим идентификатором.
+        """
+        return self.shards[object_id % self.count]
+
+    async def scatter(
+        self, read: Callable[[AsyncSession], Awaitable[T]], last_write: float | None = None
+    ) -> list[T]:
+        """
+        Выполняет чтение на всех шардах параллельно и возвращает результаты по шардам.
+
+        Аргументы:
+            read (Callable[[AsyncSession], Awaitable[T]]): Чтение в сессии одного шарда.
+            last_write (float | None): Время последней записи пользователя (unix time).
+
+        Возвращает:
+            list[T]: Результаты в порядке номеров шардов.
+        """
+
+        async def read_shard(shard: Shard) -> T:
+            session_factory = await shard.read_session(last_write)
+            async with session_factory() as session:
+                return await read(session)
+
+        return list(await asyncio.gather(*(read_shard(shard) for shard in self.shards)))
+
+    async def prepare(self):
+        """
+        Готовит шарды при запуске: схема на дополнительных шардах,
+        последовательности идентификаторов PostgreSQL с шагом, равным количеству шардов,
+        и копии пользователей шарда 0 (в том числе созданных, пока приложение не работало).
+        """
+        for shard in self.shards[1:]:
+            await ensure_schema(shard.engine)
+
+        if self.count == 1:
+            return
+
+        for shard in self.shards:
+            if shard.engine.dialect.name != "postgresql":
+                continue
+            async with shard.engine.begin() as conn:
+                for model, column in SHARDED_IDS:
+                    table = model.__tablename__
+                    current = (
+                        await conn.execute(text(f"SELECT coalesce(max({column}), 0) FROM {table}"))
+                    ).scalar()
+                    sequence = (
+                        await conn.execute(
+                            text("SELECT pg_get_serial_sequence(:table, :column)"),
+                            {"table": table, "column": column},
+                        )
+                    ).scalar()
+                    next_id = _next_shard_id(current, shard.index, self.count)
+                    await conn.execute(text(f"ALTER SEQUENCE {sequence} INCREMENT BY {self.count}"))
+                    # Следующий nextval вернет next_id
+                    await conn.execute(
+                        text("SELECT setval(:sequence, :value, false)"),
+                        {"sequence": sequence, "value": next_id},
+                    )
+
+        await self.mirror_users()
+
+    async def mirror_users(self):
+        """
+        Копирует на остальные шарды пользователей шарда 0, которых там еще нет.
+        Вызывается при запуске (prepare) и после создания пользователей.
+        """
+        if self.count == 1:
+            return
+
+        async with self.primary.session() as session:
+            users = [
+                {"user_id": user_id, "api_key": api_key, "name": name}
+                for user_id, api_key, name in await session.execute(
+                    select(User.user_id, User.api_key, User.name)
+                )
+            ]
+
+        for shard in self.shards[1:]:
+            async with shard.session() as session:
+                existing = set((await session.execute(select(User.user_id))).scalars())
+                missing = [user for user in users if user["user_id"] not in existing]
+                if missing:
+                    await session.execute(insert(User), missing)
+                    await session.commit()
+            logger.info(f"Mirrored {len(missing)} users to shard {shard.index}")
+
+
+def _next_shard_id(current: int, index: int, count: int) -> int:
+    """
+    Возвращает наименьший идентификатор больше current, принадлежащий шарду index.
+    """
+    next_id = current + 1
+    return next_id + (index - next_id) % count
+
+
+def _allocate_shard_id(mapper, connection, target):
+    """
+    Выдает идентификатор новой строке на SQLite-шарде.
+
+    На PostgreSQL это делает последовательность с шагом по количеству шардов.
+    На SQLite запись идет через единственного писателя с BEGIN IMMEDIATE,
+    поэтому чтение максимума и вставка не пересекаются с другими записями.
+    """
+    shard = _shard_of_engine.get(connection.engine)
+    if shard is None or connection.dialect.name == "postgresql":
+        return
+
+    column = mapper.primary_key[0]
+    if getattr(target, column.key) is not None:
+        return
+
+    index, count = shard
+    current = connection.execute(select(func.coalesce(func.max(column), 0))).scalar()
+    # Строки одного flush вставляются после всех before_insert: учитываем уже выданные
+    key = ("shard_id", column.table.name)
+    current = max(current, connection.info.get(key, 0))
+    connection.info[key] = _next_shard_id(current, index, count)
+    setattr(target, column.key, connection.info[key])
+
+
+for _model, _ in SHARDED_IDS:
+    event.listen(_model, "before_insert", _allocate_shard_id)
+
+
+# Шард 0 - основная база с маршрутизацией чтения на реплику
+shard_router = ShardRouter.from_urls(
+    SHARD_URLS,
+    primary=Shard(0, engine, async_session, read_router.session_factory),
+)
+
+
+def get_shard_router() -> ShardRouter:
+    """
+    Зависимость FastAPI: маршрутизатор шардов.
+    """
+    return shard_router
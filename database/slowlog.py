@@ -0,0 +1,225 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from loguru import logger
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import SLOW_QUERY_MS, SLOW_QUERY_LOG_SIZE, SLOW_QUERY_EXPLAIN, SLOW_QUERY_EXPLAIN_TIMEOUT
+from config import URL2
+from database.db import create_engine_from_settings, engine, is_sqlite_file, replica_engine
+from database.querystats import statement_shape
+from database.shards import shard_router
+
+# Сколько планов может ждать выполнения EXPLAIN; остальные медленные запросы сохраняются без плана
+MAX_PENDING_EXPLAINS = 10
+# Выражения, для которых снимается план
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+# Максимальная длина значения параметра в журнале
+MAX_PARAMETER_LENGTH = 200
+
+
+class SlowQueryLog:
+    """
+    Журнал медленных SQL-запросов с планами выполнения.
+
+    Выражение, выполнявшееся дольше порога, сохраняется в кольцевой буфер
+    вместе с параметрами. План снимается в фоновой задаче, а не в запросе
+    к API: на PostgreSQL - EXPLAIN (ANALYZE, BUFFERS) для SELECT (для
+    изменяющих выражений - EXPLAIN без выполнения), на SQLite - EXPLAIN QUERY PLAN.
+    Одновременно снимается не больше одного плана.
+
+    У движка записи файловой базы SQLite одно соединение, и его транзакции
+    берут блокировку записи, поэтому планы для такой базы снимаются на движке
+    только для чтения.
+
+    Аргументы:
+        threshold_ms (float): Порог длительности в миллисекундах (0 - журнал выключен).
+        size (int): Количество хранимых записей.
+        explain (bool): Снимать планы медленных запросов.
+        explain_timeout_ms (int): Ограничение времени EXPLAIN ANALYZE на PostgreSQL.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        size: int = SLOW_QUERY_LOG_SIZE,
+        explain: bool = SLOW_QUERY_EXPLAIN,
+        explain_timeout_ms: int = SLOW_QUERY_EXPLAIN_TIMEOUT,
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.explain_timeout_ms = explain_timeout_ms
+        self.entries: deque[dict] = deque(maxlen=size)
+        self._engines: dict = {}
+        self._own_engines: list[AsyncEngine] = []
+        self._pending: set[asyncio.Task] = set()
+        self._explain_lock: asyncio.Lock | None = None
+
+    def watch(self, engine: AsyncEngine, explain_engine: AsyncEngine | None = None):
+        """
+        Подключает журнал к движку.
+
+        Аргументы:
+            engine (AsyncEngine): Движок, выражения которого отслеживаются.
+            explain_engine (AsyncEngine | None): Движок для EXPLAIN той же базы. Если не задан,
+                для файловой базы SQLite создается движок только для чтения с одним соединением,
+                для остальных баз планы снимаются на самом движке.
+        """
+        if not self.threshold_ms or engine.sync_engine in self._engines:
+            return
+        if explain_engine is None and self.explain and is_sqlite_file(str(engine.url)):
+            explain_engine = create_engine_from_settings(
+                engine.url.render_as_string(hide_password=False), read_only=True, pool_size=1
+            )
+            self._own_engines.append(explain_engine)
+        self._engines[engine.sync_engine] = explain_engine or engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine.sync_engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("slow_query_started")
+        if not started:
+            return
+        duration_ms = (time.perf_counter() - started.pop()) * 1000
+        # Планы, которые снимает сам журнал, в него не попадают
+        if duration_ms < self.threshold_ms or statement.startswith("EXPLAIN"):
+            return
+
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration_ms, 2),
+            "database": conn.dialect.name,
+            "statement": statement,
+            "parameters": None if executemany else _parameters(statement, parameters),
+            "plan": None,
+        }
+        self.entries.append(entry)
+        logger.warning(
+            "Slow query",
+            extra={"duration_ms": entry["duration_ms"], "statement": statement_shape(statement)},
+        )
+
+        if (
+            not self.explain
+            or executemany
+            or not statement.lstrip().upper().startswith(EXPLAINABLE)
+            or len(self._pending) >= MAX_PENDING_EXPLAINS
+        ):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._explain(self._engines[conn.engine], entry, statement, parameters))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _handle_error(self, exception_context):
+        # Выражение не выполнилось: время его начала больше не нужно
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("slow_query_started"):
+            conn.info["slow_query_started"].pop()
+
+    async def _explain(self, engine: AsyncEngine, entry: dict, statement: str, parameters):
+        if self._explain_lock is None:
+            self._explain_lock = asyncio.Lock()
+        async with self._explain_lock:
+            try:
+                entry["plan"] = await explain(engine, statement, parameters, self.explain_timeout_ms)
+            except Exception as e:
+                entry["plan"] = f"EXPLAIN failed: {e}"
+
+    async def wait_for_explains(self):
+        """
+        Ждет завершения снятия планов (для тестов и остановки приложения).
+        """
+        while self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def close(self):
+        """
+        Дожидается снятия планов и закрывает движки, созданные журналом.
+        """
+        await self.wait_for_explains()
+        for own_engine in self._own_engines:
+            await own_engine.dispose()
+        self._own_engines.clear()
+
+    def recent(self) -> list[dict]:
+        """
+        Возвращает записи журнала, начиная с последней.
+        """
+        return list(reversed(self.entries))
+
+
+async def explain(engine: AsyncEngine, statement: str, parameters, timeout_ms: int = SLOW_QUERY_EXPLAIN_TIMEOUT) -> str:
+    """
+    Снимает план выражения с теми же параметрами.
+
+    Аргументы:
+        engine (AsyncEngine): Движок той же базы, на котором снимается план.
+        statement (str): SQL в стиле драйвера.
+        parameters: Параметры выражения в стиле драйвера.
+        timeout_ms (int): Ограничение времени EXPLAIN ANALYZE на PostgreSQL.
+
+    Возвращает:
+        str: Текст плана.
+    """
+    async with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            # ANALYZE выполняет выражение: изменяющие выражения только объясняются,
+            # а транзакция в любом случае откатывается
+            analyze = statement.lstrip().upper().startswith(("SELECT", "WITH"))
+            options = "(ANALYZE, BUFFERS)" if analyze else ""
+            await conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+            result = await conn.exec_driver_sql(f"EXPLAIN {options} {statement}", parameters)
+            plan = "\n".join(row[0] for row in result)
+        elif conn.dialect.name == "sqlite":
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plan = "\n".join(f"{row[0]} {row[1]} {row[-1]}" for row in result)
+        else:
+            plan = f"EXPLAIN is not supported for {conn.dialect.name}"
+        await conn.rollback()
+    return plan
+
+
+def _parameters(statement: str, parameters):
+    # Значения в запросах по API-ключу не сохраняются
+    if "api_key" in statement:
+        return "***"
+    if isinstance(parameters, dict):
+        return {key: _short(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_short(value) for value in parameters]
+    return parameters
+
+
+def _short(value):
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    value = str(value)
+    return value if len(value) <= MAX_PARAMETER_LENGTH else value[:MAX_PARAMETER_LENGTH] + "..."
+
+
+slow_query_log = SlowQueryLog()
+
+
+def watch_engines():
+    """
+    Подключает журнал к движкам приложения: основной базе, реплике и шардам.
+
+    Для файловой базы SQLite без реплики планы запросов основной базы
+    снимаются на пуле читателей того же файла.
+    """
+    if replica_engine is not None:
+        slow_query_log.watch(replica_engine, explain_engine=replica_engine)
+    slow_query_log.watch(engine, explain_engine=None if URL2 else replica_engine)
+    for shard in shard_router.shards[1:]:
+        slow_query_log.watch(shard.engine)
@@ -0,0 +1,325 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import posixpath
+from typing import AsyncIterator
+from uuid import uuid4
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+
+from config import (
+    MEDIA_ROOT,
+    MEDIA_BASE_URL,
+    MEDIA_API_URL,
+    UPLOAD_TMP_DIR,
+    FFPROBE_BINARY,
+    FFPROBE_TIMEOUT,
+)
+from database.tracing import traced_methods
+
+# Размер блока при потоковой записи загружаемого файла
+CHUNK_SIZE = 1024 * 1024
+
+
+@traced_methods
+class LocalStorage:
+    """
+    Класс для хранения медиафайлов на локальном диске.
+
+    Файлы раскладываются по двухуровневой структуре каталогов по хэшу имени
+    (ab/cd/<имя файла>), чтобы ни один каталог не разрастался до миллионов записей.
+
+    Аргументы:
+        root (str): Корневой каталог хранилища.
+        base_url (str): URL, соответствующий корневому каталогу.
+        upload_dir (str | None): Каталог временных файлов возобновляемых загрузок.
+        api_url (str): URL эндпоинта получения медиафайлов с проверкой доступа.
+    """
+
+    def __init__(
+        self,
+        root: str = MEDIA_ROOT,
+        base_url: str = MEDIA_BASE_URL,
+        upload_dir: str | None = UPLOAD_TMP_DIR,
+        api_url: str = MEDIA_API_URL,
+    ):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        self.api_url = api_url.rstrip("/")
+        self.upload_dir = os.path.abspath(upload_dir or os.path.join(self.root, ".uploads"))
+
+    @staticmethod
+    def new_filename(original_filename: str | None) -> str:
+        """
+        Создает уникальное имя файла с расширением исходного файла.
+
+        Аргументы:
+            original_filename (str | None): Имя загруженного файла.
+
+        Возвращает:
+            str: Уникальное имя файла.
+        """
+        extension = os.path.splitext(original_filename or "")[1].lstrip(".")
+        return f"{uuid4()}.{extension or 'bin'}"
+
+    @staticmethod
+    def shard_path(filename: str) -> str:
+        """
+        Возвращает путь файла внутри хранилища с учетом шардирования каталогов.
+
+        Аргументы:
+            filename (str): Имя файла.
+
+        Возвращает:
+            str: Относительный путь вида "ab/cd/<имя файла>".
+        """
+        digest = hashlib.md5(filename.encode()).hexdigest()
+        return posixpath.join(digest[:2], digest[2:4], filename)
+
+    def absolute_path(self, relative_path: str) -> str:
+        """
+        Возвращает абсолютный путь к файлу в хранилище.
+
+        Аргументы:
+            relative_path (str): Путь внутри хранилища.
+
+        Возвращает:
+            str: Абсолютный путь к файлу.
+        """
+        return os.path.join(self.root, *relative_path.split("/"))
+
+    def relative_path(self, absolute_path: str) -> str | None:
+        """
+        Возвращает путь внутри хранилища для абсолютного пути.
+
+        Аргументы:
+            absolute_path (str): Абсолютный путь к файлу.
+
+        Возвращает:
+            str | None: Путь внутри хранилища или None, если файл лежит вне хранилища.
+        """
+        relative = os.path.relpath(os.path.abspath(absolute_path), self.root)
+        if relative == os.curdir or relative.startswith(os.pardir):
+            return None
+        return relative.replace(os.sep, "/")
+
+    def url_for(self, relative_path: str) -> str:
+        """
+        Возвращает URL файла внутри хранилища (напрямую nginx его не раздает).
+
+        Аргументы:
+            relative_path (str): Путь внутри хранилища.
+
+        Возвращает:
+            str: URL файла.
+        """
+        return f"{self.base_url}/{relative_path}"
+
+    def media_url(self, media_id: int) -> str:
+        """
+        Возвращает публичный URL медиафайла: файл отдается эндпоинтом
+        /api/medias/{media_id} после проверки доступа.
+
+        Аргументы:
+            media_id (int): Идентификатор медиафайла.
+
+        Возвращает:
+            str: URL медиафайла.
+        """
+        return f"{self.api_url}/{media_id}"
+
+    async def save_upload(self, file: UploadFile) -> tuple[str, str]:
+        """
+        Сохраняет загруженный файл в хранилище, записывая его блоками.
+
+        Аргументы:
+            file (UploadFile): Загруженный файл.
+
+        Возвращает:
+            tuple[str, str]: Путь внутри хранилища и абсолютный путь к файлу.
+        """
+        relative_path = self.shard_path(self.new_filename(file.filename))
+        file_path = self.absolute_path(relative_path)
+
+        await aiofiles.os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(CHUNK_SIZE):
+                await buffer.write(chunk)
+
+        return relative_path, file_path
+
+    async def move_to_shard(self, file_path: str) -> str:
+        """
+        Переносит файл из плоского каталога в шардированную структуру.
+
+        Повторный вызов для уже перенесенного файла ничего не делает,
+        поэтому прерванную миграцию можно запускать заново.
+
+        Аргументы:
+            file_path (str): Абсолютный путь к файлу в корне хранилища.
+
+        Возвращает:
+            str: Новый путь файла внутри хранилища.
+
+        Исключения:
+            FileNotFoundError: Файл не найден ни в старом, ни в новом расположении.
+        """
+        relative_path = self.shard_path(os.path.basename(file_path))
+        new_path = self.absolute_path(relative_path)
+
+        if await aiofiles.os.path.exists(file_path):
+            await aiofiles.os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            # Переименование в пределах одной файловой системы атомарно
+            await aiofiles.os.replace(file_path, new_path)
+        elif not await aiofiles.os.path.exists(new_path):
+            raise FileNotFoundError(file_path)
+
+        return relative_path
+
+    async def create_upload_file(self, upload_id: str, size: int) -> str:
+        """
+        Создает разреженный временный файл для возобновляемой загрузки.
+
+        Аргументы:
+            upload_id (str): Идентификатор сессии загрузки.
+            size (int): Полный размер файла в байтах.
+
+        Возвращает:
+            str: Путь к временному файлу.
+        """
+        await aiofiles.os.makedirs(self.upload_dir, exist_ok=True)
+        temp_path = os.path.join(self.upload_dir, upload_id)
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            # truncate не выделяет место на диске: блоки появятся по мере записи частей
+            await buffer.truncate(size)
+        return temp_path
+
+    @staticmethod
+    async def write_chunk(
+        temp_path: str, offset: int, chunks: AsyncIterator[bytes], limit: int
+    ) -> int:
+        """
+        Записывает часть файла с указанного смещения, не накапливая ее в памяти.
+
+        Аргументы:
+            temp_path (str): Путь к временному файлу загрузки.
+            offset (int): Смещение, с которого записывается часть.
+            chunks (AsyncIterator[bytes]): Поток байтов части.
+            limit (int): Максимально допустимый размер части.
+
+        Возвращает:
+            int: Количество записанных байт.
+
+        Исключения:
+            ValueError: Размер части превышает limit.
+        """
+        written = 0
+        async with aiofiles.open(temp_path, "r+b") as buffer:
+            await buffer.seek(offset)
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > limit:
+                    raise ValueError("Chunk is too large")
+                await buffer.write(chunk)
+        return written
+
+    async def finalize_upload(self, temp_path: str, original_filename: str) -> tuple[str, str]:
+        """
+        Переносит полностью загруженный файл в хранилище.
+
+        Аргументы:
+            temp_path (str): Путь к временному файлу загрузки.
+            original_filename (str): Исходное имя файла.
+
+        Возвращает:
+            tuple[str, str]: Путь внутри хранилища и абсолютный путь к файлу.
+        """
+        relative_path = self.shard_path(self.new_filename(original_filename))
+        file_path = self.absolute_path(relative_path)
+
+        await aiofiles.os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        await aiofiles.os.replace(temp_path, file_path)
+
+        return relative_path, file_path
+
+    @staticmethod
+    async def discard(file_path: str):
+        """
+        Удаляет файл, если он существует.
+
+        Аргументы:
+            file_path (str): Путь к файлу.
+        """
+        try:
+            await aiofiles.os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    async def probe(file_path: str, content_type: str | None = None) -> dict:
+        """
+        Определяет тип, размер и длительность (для видео и аудио) медиафайла.
+
+        Выполняется один раз при загрузке, чтобы дальше метаданные
+        брались из записи Media без обращения к файлу.
+
+        Аргументы:
+            file_path (str): Путь к файлу.
+            content_type (str | None): MIME-тип, переданный клиентом.
+
+        Возвращает:
+            dict: Ключи content_type, size_bytes и duration (None, если не определена).
+        """
+        stat = await aiofiles.os.stat(file_path)
+        content_type = (
+            mimetypes.guess_type(file_path)[0]
+            or content_type
+            or "application/octet-stream"
+        )
+
+        duration = None
+        if FFPROBE_BINARY and content_type.startswith(("video/", "audio/")):
+            duration = await _probe_duration(file_path)
+
+        return {
+            "content_type": content_type,
+            "size_bytes": stat.st_size,
+            "duration": duration,
+        }
+
+
+async def _probe_duration(file_path: str) -> float | None:
+    """
+    Возвращает длительность медиафайла в секундах с помощью ffprobe.
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            FFPROBE_BINARY,
+            "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            file_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except OSError:
+        # ffprobe не установлен
+        return None
+
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), FFPROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None
+
+    try:
+        return float(stdout.decode().strip())
+    except ValueError:
+        return None
+
+
+media_storage = LocalStorage()
@@ -0,0 +1,316 @@
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import SERVICE_NAME, TRACE_FILE, TRACE_SAMPLE_RATE
+
+# Виды спанов OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Максимальная длина SQL в атрибуте спана
+MAX_STATEMENT_LENGTH = 2000
+
+
+class Span:
+    """
+    Участок трассировки: имя, время начала и конца, атрибуты и статус.
+
+    Аргументы:
+        trace (Trace): Трассировка, к которой относится спан.
+        name (str): Имя спана.
+        parent_id (str | None): Идентификатор родительского спана.
+        kind (int): Вид спана OTLP.
+        attributes (dict | None): Атрибуты спана.
+    """
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "status")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: str | None = None,
+                 kind: int = SPAN_KIND_INTERNAL, attributes: dict | None = None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = 0
+        self.attributes = attributes or {}
+        self.status = STATUS_OK
+
+    def child(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: dict | None = None) -> "Span":
+        return Span(self.trace, name, self.span_id, kind, attributes)
+
+    def finish(self, error: BaseException | None = None):
+        self.end = time.time_ns()
+        if error is not None:
+            self.status = STATUS_ERROR
+            self.attributes["exception.type"] = type(error).__name__
+            self.attributes["exception.message"] = str(error)
+        self.trace.spans.append(self)
+
+    def to_otlp(self) -> dict:
+        data = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        return data
+
+
+class Trace:
+    """
+    Завершенные спаны одной трассировки; выгружаются вместе после корневого спана.
+    """
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: list[Span] = []
+
+
+class JsonFileExporter:
+    """
+    Выгрузка трассировок в файл в формате OTLP/JSON, по трассировке на строку.
+
+    Файл пишет фоновый поток: запрос только кладет трассировку в очередь.
+    Строку можно отправить в коллектор OpenTelemetry (POST /v1/traces) как есть.
+
+    Аргументы:
+        path (str): Путь к файлу.
+        max_queue (int): Размер очереди; при переполнении трассировки отбрасываются.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000):
+        self.path = path
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._thread: threading.Thread | None = None
+
+    def export(self, trace: Trace):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """
+        Ждет, пока все трассировки из очереди будут записаны.
+        """
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                line = json.dumps(_otlp_document(trace), ensure_ascii=False)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except Exception:
+                pass
+            finally:
+                self._queue.task_done()
+
+
+class Tracer:
+    """
+    Трассировщик запросов с выборкой.
+
+    Решение о записи принимается один раз на запрос. Вне выбранного запроса
+    span() и traced() сводятся к чтению одной ContextVar, поэтому при малой
+    доле TRACE_SAMPLE_RATE накладные расходы ничтожны.
+
+    Аргументы:
+        exporter (JsonFileExporter | None): Выгрузка трассировок (None - трассировка выключена).
+        sample_rate (float): Доля запросов, которые трассируются.
+    """
+
+    def __init__(self, exporter: JsonFileExporter | None, sample_rate: float = TRACE_SAMPLE_RATE):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def sampled(self) -> bool:
+        return self.exporter is not None and self.sample_rate > 0 and (
+            self.sample_rate >= 1 or random.random() < self.sample_rate
+        )
+
+    @contextmanager
+    def start_trace(self, name: str, trace_id: str | None = None, attributes: dict | None = None):
+        """
+        Открывает корневой спан запроса; по его завершении трассировка выгружается.
+
+        Аргументы:
+            name (str): Имя корневого спана.
+            trace_id (str | None): Идентификатор трассировки (32 hex-символа), по умолчанию новый.
+            attributes (dict | None): Атрибуты спана.
+        """
+        root = Span(Trace(trace_id or os.urandom(16).hex()), name, kind=SPAN_KIND_SERVER, attributes=attributes)
+        token = current_span.set(root)
+        error = None
+        try:
+            yield root
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            current_span.reset(token)
+            root.finish(error)
+            self.exporter.export(root.trace)
+
+
+# Текущий спан (None - запрос не трассируется)
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+tracer = Tracer(JsonFileExporter(TRACE_FILE) if TRACE_FILE else None)
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """
+    Дочерний спан текущего спана; вне трассируемого запроса ничего не делает.
+    """
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.child(name, kind, attributes)
+    token = current_span.set(child)
+    error = None
+    try:
+        yield child
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        current_span.reset(token)
+        child.finish(error)
+
+
+def traced(name: str | None = None):
+    """
+    Декоратор асинхронной функции: вызов выполняется в дочернем спане.
+
+    Аргументы:
+        name (str | None): Имя спана (по умолчанию - полное имя функции).
+    """
+
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if current_span.get() is None:
+                return await fn(*args, **kwargs)
+            with span(span_name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_methods(cls):
+    """
+    Декоратор класса: все публичные асинхронные методы выполняются в спанах
+    с именами вида "TweetDAL.get_tweet_by_id".
+    """
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith("_"):
+            continue
+        if isinstance(value, staticmethod) and inspect.iscoroutinefunction(value.__func__):
+            setattr(cls, attr, staticmethod(traced()(value.__func__)))
+        elif inspect.iscoroutinefunction(value):
+            setattr(cls, attr, traced()(value))
+    return cls
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = current_span.get()
+    if parent is not None:
+        conn.info.setdefault("trace_spans", []).append(
+            parent.child(
+                "SQL",
+                SPAN_KIND_CLIENT,
+                {"db.system": conn.dialect.name, "db.statement": statement[:MAX_STATEMENT_LENGTH]},
+            )
+        )
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_span.get() is not None and conn.info.get("trace_spans"):
+        conn.info["trace_spans"].pop().finish()
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("trace_spans"):
+        conn.info["trace_spans"].pop().finish(exception_context.original_exception)
+
+
+def trace_id_from_request_id(request_id: str | None) -> str | None:
+    """
+    Идентификатор трассировки из X-Request-ID, если это 128-битный hex или UUID.
+    """
+    if not request_id:
+        return None
+    value = request_id.replace("-", "").lower()
+    if len(value) == 32 and all(c in "0123456789abcdef" for c in value) and value != "0" * 32:
+        return value
+    return None
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _otlp_document(trace: Trace) -> dict:
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "twits.tracing"},
+                        "spans": [span.to_otlp() for span in trace.spans],
+                    }
+                ],
+            }
+        ]
+    }
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import timedelta
+
+from loguru import logger
+
+from config import UPLOAD_SESSION_TTL, UPLOAD_CLEANUP_INTERVAL
+from database.func import UploadDAL
+from database.models import utcnow
+from database.shards import ShardRouter
+from database.storage import LocalStorage, media_storage
+
+
+async def cleanup_stale_uploads(
+    router: ShardRouter,
+    storage: LocalStorage = media_storage,
+    max_age: float = UPLOAD_SESSION_TTL,
+) -> int:
+    """
+    Удаляет брошенные сессии возобновляемой загрузки и их временные файлы.
+
+    Сессия считается брошенной, если за max_age секунд в нее не пришло ни одной
+    части: долгая, но активная загрузка не прерывается.
+
+    Сессии лежат на шарде автора, поэтому очищаются все шарды. Запись
+    удаляется раньше файла: если удаление файла не удастся, незавершенная
+    загрузка все равно больше не принимает части.
+
+    Аргументы:
+        router (ShardRouter): Маршрутизатор шардов.
+        storage (LocalStorage): Хранилище временных файлов загрузок.
+        max_age (float): Время без новых частей в секундах, после которого сессия считается брошенной.
+
+    Возвращает:
+        int: Количество удаленных сессий.
+    """
+    inactive_since = utcnow() - timedelta(seconds=max_age)
+    removed = 0
+    for shard in router.shards:
+        async with shard.session() as session:
+            temp_paths = await UploadDAL(session).delete_stale_uploads(inactive_since)
+        for temp_path in temp_paths:
+            await storage.discard(temp_path)
+        removed += len(temp_paths)
+
+    if removed:
+        logger.info(f"Removed {removed} stale upload sessions")
+    return removed
+
+
+async def upload_cleanup(router: ShardRouter, interval: float = UPLOAD_CLEANUP_INTERVAL):
+    """
+    Периодически удаляет брошенные загрузки. Запускается фоновой задачей приложения.
+
+    Аргументы:
+        router (ShardRouter): Маршрутизатор шардов.
+        interval (float): Период очистки в секундах.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await cleanup_stale_uploads(router)
+        except Exception as e:
+            logger.error(f"Upload cleanup failed: {e}")
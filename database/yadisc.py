@@ -1,12 +1,32 @@
 from fastapi import HTTPException
 from yadisk import AsyncClient
-from yadisk.objects import AsyncPublicResourceObject
+from yadisk.exceptions import NotFoundError
+from yadisk.objects import AsyncPublicResourceObject, AsyncResourceObject
 
-from config import TOKEN
+from config import (
+    TOKEN,
+    YADISK_META_TTL,
+    YADISK_META_NEGATIVE_TTL,
+    YADISK_META_CACHE_SIZE,
+)
+from database.cache import AsyncTTLCache
 from database.dekorators import with_tempfile
 
 async_client = AsyncClient(token=TOKEN)
 
+# Поля метаданных, которые нужны сервису; остальное не запрашиваем
+META_FIELDS = ["path", "name", "public_key", "public_url", "size", "mime_type"]
+
+# Кэш метаданных общий для всего процесса: публичные ссылки на сохраненный файл не меняются.
+# Ключи: ("path", путь на Диске) и ("public", публичный ключ или публичная ссылка).
+public_meta_cache = AsyncTTLCache(
+    ttl=YADISK_META_TTL,
+    negative_ttl=YADISK_META_NEGATIVE_TTL,
+    maxsize=YADISK_META_CACHE_SIZE,
+    negative_exceptions=(NotFoundError,),
+    name="yadisk_public_meta",
+)
+
 
 class YadiskDAL:
     """
@@ -48,7 +68,7 @@ class YadiskDAL:
     @with_tempfile
     async def upload_to_yadisk(
         self, temp_file_path: str, user_id: str, dst_filename: str
-    ) -> tuple[str | None, str | None]:
+    ) -> tuple[str | None, str | None, str | None]:
         """
         Загружает временный файл на Яндекс.Диск и публикует его.
 
@@ -58,23 +78,43 @@ class YadiskDAL:
             dst_filename (str): Имя файла для сохранения на Яндекс.Диске.
 
         Возвращает:
-            tuple[str | None, str | None]: Ссылка на ресурс и путь к файлу.
+            tuple[str | None, str | None, str | None]: Ссылка на ресурс, путь к файлу и публичный ключ.
+
+        Исключения:
+            HTTPException: Ошибка при загрузке файла на Яндекс.Диск.
+        """
+        return await self.upload_file_to_yadisk(temp_file_path, user_id, dst_filename)
+
+    async def upload_file_to_yadisk(
+        self, file_path: str, user_id: str, dst_filename: str
+    ) -> tuple[str | None, str | None, str | None]:
+        """
+        Загружает файл с диска на Яндекс.Диск и публикует его.
+
+        Аргументы:
+            file_path (str): Путь к файлу.
+            user_id (str): Идентификатор пользователя.
+            dst_filename (str): Имя файла для сохранения на Яндекс.Диске.
+
+        Возвращает:
+            tuple[str | None, str | None, str | None]: Ссылка на ресурс, путь к файлу и публичный ключ.
 
         Исключения:
             HTTPException: Ошибка при загрузке файла на Яндекс.Диск.
         """
         try:
             folder_path = f"/{user_id}/"
-            # Загружаем временный файл на Яндекс.Диск
             await self.async_client.upload(
-                temp_file_path, f"{folder_path}{dst_filename}"
+                file_path, f"{folder_path}{dst_filename}"
             )
             resource_link = await self.async_client.publish(
                 f"{folder_path}{dst_filename}"
             )
-            url = await self.async_client.get_meta(resource_link.path)
+            # Файл только что опубликован, старая (в т.ч. негативная) запись неактуальна
+            public_meta_cache.invalidate(("path", resource_link.path))
+            meta = await self.get_meta(resource_link.path)
 
-            return url.public_url, resource_link.path
+            return meta.public_url, resource_link.path, meta.public_key
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -112,6 +152,7 @@ class YadiskDAL:
         """
         try:
             await self.async_client.remove(file_url, permanently=True)
+            public_meta_cache.invalidate(("path", file_url))
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -137,21 +178,61 @@ class YadiskDAL:
                 detail=f"Ошибка при удалении медиафайлов на Яндекс.Диске: {str(e)}",
             )
 
+    async def get_meta(self, path: str) -> AsyncResourceObject:
+        """
+        Получает метаданные ресурса по пути на Яндекс.Диске с использованием кэша.
+
+        Аргументы:
+            path (str): Путь к ресурсу на Яндекс.Диске.
+
+        Возвращает:
+            AsyncResourceObject: Объект с метаданными ресурса.
+        """
+
+        async def load():
+            meta = await self.async_client.get_meta(path, fields=META_FIELDS)
+            self.remember_public_meta(meta)
+            return meta
+
+        return await public_meta_cache.get_or_load(("path", path), load)
+
+    @staticmethod
+    def remember_public_meta(meta: AsyncResourceObject | AsyncPublicResourceObject):
+        """
+        Сохраняет метаданные в кэш под путем, публичным ключом и публичной ссылкой.
+
+        Аргументы:
+            meta (AsyncResourceObject | AsyncPublicResourceObject): Метаданные ресурса.
+        """
+        if meta.path:
+            public_meta_cache.set(("path", meta.path), meta)
+        if meta.public_key:
+            public_meta_cache.set(("public", meta.public_key), meta)
+        if meta.public_url:
+            public_meta_cache.set(("public", meta.public_url), meta)
+
     async def get_public_meta(self, url: str) -> AsyncPublicResourceObject:
         """
-        Получает метаданные публичного ресурса по публичному ключу.
+        Получает метаданные публичного ресурса по публичному ключу с использованием кэша.
+
+        Повторные запросы обслуживаются из кэша, конкурентные запросы
+        одного ключа выполняют один общий вызов API.
 
         Аргументы:
-            public_key (str): Публичный ключ ресурса.
+            url (str): Публичный ключ или публичная ссылка ресурса.
 
         Возвращает:
             AsyncPublicResourceObject: Объект с метаданными публичного ресурса.
 
         Исключения:
-            HTTPException: Ошибка при получении метаданных публичного ресурса.
+            HTTPException: Ресурс не найден или ошибка при получении метаданных.
         """
         try:
-            return await self.async_client.get_public_meta(url)
+            return await public_meta_cache.get_or_load(
+                ("public", url), lambda: self.async_client.get_public_meta(url)
+            )
+        except NotFoundError:
+            raise HTTPException(status_code=404, detail="Публичный ресурс не найден")
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -197,13 +278,13 @@ class YadiskDAL:
 #     try:
 #         await yadisk_dal.create_folder_on_yadisk(user.user_id)
 #         file_bytes = await file.read()
-#         link, path = await yadisk_dal.upload_to_yadisk(
+#         link, path, public_key = await yadisk_dal.upload_to_yadisk(
 #             file_bytes, user.user_id, file.filename
 #         )
 #         print(link)
 #         print(path)
 #
-#         new_media = await media_dal.create_media_record(link, path)
+#         new_media = await media_dal.create_media_record(link, path, public_key=public_key)
 #         logger.info("Media uploaded and record created", extra={"media_id": new_media.media_id})
 #
 #         return MediaResponse(result=True, media_id=new_media.media_id)
@@ -5,8 +5,19 @@ while ! nc -z postgres 5432; do
   sleep 1
 done
 
+# Демонстрационные данные (только для пустой базы)
+if [ "$SEED_DEMO_DATA" = "1" ]; then
+  python -m database.seed
+fi
+
 # Запуск Nginx
 service nginx start
 
+# Снимки метрик прошлого запуска (см. METRICS_DIR)
+if [ -n "$METRICS_DIR" ]; then
+  mkdir -p "$METRICS_DIR"
+  rm -f "$METRICS_DIR"/metrics_*.json
+fi
+
 # Запуск Uvicorn
 uvicorn main:app --host 0.0.0.0 --port 8000
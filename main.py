@@ -1,30 +1,77 @@
+import asyncio
+
 from fastapi import FastAPI
 import uvicorn
 from fastapi.routing import APIRouter
 
 from starlette.staticfiles import StaticFiles
 
-from app.handlers import user_router, image_router, logger
+from app.middleware import ConsistencyTokenMiddleware, MetricsMiddleware, QueryStatsMiddleware, TracingMiddleware
+from app.memprofile import MemoryMiddleware
+from app.profiler import ProfilerMiddleware
+from app.handlers import user_router, image_router, internal_router, health_router, metrics_router, logger
+from app.loopmonitor import loop_monitor
+from app.memprofile import leak_reporter, memory_profiler
+from app.metrics import metrics_flusher, registry
+from config import MEDIA_ROOT, SERVE_MEDIA_STATIC, TWEET_PARTITIONING, MEMORY_LEAK_INTERVAL, UPLOAD_CLEANUP_INTERVAL
 
-from database.func import create_and_fill_tables, wait_for_db
+from database.db import engine
+from database.func import wait_for_db
+from database.migrations import ensure_schema
+from database.partitions import ensure_partitions, partition_maintenance
+from database.shards import shard_router
+from database.slowlog import watch_engines
+from database.uploads import upload_cleanup
 
 app = FastAPI(title="Twits")
+app.add_middleware(ConsistencyTokenMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MemoryMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(ProfilerMiddleware)
 
-# Настройка для раздачи статических файлов
-app.mount("/pictures", StaticFiles(directory="/api/pictures"), name="pictures")
+# Настройка для раздачи статических файлов (за nginx отключается, файлы отдает nginx)
+if SERVE_MEDIA_STATIC:
+    app.mount("/pictures", StaticFiles(directory=MEDIA_ROOT), name="pictures")
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Запуск приложения")
+    app.state.loop_monitor_task = asyncio.create_task(loop_monitor.run())
+    memory_profiler.start()
+    if memory_profiler.enabled and MEMORY_LEAK_INTERVAL:
+        app.state.leak_report_task = asyncio.create_task(leak_reporter(memory_profiler))
+    watch_engines()
     await wait_for_db()
-    await create_and_fill_tables()
-    logger.info("Приложение успешно запущено")
+    version = await ensure_schema(engine)
+    await shard_router.prepare()
+    if TWEET_PARTITIONING:
+        await ensure_partitions(engine)
+        # Ссылка на задачу хранится в app.state, иначе ее может собрать сборщик мусора
+        app.state.partition_task = asyncio.create_task(partition_maintenance(engine))
+    if UPLOAD_CLEANUP_INTERVAL:
+        app.state.upload_cleanup_task = asyncio.create_task(upload_cleanup(shard_router))
+    if registry.directory:
+        app.state.metrics_task = asyncio.create_task(metrics_flusher(registry))
+    logger.info(f"Приложение успешно запущено, версия схемы {version}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.loop_monitor_task.cancel()
+    # Последний снимок: счетчики завершившегося воркера остаются в /metrics
+    if registry.directory:
+        registry.write_snapshot()
 
 
 main_api_router = APIRouter()
 
 main_api_router.include_router(user_router)
 main_api_router.include_router(image_router)
+main_api_router.include_router(internal_router)
+main_api_router.include_router(health_router)
+main_api_router.include_router(metrics_router)
 
 app.include_router(main_api_router)
 
@@ -1,6 +1,18 @@
+import os
+import tempfile
+
+# Настройки тестового окружения задаются до импорта приложения
+os.environ.setdefault("URL", "sqlite+aiosqlite:///./test.db")
+os.environ.setdefault("MEDIA_ROOT", tempfile.mkdtemp(prefix="pictures-"))
+# Запрос, повторяющий одну форму SQL больше 5 раз (N+1 на тестовых данных), завершается ошибкой
+os.environ.setdefault("SQL_REPEAT_THRESHOLD", "5")
+os.environ.setdefault("SQL_REPEAT_RAISE", "1")
+os.environ.setdefault("ADMIN_TOKEN", "test-admin-token")
+
 import pytest_asyncio
 from httpx import AsyncClient
 
+from app.auth import auth_cache
 from tests.main import app
 from tests.funcs import fill_test_data
 from tests.initdb import create_db_and_tables, DATABASE_URL
@@ -10,6 +22,8 @@ from tests.initdb import create_db_and_tables, DATABASE_URL
 async def setup_database():
     await create_db_and_tables()
     fill_test_data(DATABASE_URL)
+    # Пользователи созданы заново: закэшированные ключи больше не актуальны
+    auth_cache.clear()
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -18,6 +32,10 @@ async def client():
         yield client
 
 
+# Заголовок служебных эндпоинтов /internal/*
+ADMIN_HEADERS = {"X-Admin-Token": os.environ["ADMIN_TOKEN"]}
+
+
 # Универсальная функция для проверки ответа
 def check_response(response, expected_status, expected_json):
     assert response.status_code == expected_status
@@ -4,19 +4,45 @@ from fastapi.routing import APIRouter
 
 from starlette.staticfiles import StaticFiles
 
-from tests.handlers import user_router, image_router
+from app.middleware import ConsistencyTokenMiddleware, MetricsMiddleware, QueryStatsMiddleware, TracingMiddleware
+from app.memprofile import MemoryMiddleware
+from app.profiler import ProfilerMiddleware
+from app.handlers import user_router, image_router, internal_router, health_router, metrics_router
+from config import MEDIA_ROOT, SERVE_MEDIA_STATIC
+from database.db import ReadRouter, get_db, get_read_router
+from database.shards import Shard, ShardRouter, get_shard_router
+from tests.initdb import get_db as get_test_db, engine as test_engine, async_session as test_session
 
 
 app = FastAPI(title="Twits")
-
-# Настройка для раздачи статических файлов
-app.mount("/pictures", StaticFiles(directory="/home/nikolasy/PycharmProjects/python_advanced_diploma/pictures"), name="pictures")
+app.add_middleware(ConsistencyTokenMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MemoryMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(ProfilerMiddleware)
+
+# Раздача каталога медиафайлов в обход проверки доступа, как в main.py, только по настройке
+if SERVE_MEDIA_STATIC:
+    app.mount("/pictures", StaticFiles(directory=MEDIA_ROOT), name="pictures")
+
+# Обработчики приложения работают с тестовой базой данных
+app.dependency_overrides[get_db] = get_test_db
+# Аутентификация и обработчики чтения читают тестовую базу
+test_read_router = ReadRouter(test_session, None)
+app.dependency_overrides[get_read_router] = lambda: test_read_router
+# Один шард - тестовая база данных
+test_shard_router = ShardRouter([Shard(0, test_engine, test_session)])
+app.dependency_overrides[get_shard_router] = lambda: test_shard_router
 
 
 main_api_router = APIRouter()
 
 main_api_router.include_router(user_router)
 main_api_router.include_router(image_router)
+main_api_router.include_router(internal_router)
+main_api_router.include_router(health_router)
+main_api_router.include_router(metrics_router)
 
 app.include_router(main_api_router)
 
@@ -1,8 +1,24 @@
 import pytest
 
 from fastapi import status
-
+from sqlalchemy import event, select
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.auth import auth_cache
+from database.db import (
+    ReadRouter,
+    create_engine_from_settings,
+    engine as app_engine,
+    get_read_router,
+    replica_engine,
+)
+from database.migrations import ensure_schema
+from database.models import Media
+from database.storage import media_storage
 from tests.conftest import check_response
+from tests.initdb import async_session, engine as test_engine
+from tests.main import app
 
 
 @pytest.mark.asyncio
@@ -22,6 +38,115 @@ async def test_upload_media(client, setup_database):
     )  # Замените ID медиа на фактический
 
 
+@pytest.mark.asyncio
+async def test_get_media(client, setup_database):
+    media_file = ("test_image.jpg", b"dummy data", "image/jpeg")
+    await client.post("/api/medias", headers={"api-key": "111"}, files={"file": media_file})
+
+    response = await client.get("/api/medias/4", headers={"api-key": "111"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b"dummy data"
+    assert response.headers["content-type"] == "image/jpeg"
+
+    # Неприкрепленный медиафайл недоступен другим пользователям
+    response = await client.get("/api/medias/4", headers={"api-key": "222"})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_get_media_range(client, setup_database):
+    media_file = ("clip.mp4", b"0123456789", "video/mp4")
+    await client.post("/api/medias", headers={"api-key": "111"}, files={"file": media_file})
+
+    response = await client.get("/api/medias/4", headers={"api-key": "111", "range": "bytes=2-5"})
+
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == b"2345"
+    assert response.headers["content-range"] == "bytes 2-5/10"
+    assert response.headers["content-type"] == "video/mp4"
+
+    # Суффиксный диапазон
+    response = await client.get("/api/medias/4", headers={"api-key": "111", "range": "bytes=-3"})
+    assert response.content == b"789"
+
+    # Диапазон за пределами файла
+    response = await client.get("/api/medias/4", headers={"api-key": "111", "range": "bytes=20-"})
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers["content-range"] == "bytes */10"
+
+
+@pytest.mark.asyncio
+async def test_get_media_accel_redirect(client, setup_database, monkeypatch):
+    monkeypatch.setattr("app.handlers.MEDIA_ACCEL_REDIRECT", True)
+    media_file = ("test_image.jpg", b"dummy data", "image/jpeg")
+    await client.post("/api/medias", headers={"api-key": "111"}, files={"file": media_file})
+
+    response = await client.get("/api/medias/4", headers={"api-key": "111"})
+
+    # Файл передает nginx, приложение возвращает только заголовок
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"].startswith("/protected/pictures/")
+    assert response.headers["x-accel-redirect"].endswith(".jpg")
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload(client, setup_database):
+    data = b"0123456789" * 3
+    headers = {"api-key": "111"}
+
+    response = await client.post(
+        "/api/medias/uploads", headers=headers, json={"filename": "video.mp4", "size": len(data)}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    upload_id = response.json()["upload_id"]
+
+    # Первая часть
+    response = await client.patch(
+        f"/api/medias/uploads/{upload_id}",
+        headers={**headers, "upload-offset": "0"},
+        content=data[:20],
+    )
+    check_response(
+        response,
+        status.HTTP_200_OK,
+        {"result": True, "upload_id": upload_id, "offset": 20, "size": len(data)},
+    )
+
+    # Повтор части с устаревшим смещением отклоняется
+    response = await client.patch(
+        f"/api/medias/uploads/{upload_id}",
+        headers={**headers, "upload-offset": "0"},
+        content=data[:20],
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    # Незавершенную загрузку нельзя финализировать
+    response = await client.post(f"/api/medias/uploads/{upload_id}/complete", headers=headers)
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    # Клиент узнает смещение и продолжает загрузку
+    response = await client.get(f"/api/medias/uploads/{upload_id}", headers=headers)
+    offset = response.json()["offset"]
+    response = await client.patch(
+        f"/api/medias/uploads/{upload_id}",
+        headers={**headers, "upload-offset": str(offset)},
+        content=data[offset:],
+    )
+    assert response.json()["offset"] == len(data)
+
+    response = await client.post(f"/api/medias/uploads/{upload_id}/complete", headers=headers)
+    check_response(response, status.HTTP_200_OK, {"result": True, "media_id": 4})
+
+    response = await client.get("/api/medias/4", headers=headers)
+    assert response.content == data
+
+    # Чужая сессия загрузки недоступна
+    response = await client.get(f"/api/medias/uploads/{upload_id}", headers={"api-key": "222"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 @pytest.mark.asyncio
 async def test_create_tweet(client, setup_database):
     tweet_request = {"tweet_data": "New tweet by User1"}
@@ -39,6 +164,35 @@ async def test_create_tweet(client, setup_database):
     )  # Замените ID твита на фактический
 
 
+@pytest.mark.asyncio
+async def test_create_tweet_with_foreign_media(client, setup_database):
+    media_file = ("test_image.jpg", b"dummy data", "image/jpeg")
+    await client.post("/api/medias", headers={"api-key": "111"}, files={"file": media_file})
+
+    # Чужую неприкрепленную загрузку нельзя прикрепить к своему твиту
+    response = await client.post(
+        "/api/tweets", headers={"api-key": "222"}, json={"tweet_data": "Stolen", "tweet_media_ids": [4]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    # Медиафайл остался закрытым, твит без вложения не сохранился
+    response = await client.get("/api/medias/4", headers={"api-key": "222"})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    response = await client.get("/api/tweets", headers={"api-key": "222"})
+    assert "Stolen" not in [tweet["content"] for tweet in response.json()["tweets"]]
+
+    response = await client.post(
+        "/api/tweets", headers={"api-key": "111"}, json={"tweet_data": "Mine", "tweet_media_ids": [4]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    # Уже прикрепленный медиафайл нельзя перенести в другой твит
+    response = await client.post(
+        "/api/tweets", headers={"api-key": "111"}, json={"tweet_data": "Again", "tweet_media_ids": [4]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 @pytest.mark.asyncio
 async def test_delete_tweet(client, setup_database):
     response = await client.delete("/api/tweets/4", headers={"api-key": "222"})
@@ -180,3 +334,88 @@ async def test_get_tweets(client, setup_database):
     }
 
     check_response(response, status.HTTP_200_OK, expected_tweets)
+
+
+class CheckoutCounter:
+    """
+    Считает соединения, выданные пулами основного, читающего и тестового движков.
+    """
+
+    def __init__(self):
+        self.count = 0
+        engines = [app_engine, test_engine, replica_engine]
+        self.pools = [engine.sync_engine.pool for engine in engines if engine is not None]
+
+    def _on_checkout(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        for pool in self.pools:
+            event.listen(pool, "checkout", self._on_checkout)
+        return self
+
+    def __exit__(self, *exc_info):
+        for pool in self.pools:
+            event.remove(pool, "checkout", self._on_checkout)
+
+
+@pytest.mark.asyncio
+async def test_rejected_requests_do_not_use_pool(client, setup_database):
+    with CheckoutCounter() as counter:
+        response = await client.get("/api/tweets")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert counter.count == 0
+
+        # Неизвестный ключ проверяется в базе один раз, затем отклоняется из кэша
+        response = await client.get("/api/tweets", headers={"api-key": "unknown"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert counter.count == 1
+
+        response = await client.get("/api/tweets", headers={"api-key": "unknown"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert counter.count == 1
+
+
+@pytest.mark.asyncio
+async def test_authentication_is_cached(client, setup_database):
+    await client.get("/api/users/me", headers={"api-key": "111"})
+    misses = auth_cache.misses
+
+    with CheckoutCounter() as counter:
+        response = await client.get("/api/users/me", headers={"api-key": "111"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert auth_cache.misses == misses
+    # Соединение нужно только для чтения профиля
+    assert counter.count == 1
+
+
+@pytest.mark.asyncio
+async def test_authentication_uses_overridden_read_router(client, setup_database, tmp_path):
+    # Пустая база: ключ, существующий в тестовой базе, здесь неизвестен
+    empty_engine = create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'empty.db'}")
+    await ensure_schema(empty_engine)
+    empty_router = ReadRouter(async_sessionmaker(empty_engine, class_=AsyncSession), None)
+
+    overridden = app.dependency_overrides[get_read_router]
+    app.dependency_overrides[get_read_router] = lambda: empty_router
+    try:
+        response = await client.get("/api/users/me", headers={"api-key": "111"})
+    finally:
+        app.dependency_overrides[get_read_router] = overridden
+        auth_cache.clear()
+        await empty_engine.dispose()
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_media_directory_is_not_served(client, setup_database):
+    media_file = ("test_image.jpg", b"dummy data", "image/jpeg")
+    await client.post("/api/medias", headers={"api-key": "111"}, files={"file": media_file})
+
+    # Файлы доступны только через /api/medias/{id} с проверкой доступа
+    async with async_session() as session:
+        media_path = (await session.execute(select(Media.media_path).where(Media.media_id == 4))).scalar_one()
+    response = await client.get(f"/pictures/{media_storage.relative_path(media_path)}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
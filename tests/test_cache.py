@@ -0,0 +1,204 @@
+import asyncio
+
+import pytest
+from sqlalchemy import update
+from yadisk.objects import AsyncPublicResourceObject, AsyncResourceObject
+
+from app import handlers
+from database.cache import AsyncTTLCache
+from database.models import Media
+from database.yadisc import YadiskDAL, public_meta_cache
+from tests.initdb import async_session
+
+
+class NotFound(Exception):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_repeated_lookups():
+    cache = AsyncTTLCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return "meta"
+
+    assert await cache.get_or_load("key", loader) == "meta"
+    assert await cache.get_or_load("key", loader) == "meta"
+
+    # Повторный запрос не вызывает загрузчик
+    assert len(calls) == 1
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_entry_expires():
+    cache = AsyncTTLCache(ttl=0.01)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return len(calls)
+
+    assert await cache.get_or_load("key", loader) == 1
+    await asyncio.sleep(0.02)
+    assert await cache.get_or_load("key", loader) == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_negative_entries():
+    cache = AsyncTTLCache(ttl=60, negative_ttl=60, negative_exceptions=(NotFound,))
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        raise NotFound("missing")
+
+    for _ in range(3):
+        with pytest.raises(NotFound):
+            await cache.get_or_load("key", loader)
+
+    # Ответ "не найдено" закэширован
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_does_not_store_transient_errors():
+    cache = AsyncTTLCache(ttl=60, negative_exceptions=(NotFound,))
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        raise RuntimeError("timeout")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("key", loader)
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_coalesces_concurrent_lookups():
+    cache = AsyncTTLCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "meta"
+
+    results = await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(10)))
+
+    assert results == ["meta"] * 10
+    assert len(calls) == 1
+    # Ожидание общей загрузки не считается попаданием в кэш
+    assert (cache.hits, cache.misses, cache.coalesced) == (0, 1, 9)
+
+
+@pytest.mark.asyncio
+async def test_cache_leader_cancellation_does_not_cancel_waiters():
+    cache = AsyncTTLCache(ttl=60)
+    started = asyncio.Event()
+
+    async def loader():
+        started.set()
+        await asyncio.sleep(0.01)
+        return "meta"
+
+    leader = asyncio.create_task(cache.get_or_load("key", loader))
+    await started.wait()
+    waiter = asyncio.create_task(cache.get_or_load("key", loader))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    # Загрузка продолжилась для остальных ожидающих и попала в кэш
+    assert await waiter == "meta"
+    assert cache.get("key") == "meta"
+
+
+@pytest.mark.asyncio
+async def test_cache_evicts_oldest_entries():
+    cache = AsyncTTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
+
+
+class FakeYadiskClient:
+    """
+    Клиент Яндекс.Диска в памяти: считает обращения к API метаданных.
+    """
+
+    def __init__(self):
+        self.meta_calls = []
+
+    async def upload(self, src, dst):
+        self.uploaded = dst
+
+    async def publish(self, path):
+        return AsyncResourceObject({"path": f"disk:{path}"})
+
+    async def get_meta(self, path, fields=None):
+        self.meta_calls.append(path)
+        return AsyncResourceObject(
+            {"path": path, "public_key": "key-1", "public_url": "https://yadi.sk/i/1"}
+        )
+
+    async def get_public_meta(self, url):
+        self.meta_calls.append(url)
+        return AsyncPublicResourceObject({"public_key": url, "public_url": "https://yadi.sk/i/1"})
+
+
+@pytest.mark.asyncio
+async def test_yadisk_public_meta_from_cache():
+    public_meta_cache.clear()
+    dal = YadiskDAL(token="token")
+    dal.async_client = FakeYadiskClient()
+
+    link, path, public_key = await dal.upload_to_yadisk(b"data", "1", "a.jpg")
+
+    assert (link, path, public_key) == ("https://yadi.sk/i/1", "disk:/1/a.jpg", "key-1")
+    # Метаданные загруженного файла доступны по публичному ключу и ссылке без вызовов API
+    assert (await dal.get_public_meta(public_key)).path == path
+    assert (await dal.get_public_meta(link)).path == path
+    assert dal.async_client.meta_calls == [path]
+
+    # После перезапуска процесса ключ из записи медиа загружается один раз
+    public_meta_cache.clear()
+    assert (await dal.get_public_meta("key-2")).public_url == "https://yadi.sk/i/1"
+    assert (await dal.get_public_meta("key-2")).public_url == "https://yadi.sk/i/1"
+    assert dal.async_client.meta_calls == [path, "key-2"]
+    public_meta_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_media_falls_back_to_yadisk(client, setup_database, monkeypatch):
+    public_meta_cache.clear()
+    fake_client = FakeYadiskClient()
+    monkeypatch.setattr(handlers.yadisk_dal, "async_client", fake_client)
+
+    media_file = ("test_image.jpg", b"dummy data", "image/jpeg")
+    await client.post("/api/medias", headers={"api-key": "111"}, files={"file": media_file})
+    # Локальной копии нет, файл сохранен на Яндекс.Диске
+    async with async_session() as session:
+        await session.execute(
+            update(Media).where(Media.media_id == 4).values(media_path="/missing/4.jpg", public_key="key-4")
+        )
+        await session.commit()
+
+    for _ in range(2):
+        response = await client.get("/api/medias/4", headers={"api-key": "111"})
+        assert response.status_code == 307
+        assert response.headers["location"] == "https://yadi.sk/i/1"
+    # Повторный запрос обслуживается из кэша метаданных
+    assert fake_client.meta_calls == ["key-4"]
+    public_meta_cache.clear()
@@ -1,9 +1,11 @@
 import pytest
+from fastapi import HTTPException
 from sqlalchemy import text, select
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from database.models import User, Tweet, Media, Like, Follower
 
 from database.func import UserDAL, TweetDAL, MediaDAL, LikeDAL, FollowerDAL
+from database.reads import ReadDAL
 
 from tests.funcs import (
     fill_test_data,
@@ -159,10 +161,12 @@ async def test_update_media_ids():
             media1 = Media(
                 media_url="http://example.com/media1.jpg",
                 media_path="path/to/media1.jpg",
+                user_id=1,
             )
             media2 = Media(
                 media_url="http://example.com/media2.jpg",
                 media_path="path/to/media2.jpg",
+                user_id=1,
             )
             session.add(media1)
             session.add(media2)
@@ -172,8 +176,13 @@ async def test_update_media_ids():
             media_ids = [media1.media_id, media2.media_id]
             tweet_id = 1
 
+            # Чужие медиафайлы не прикрепляются
+            with pytest.raises(HTTPException) as exc_info:
+                await media_dal.update_media_ids(tweet_id, media_ids, user_id=2)
+            assert exc_info.value.status_code == 400
+
             # Вызов тестируемого метода
-            await media_dal.update_media_ids(tweet_id, media_ids)
+            await media_dal.update_media_ids(tweet_id, media_ids, user_id=1)
 
             # Проверка обновления
             updated_media = await session.execute(
@@ -411,8 +420,8 @@ async def test_get_feed_tweets():
 
             # Проверка, что фид содержит твиты user2
             assert len(feed_tweets["tweets"]) == 2
-            assert feed_tweets["tweets"][0]["user_name"] == "User 2"
-            assert feed_tweets["tweets"][1]["user_name"] == "User 2"
+            assert feed_tweets["tweets"][0]["author"]["name"] == "User 2"
+            assert feed_tweets["tweets"][1]["author"]["name"] == "User 2"
 
         except Exception as e:
             await session.rollback()
@@ -424,6 +433,110 @@ async def test_get_feed_tweets():
             await session.commit()
 
 
+@pytest.mark.asyncio
+async def test_get_feed_tweets_window():
+    engine = create_async_engine(DATABASE_URL, future=True)
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with async_session() as session:
+        try:
+            tweet_dal = TweetDAL(session)
+
+            user = User(api_key="window_api_key", name="Window User")
+            session.add(user)
+            await session.commit()
+
+            tweets = [Tweet(user_id=user.user_id, content=f"Tweet {i}") for i in range(5)]
+            session.add_all(tweets)
+            await session.commit()
+
+            # В окно попадают только два последних твита
+            feed_tweets = await tweet_dal.get_feed_tweets(user.user_id, window=2)
+
+            assert [tweet["content"] for tweet in feed_tweets["tweets"]] == ["Tweet 3", "Tweet 4"]
+
+        finally:
+            await session.execute(text("DELETE FROM tweets"))
+            await session.execute(text("DELETE FROM users"))
+            await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_get_feed_tweets_multiple_attachments():
+    DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+    engine = create_async_engine(DATABASE_URL, future=True, echo=True)
+    async_session = async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=True,
+    )
+
+    async with async_session() as session:
+        try:
+            tweet_dal = TweetDAL(session)
+            media_dal = MediaDAL(session)
+
+            # Создание тестовых данных: твит с тремя вложениями и двумя лайками
+            user1 = User(api_key="user1_api_key", name="User 1")
+            user2 = User(api_key="user2_api_key", name="User 2")
+            session.add_all([user1, user2])
+            await session.commit()
+
+            tweet = Tweet(user_id=user1.user_id, content="Tweet with media")
+            session.add(tweet)
+            await session.commit()
+
+            media = [
+                Media(
+                    media_url=f"http://example.com/{i}.jpg",
+                    media_path=f"path/to/{i}.jpg",
+                    user_id=user1.user_id,
+                )
+                for i in range(3)
+            ]
+            session.add_all(media)
+            await session.commit()
+
+            # Порядок вложений задается порядком идентификаторов в запросе
+            media_ids = [media[2].media_id, media[0].media_id, media[1].media_id]
+            await media_dal.update_media_ids(tweet.tweet_id, media_ids, user1.user_id)
+
+            session.add_all(
+                [
+                    Like(user_id=user1.user_id, tweet_id=tweet.tweet_id),
+                    Like(user_id=user2.user_id, tweet_id=tweet.tweet_id),
+                ]
+            )
+            await session.commit()
+
+            feed_tweets = await tweet_dal.get_feed_tweets(user1.user_id)
+
+            # Одна строка на твит, лайки не умножаются на количество вложений
+            assert len(feed_tweets["tweets"]) == 1
+            assert feed_tweets["tweets"][0]["attachments"] == [
+                "http://example.com/2.jpg",
+                "http://example.com/0.jpg",
+                "http://example.com/1.jpg",
+            ]
+            assert feed_tweets["tweets"][0]["likes"] == [
+                {"user_id": user1.user_id, "name": "User 1"},
+                {"user_id": user2.user_id, "name": "User 2"},
+            ]
+
+            media_paths = await media_dal.get_media_urls_by_tweet_id(tweet.tweet_id)
+            assert media_paths == ["path/to/2.jpg", "path/to/0.jpg", "path/to/1.jpg"]
+
+        finally:
+            await session.rollback()
+            await session.execute(text("DELETE FROM likes"))
+            await session.execute(text("DELETE FROM media"))
+            await session.execute(text("DELETE FROM tweets"))
+            await session.execute(text("DELETE FROM users"))
+            await session.commit()
+
+
 @pytest.mark.asyncio
 async def test_create_like():
     DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -616,3 +729,45 @@ async def test_delete_follower():
             await session.execute(text("DELETE FROM followers"))
             await session.execute(text("DELETE FROM users"))
             await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_read_dal():
+    engine = create_async_engine(DATABASE_URL, future=True)
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    fill_test_data(DATABASE_URL)
+
+    async with async_session() as session:
+        try:
+            user = await UserDAL(session).get_user_by_api_key("111")
+
+            user_ids = dict((await session.execute(text("SELECT name, user_id FROM users"))).all())
+
+            # User3 подписан на User1, User1 - на User2
+            assert await ReadDAL(session).get_user_info(user.user_id) == {
+                "result": True,
+                "user": {
+                    "id": user_ids["User1"],
+                    "name": "User1",
+                    "followers": [{"id": user_ids["User3"], "name": "User3"}],
+                    "following": [{"id": user_ids["User2"], "name": "User2"}],
+                },
+            }
+            assert await ReadDAL(session).get_feed_tweets() == await TweetDAL(
+                session
+            ).get_feed_tweets(user.user_id)
+            assert await ReadDAL(session).get_feed_tweets(window=2) == await TweetDAL(
+                session
+            ).get_feed_tweets(user.user_id, window=2)
+
+            with pytest.raises(HTTPException) as exc_info:
+                await ReadDAL(session).get_user_info(100500)
+            assert exc_info.value.status_code == 404
+
+        finally:
+            await session.execute(text("DELETE FROM tweets"))
+            await session.execute(text("DELETE FROM users"))
+            await session.execute(text("DELETE FROM likes"))
+            await session.execute(text("DELETE FROM followers"))
+            await session.execute(text("DELETE FROM media"))
+            await session.commit()
@@ -0,0 +1,266 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import auth
+from database.db import (
+    InstrumentedAsyncQueuePool,
+    ReadRouter,
+    create_engine_from_settings,
+    get_read_db,
+    pool_status,
+    engine as app_engine,
+)
+from database.migrations import LATEST_VERSION, ensure_schema, get_schema_version
+from database.partitions import partition_name, partition_ranges, partition_start
+from tests.conftest import ADMIN_HEADERS
+
+
+@pytest.mark.asyncio
+async def test_engine_from_settings(tmp_path):
+    engine = create_engine_from_settings(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", pool_size=2, max_overflow=1
+    )
+
+    # Логирование SQL по умолчанию выключено
+    assert engine.echo is False
+    assert isinstance(engine.sync_engine.pool, InstrumentedAsyncQueuePool)
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        status = pool_status(engine)
+        assert status["checked_out"] == 1
+        assert status["size"] == 2
+        assert status["max_overflow"] == 1
+
+    status = pool_status(engine)
+    assert status["checked_out"] == 0
+    assert status["acquire_count"] == 1
+    assert status["acquire_time_max"] >= status["acquire_time_avg"] >= 0
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_pool_status(client):
+    response = await client.get("/internal/pool", headers=ADMIN_HEADERS)
+
+    assert response.status_code == 200
+    assert response.json()["pool"] == "InstrumentedAsyncQueuePool"
+
+
+@pytest.mark.asyncio
+async def test_internal_requires_admin_token(client, monkeypatch):
+    response = await client.get("/internal/pool")
+    assert response.status_code == 403
+    response = await client.get("/internal/pool", headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+
+    # Без ADMIN_TOKEN служебные эндпоинты выключены, проверка готовности доступна
+    monkeypatch.setattr(auth, "ADMIN_TOKEN", "")
+    response = await client.get("/internal/pool", headers=ADMIN_HEADERS)
+    assert response.status_code == 404
+    await ensure_schema(app_engine)
+    response = await client.get("/internal/ready")
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_read_router(tmp_path):
+    primary = async_sessionmaker(create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}"))
+    replica = async_sessionmaker(create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"))
+
+    # Без реплики все чтения идут на основную базу
+    assert await ReadRouter(primary, None).session_factory() is primary
+
+    router = ReadRouter(primary, replica, max_lag=5, lag_check_interval=1)
+    assert await router.session_factory() is replica
+    # Сразу после своей записи пользователь читает с основной базы
+    assert await router.session_factory(last_write=time.time()) is primary
+    assert await router.session_factory(last_write=time.time() - 60) is replica
+
+
+@pytest.mark.asyncio
+async def test_get_read_db_uses_given_router(tmp_path):
+    primary = async_sessionmaker(create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}"))
+    request = Request({"type": "http", "headers": []})
+
+    sessions = get_read_db(request, ReadRouter(primary, None))
+    session = await anext(sessions)
+    assert session.bind is primary.kw["bind"]
+    await sessions.aclose()
+
+
+@pytest.mark.asyncio
+async def test_read_router_unavailable_replica(tmp_path):
+    primary = async_sessionmaker(create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}"))
+    replica = async_sessionmaker(create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}"))
+
+    router = ReadRouter(primary, replica)
+    assert await router.replica_lag() is None
+    assert await router.session_factory() is primary
+
+
+@pytest.mark.asyncio
+async def test_write_sets_consistency_token(client, setup_database):
+    response = await client.post("/api/tweets", headers={"api-key": "111"}, json={"tweet_data": "New tweet"})
+    assert "last_write" in response.cookies
+
+    response = await client.get("/api/tweets", headers={"api-key": "111"})
+    assert "last_write" not in response.headers.get("set-cookie", "")
+
+
+@pytest.mark.asyncio
+async def test_ensure_schema_fresh_database(tmp_path):
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'fresh.db'}")
+
+    assert await get_schema_version(engine) == 0
+    assert await ensure_schema(engine) == LATEST_VERSION
+    # Повторный запуск только читает версию
+    assert await ensure_schema(engine) == LATEST_VERSION
+
+    async with engine.connect() as conn:
+        tables = (await conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))).scalars().all()
+    assert {"users", "tweets", "likes", "followers", "media", "upload_sessions"} <= set(tables)
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_ensure_schema_upgrades_old_media_table(tmp_path):
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+
+    # Таблица media в первоначальном виде, без новых столбцов
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE media (media_id INTEGER PRIMARY KEY, media_url VARCHAR NOT NULL UNIQUE, "
+                "media_path VARCHAR NOT NULL UNIQUE, tweet_id INTEGER)"
+            )
+        )
+        await conn.execute(text("CREATE INDEX ix_media_tweet_id ON media (tweet_id)"))
+        await conn.execute(text("INSERT INTO media (media_url, media_path) VALUES ('url', 'path')"))
+
+    assert await ensure_schema(engine) == LATEST_VERSION
+
+    async with engine.connect() as conn:
+        row = (await conn.execute(text("SELECT position, user_id, size_bytes FROM media"))).one()
+        indexes = (await conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))).scalars().all()
+    assert tuple(row) == (0, None, None)
+    assert "ix_media_user_id" in indexes
+    # Одностолбцовый индекс заменен составным
+    assert "ix_media_tweet_id_position_media_id" in indexes
+    assert "ix_media_tweet_id" not in indexes
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_ensure_schema_adds_upload_activity_time(tmp_path):
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'v4.db'}")
+
+    # Сессии загрузки в виде версии 4: только время создания
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE upload_sessions (upload_id VARCHAR PRIMARY KEY, user_id INTEGER NOT NULL, "
+                "filename VARCHAR NOT NULL, total_size BIGINT NOT NULL, \"offset\" BIGINT NOT NULL, "
+                "temp_path VARCHAR NOT NULL, created_at DATETIME)"
+            )
+        )
+        await conn.execute(text("CREATE INDEX ix_upload_sessions_created_at ON upload_sessions (created_at)"))
+        await conn.execute(
+            text(
+                "INSERT INTO upload_sessions VALUES "
+                "('u1', 1, 'video.mp4', 10, 0, 'tmp/u1', '2020-01-01 00:00:00.000000')"
+            )
+        )
+        await conn.execute(text("CREATE TABLE schema_version (version INTEGER NOT NULL)"))
+        await conn.execute(text("INSERT INTO schema_version (version) VALUES (4)"))
+
+    assert await ensure_schema(engine) == LATEST_VERSION
+
+    async with engine.connect() as conn:
+        updated_at = (await conn.execute(text("SELECT updated_at FROM upload_sessions"))).scalar()
+        indexes = (await conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))).scalars().all()
+    assert updated_at == "2020-01-01 00:00:00.000000"
+    assert "ix_upload_sessions_updated_at" in indexes
+    assert "ix_upload_sessions_created_at" not in indexes
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_readiness(client):
+    await ensure_schema(app_engine)
+
+    response = await client.get("/internal/ready")
+
+    assert response.status_code == 200
+    assert response.json() == {"result": True, "schema_version": LATEST_VERSION}
+
+
+def test_partition_ranges():
+    # Текущая секция и две секции вперед
+    assert partition_ranges(max_id=2500, ahead=2, size=1000) == [(2000, 3000), (3000, 4000), (4000, 5000)]
+    assert partition_ranges(max_id=0, ahead=0, size=1000) == [(0, 1000)]
+    assert partition_name("likes", 3000, size=1000) == "likes_p3"
+    assert partition_start("likes_p3", size=1000) == 3000
+
+
+@pytest.mark.asyncio
+async def test_sqlite_profile(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'profile.db'}"
+    writer = create_engine_from_settings(url)
+    reader = create_engine_from_settings(url, read_only=True)
+
+    async with writer.connect() as conn:
+        assert (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar() == "wal"
+        assert (await conn.exec_driver_sql("PRAGMA synchronous")).scalar() == 1
+        assert (await conn.exec_driver_sql("PRAGMA busy_timeout")).scalar() == 5000
+    assert writer.sync_engine.pool.size() == 1
+
+    async with reader.connect() as conn:
+        assert (await conn.exec_driver_sql("PRAGMA query_only")).scalar() == 1
+
+    await writer.dispose()
+    await reader.dispose()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_single_writer_and_parallel_reads(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'writers.db'}"
+    writer = create_engine_from_settings(url)
+    reader = create_engine_from_settings(url, read_only=True)
+
+    async with writer.begin() as conn:
+        await conn.execute(text("CREATE TABLE counters (id INTEGER PRIMARY KEY, value INTEGER)"))
+        await conn.execute(text("INSERT INTO counters (id, value) VALUES (1, 0)"))
+
+    async def increment():
+        async with writer.begin() as conn:
+            value = (await conn.execute(text("SELECT value FROM counters WHERE id = 1"))).scalar()
+            await asyncio.sleep(0)
+            await conn.execute(text("UPDATE counters SET value = :value WHERE id = 1"), {"value": value + 1})
+
+    # Записи выстраиваются в очередь к единственному соединению писателя: ни одна не теряется
+    await asyncio.gather(*(increment() for _ in range(20)))
+
+    async with writer.begin() as conn:
+        await conn.execute(text("UPDATE counters SET value = -1 WHERE id = 1"))
+        # Пока транзакция записи открыта, читатели видят последнее зафиксированное значение
+        async with reader.connect() as read_conn:
+            value = (await read_conn.execute(text("SELECT value FROM counters WHERE id = 1"))).scalar()
+        assert value == 20
+
+        with pytest.raises(DBAPIError):
+            async with reader.begin() as read_conn:
+                await read_conn.execute(text("DELETE FROM counters"))
+
+    await writer.dispose()
+    await reader.dispose()
@@ -0,0 +1,65 @@
+import argparse
+
+import pytest
+from sqlalchemy import text
+
+from database import generate as generate_module
+from database.db import create_engine_from_settings
+from database.generate import generate, pareto_alpha, run
+from database.migrations import ensure_schema
+
+TABLES = {
+    "users": "user_id, api_key, name",
+    "followers": "follower_id, followee_id",
+    "tweets": "tweet_id, user_id, content, timestamp",
+    "media": "media_id, tweet_id, user_id, position, media_path",
+    "likes": "tweet_id, user_id",
+}
+
+
+async def generated_rows(path, seed: int) -> dict[str, list]:
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{path}")
+    await ensure_schema(engine)
+    counts = await generate(engine, users=50, tweets=200, follows=5, likes=3, media=0.3, seed=seed, batch_size=64)
+    rows = {}
+    async with engine.connect() as conn:
+        for table, columns in TABLES.items():
+            rows[table] = (await conn.execute(text(f"SELECT {columns} FROM {table} ORDER BY {columns}"))).all()
+            assert counts[table] == len(rows[table])
+    await engine.dispose()
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_generate_is_deterministic(tmp_path):
+    first = await generated_rows(tmp_path / "first.db", seed=7)
+    second = await generated_rows(tmp_path / "second.db", seed=7)
+    other = await generated_rows(tmp_path / "other.db", seed=8)
+
+    assert first == second
+    assert first["likes"] != other["likes"]
+
+    assert len(first["users"]) == 50
+    assert len(first["tweets"]) == 200
+    assert first["users"][0][1:] == ("key-1", "User1")
+    assert all(follower_id != followee_id for follower_id, followee_id in first["followers"])
+    # Вложения принадлежат автору твита и пронумерованы с нуля
+    authors = {tweet_id: user_id for tweet_id, user_id, *_ in first["tweets"]}
+    assert all(authors[tweet_id] == user_id for _, tweet_id, user_id, *_ in first["media"])
+    assert {position for *_, position, _ in first["media"]} <= {0, 1, 2, 3}
+
+
+def test_pareto_alpha():
+    assert pareto_alpha("1.5") == 1.5
+    with pytest.raises(argparse.ArgumentTypeError):
+        pareto_alpha("1")
+
+
+@pytest.mark.asyncio
+async def test_generate_refuses_sharded_setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(generate_module, "SHARD_URLS", ["sqlite+aiosqlite:///shard1.db"])
+    args = argparse.Namespace(url=f"sqlite+aiosqlite:///{tmp_path / 'gen.db'}", reset=False)
+
+    assert await run(args) is False
+    # База не создавалась
+    assert not (tmp_path / "gen.db").exists()
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from database.loaders import DataLoader
+from database.reads import ReadDAL
+from tests.funcs import fill_test_data
+from tests.initdb import DATABASE_URL
+
+
+class Backend:
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    async def batch_load(self, keys):
+        self.calls.append(list(keys))
+        if self.fail:
+            raise RuntimeError("database is down")
+        return {key: f"user-{key}" for key in keys if key != 404}
+
+
+@pytest.mark.asyncio
+async def test_loads_in_one_tick_are_batched():
+    backend = Backend()
+    loader = DataLoader(backend.batch_load)
+
+    values = await asyncio.gather(loader.load(1), loader.load(2), loader.load(1), loader.load(404))
+
+    assert values == ["user-1", "user-2", "user-1", None]
+    assert backend.calls == [[1, 2, 404]]
+
+
+@pytest.mark.asyncio
+async def test_loaded_values_are_memoized():
+    backend = Backend()
+    loader = DataLoader(backend.batch_load)
+
+    await loader.load_many([1, 2])
+    result = await loader.load_many([2, 3])
+
+    assert result == {2: "user-2", 3: "user-3"}
+    assert backend.calls == [[1, 2], [3]]
+
+
+@pytest.mark.asyncio
+async def test_batch_size_limit():
+    backend = Backend()
+    loader = DataLoader(backend.batch_load, max_batch_size=2)
+
+    await loader.load_many([1, 2, 3])
+
+    assert backend.calls == [[1, 2], [3]]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_not_memoized():
+    backend = Backend(fail=True)
+    loader = DataLoader(backend.batch_load)
+
+    with pytest.raises(RuntimeError):
+        await loader.load(1)
+
+    backend.fail = False
+    assert await loader.load(1) == "user-1"
+
+
+@pytest.mark.asyncio
+async def test_read_dal_queries_users_once():
+    engine = create_async_engine(DATABASE_URL)
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    fill_test_data(DATABASE_URL)
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        async with async_session() as session:
+            read_dal = ReadDAL(session)
+            feed = await read_dal.get_feed_tweets()
+            profile = await read_dal.get_user_info(feed["tweets"][0]["author"]["id"])
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        await engine.dispose()
+
+    # Авторы, лайкнувшие, подписчики и подписки - один запрос к users на весь DAL
+    assert sum("FROM users" in statement for statement in statements) == 1
+    assert feed["tweets"][0]["likes"]
+    assert profile["user"]["followers"]
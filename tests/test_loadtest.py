@@ -0,0 +1,46 @@
+import httpx
+import pytest
+
+from benchmarks.loadtest import compare, parse_mix, run_load
+from tests.main import app
+
+
+def test_parse_mix():
+    assert parse_mix("feed=3, like=1") == {"feed": 3.0, "like": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+
+
+@pytest.mark.asyncio
+async def test_run_load(setup_database):
+    result = await run_load(
+        "http://test",
+        ["111", "222", "333"],
+        parse_mix("feed=2,me=1,user=1,like=1,follow=1,tweet=1"),
+        concurrency=2,
+        duration=0.3,
+        tweets=6,
+        transport=httpx.ASGITransport(app=app),
+    )
+
+    feed = result["endpoints"]["GET /api/tweets"]
+    assert feed["requests"] > 0
+    assert feed["errors"] == 0
+    assert feed["statuses"] == {"200": feed["requests"]}
+    assert 0 < feed["p50_ms"] <= feed["p95_ms"] <= feed["p99_ms"] <= feed["max_ms"]
+    assert result["total"]["requests"] == sum(stats["requests"] for stats in result["endpoints"].values())
+    assert result["meta"]["users"] == 3
+
+
+def test_compare():
+    def result(p95: float, rps: float, error_rate: float = 0.0) -> dict:
+        stats = {"p50_ms": 10.0, "p95_ms": p95, "p99_ms": 50.0, "rps": rps, "error_rate": error_rate}
+        return {"endpoints": {"GET /api/tweets": stats}}
+
+    rows, regressed = compare(result(p95=20, rps=100), result(p95=21, rps=98))
+    assert not regressed
+    assert rows[0]["p95_ms"]["change_pct"] == 5.0
+
+    rows, regressed = compare(result(p95=20, rps=100), result(p95=30, rps=80, error_rate=0.05))
+    assert regressed
+    assert rows[0]["regressions"] == ["p95_ms", "rps", "error_rate"]
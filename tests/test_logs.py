@@ -0,0 +1,59 @@
+import json
+
+from loguru import logger
+
+from app.logs import RouteSampler, parse_sample_rates, redact, request_scope, setup_logging
+
+
+def test_redact():
+    headers = {"host": "localhost", "api-key": "111", "Cookie": "a=b"}
+
+    assert redact({"headers": headers, "user_id": 1}) == {
+        "headers": {"host": "localhost", "api-key": "***", "Cookie": "***"},
+        "user_id": 1,
+    }
+    assert redact("headers: {'api-key': '111', 'host': 'x'}") == "headers: {'api-key': '***', 'host': 'x'}"
+    # Исходный словарь не меняется
+    assert headers["api-key"] == "111"
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("") == {}
+    assert parse_sample_rates("/api/tweets=0.1, /api/users/{id}=0.5") == {
+        "/api/tweets": 0.1,
+        "/api/users/{id}": 0.5,
+    }
+
+
+def test_logging_json_sampling_and_redaction(tmp_path):
+    log_file = tmp_path / "app.log"
+    setup_logging(
+        level="INFO",
+        log_file=str(log_file),
+        json_output=True,
+        sampler=RouteSampler(1.0, {"/api/tweets": 0.0}),
+    )
+    try:
+        logger.debug("Not written at INFO: {}", "value")
+        logger.info("Request headers", extra={"headers": {"api-key": "secret"}, "user_id": 1})
+
+        token = request_scope.set({"type": "http", "path": "/api/tweets"})
+        try:
+            logger.info("Sampled out")
+            logger.warning("Warnings are always written")
+        finally:
+            request_scope.reset(token)
+
+        logger.complete()
+    finally:
+        setup_logging()
+
+    records = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert [record["message"] for record in records] == [
+        "Request headers",
+        "Warnings are always written",
+    ]
+    assert records[0]["level"] == "INFO"
+    assert records[0]["headers"] == {"api-key": "***"}
+    assert records[0]["user_id"] == 1
+    assert "secret" not in log_file.read_text(encoding="utf-8")
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytest
+
+from app.loopmonitor import LoopMonitor
+from app.metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG
+
+
+def blocking_call():
+    time.sleep(0.2)
+
+
+@pytest.mark.asyncio
+async def test_loop_lag():
+    monitor = LoopMonitor(interval=0.01)
+    observed = EVENT_LOOP_LAG.values.get((), [0])[-1]
+    task = asyncio.create_task(monitor.run())
+    await asyncio.sleep(0.02)
+    # Пока цикл занят, задача мониторинга не может проснуться вовремя
+    blocking_call()
+    await asyncio.sleep(0.03)
+    task.cancel()
+
+    assert monitor.max_lag >= 0.1
+    assert EVENT_LOOP_LAG.values[()][-1] > observed
+    assert monitor.status()["blocked"] == []
+
+
+@pytest.mark.asyncio
+async def test_blocking_callback_stack():
+    monitor = LoopMonitor(interval=0.01, debug=True, block_threshold=0.05)
+    blocked = EVENT_LOOP_BLOCKED.values.get((), 0)
+    task = asyncio.create_task(monitor.run())
+    await asyncio.sleep(0.02)
+    blocking_call()
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    [entry] = monitor.status()["blocked"]
+    assert entry["duration_ms"] >= 100
+    # Стек снят во время блокировки и указывает на блокирующий вызов
+    assert "in blocking_call" in entry["stack"][-1]
+    assert "time.sleep(0.2)" in entry["stack"][-1]
+    assert EVENT_LOOP_BLOCKED.values[()] == blocked + 1
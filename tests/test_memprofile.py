@@ -0,0 +1,57 @@
+import tracemalloc
+
+import pytest
+
+from app.memprofile import MemoryProfiler, memory_profiler
+from tests.conftest import ADMIN_HEADERS
+
+retained = []
+
+
+@pytest.fixture
+def tracing(monkeypatch):
+    monkeypatch.setattr(memory_profiler, "enabled", True)
+    monkeypatch.setattr(memory_profiler, "routes", {})
+    tracemalloc.start()
+    yield memory_profiler
+    tracemalloc.stop()
+
+
+@pytest.mark.asyncio
+async def test_memory_per_route(client, setup_database, tracing):
+    for _ in range(2):
+        response = await client.get("/api/tweets", headers={"api-key": "111"})
+        assert response.status_code == 200
+
+    # Снимок памяти дорогой: без токена администратора он не снимается
+    response = await client.get("/internal/memory")
+    assert response.status_code == 403
+
+    response = await client.get("/internal/memory", headers=ADMIN_HEADERS)
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["enabled"] is True
+    stats = result["routes"]["GET /api/tweets"]
+    assert stats["requests"] == 2
+    assert stats["peak_bytes_max"] > 0
+    assert stats["peak_bytes_avg"] <= stats["peak_bytes_max"]
+    assert result["top_sites"]
+    assert {"size_bytes", "count", "traceback"} <= set(result["top_sites"][0])
+
+
+def test_leak_report():
+    profiler = MemoryProfiler(enabled=True, top=5)
+    tracemalloc.start()
+    try:
+        assert profiler.compare() is None
+        retained.append(bytearray(1024 * 1024))
+        report = profiler.compare()
+    finally:
+        tracemalloc.stop()
+        retained.clear()
+
+    assert report["growth_bytes"] >= 1024 * 1024
+    top = report["sites"][0]
+    assert top["size_diff_bytes"] >= 1024 * 1024
+    assert "test_memprofile.py" in top["location"]
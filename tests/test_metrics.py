@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from app.metrics import MetricsRegistry
+
+
+def _value(body: str, sample: str) -> float:
+    for line in body.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client, setup_database):
+    before = (await client.get("/metrics")).text
+    requests_sample = 'http_requests_total{method="GET",route="/api/tweets/{tweet_id}/likes",status="405"}'
+
+    media_file = ("test_image.jpg", b"dummy data", "image/jpeg")
+    await client.post("/api/medias", headers={"api-key": "111"}, files={"file": media_file})
+    await client.get("/api/tweets", headers={"api-key": "111"})
+    await client.get("/api/tweets", headers={"api-key": "unknown"})
+    await client.get("/api/tweets/1/likes", headers={"api-key": "111"})
+    await client.get("/no/such/route")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    # Маршрут - шаблон пути, а не конкретный URL
+    assert _value(body, requests_sample) - _value(before, requests_sample) == 1
+    assert _value(body, 'http_requests_total{method="GET",route="/api/tweets",status="200"}') >= 1
+    assert _value(body, 'http_requests_total{method="GET",route="/api/tweets",status="401"}') >= 1
+    assert _value(body, 'http_requests_total{method="GET",route="unmatched",status="404"}') >= 1
+    assert _value(body, 'http_request_duration_seconds_count{method="GET",route="/api/tweets"}') >= 2
+    assert _value(body, 'http_request_duration_seconds_bucket{method="GET",route="/api/tweets",le="+Inf"}') >= 2
+    # Запрос к /metrics еще выполняется
+    assert _value(body, 'http_requests_in_progress{method="GET"}') == 1
+
+    media_bytes = 'upload_bytes_total{kind="media"}'
+    assert _value(body, media_bytes) - _value(before, media_bytes) == len(b"dummy data")
+    assert _value(body, 'cache_requests_total{cache="auth",result="miss"}') >= 1
+    # Каждый именованный кэш процесса попадает в метрики
+    assert 'cache_requests_total{cache="yadisk_public_meta",result="hit"}' in body
+    assert 'cache_requests_total{cache="auth",result="coalesced"}' in body
+    assert 'db_pool_connections{pool="primary",state="checked_out"}' in body
+
+
+def test_metrics_across_processes(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    in_progress = registry.gauge("in_progress", "In progress.")
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    requests.inc("/a")
+    in_progress.inc()
+    latency.observe(value=0.05)
+    latency.observe(value=2)
+
+    # Снимок другого воркера, который уже завершился
+    other = {
+        "requests_total": [[["/a"], 2], [["/b"], 1]],
+        "in_progress": [[[], 5]],
+        "latency_seconds": [[[], [1, 0, 0, 0.01, 1]]],
+    }
+    (tmp_path / "metrics_999999999.json").write_text(json.dumps(other))
+
+    body = registry.render()
+    assert 'requests_total{route="/a"} 3' in body
+    assert 'requests_total{route="/b"} 1' in body
+    # Gauge завершившегося процесса не учитывается
+    assert "in_progress 1" in body
+    assert 'latency_seconds_bucket{le="0.1"} 2' in body
+    assert 'latency_seconds_bucket{le="1.0"} 2' in body
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in body
+    assert "latency_seconds_count 3" in body
+
+    registry.write_snapshot()
+    assert len(list(tmp_path.glob("metrics_*.json"))) == 2
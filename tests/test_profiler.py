@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from app.profiler import SamplingProfiler, profiler
+from tests.conftest import ADMIN_HEADERS
+
+
+def busy_function(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_collapsed_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_function, args=(stop,), name="busy")
+    worker.start()
+    sampler = SamplingProfiler(interval=0.001, thread_id=worker.ident)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop.set()
+    worker.join()
+
+    assert sampler.samples > 0
+    lines = sampler.collapsed().splitlines()
+    assert lines
+    # Строка: кадры от внешнего к внутреннему через ";", затем количество выборок
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("busy_function (tests/test_profiler.py:" in line for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_profile_request(client, setup_database, monkeypatch):
+    monkeypatch.setattr(profiler, "token", "secret")
+
+    # Без токена запрос обрабатывается как обычно
+    response = await client.get("/api/tweets", headers={"api-key": "111"})
+    assert response.status_code == 200
+    assert "x-profile-status" not in response.headers
+
+    response = await client.get("/api/tweets?profile=secret", headers={"api-key": "111"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.headers["x-profile-status"] == "200"
+    assert int(response.headers["x-profile-samples"]) >= 0
+
+    response = await client.get("/api/tweets", headers={"api-key": "111", "X-Profile": "wrong"})
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_profile_process(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "directory", str(tmp_path))
+    monkeypatch.setattr(profiler, "interval", 0.001)
+
+    # Без PROFILE_TOKEN профилирование процесса выключено
+    monkeypatch.setattr(profiler, "token", "")
+    response = await client.post("/internal/profile?seconds=0.05", headers={**ADMIN_HEADERS, "X-Profile": ""})
+    assert response.status_code == 404
+
+    monkeypatch.setattr(profiler, "token", "secret")
+    response = await client.post("/internal/profile?seconds=0.05", headers=ADMIN_HEADERS)
+    assert response.status_code == 403
+    response = await client.post("/internal/profile?seconds=0.05", headers={**ADMIN_HEADERS, "X-Profile": "wrong"})
+    assert response.status_code == 403
+
+    response = await client.post("/internal/profile?seconds=0.05", headers={**ADMIN_HEADERS, "X-Profile": "secret"})
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["samples"] > 0
+    assert result["path"].startswith(str(tmp_path))
+    with open(result["path"], encoding="utf-8") as f:
+        assert "MainThread;" in f.read()
+
+    response = await client.post("/internal/profile?seconds=100000", headers={**ADMIN_HEADERS, "X-Profile": "secret"})
+    assert response.status_code == 422
@@ -0,0 +1,156 @@
+import contextlib
+import random
+import re
+import sqlite3
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from database.func import UserDAL, TweetDAL, MediaDAL, LikeDAL, FollowerDAL
+from database.models import Base
+from database.reads import ReadDAL
+
+# Объем данных, при котором планировщик уже предпочитает индексы полному просмотру
+USERS = 200
+TWEETS = 5000
+LIKES_PER_TWEET = 4
+FOLLOWS_PER_USER = 10
+MEDIA_PER_TWEET = 2
+
+TABLES = {table.name for table in Base.metadata.sorted_tables}
+
+# "SCAN tweets" без "USING INDEX" означает полный просмотр таблицы
+FULL_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+def _seed(db_path: str):
+    rng = random.Random(34)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.executemany(
+        "INSERT INTO users (user_id, api_key, name) VALUES (?, ?, ?)",
+        [(user_id, f"key-{user_id}", f"User{user_id}") for user_id in range(1, USERS + 1)],
+    )
+    cursor.executemany(
+        "INSERT INTO tweets (tweet_id, user_id, content, timestamp) VALUES (?, ?, ?, datetime('now'))",
+        [(tweet_id, rng.randint(1, USERS), f"Tweet {tweet_id}") for tweet_id in range(1, TWEETS + 1)],
+    )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO likes (user_id, tweet_id) VALUES (?, ?)",
+        [
+            (rng.randint(1, USERS), tweet_id)
+            for tweet_id in range(1, TWEETS + 1)
+            for _ in range(LIKES_PER_TWEET)
+        ],
+    )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO followers (follower_id, followee_id) VALUES (?, ?)",
+        [
+            (user_id, rng.randint(1, USERS))
+            for user_id in range(1, USERS + 1)
+            for _ in range(FOLLOWS_PER_USER)
+        ],
+    )
+    cursor.executemany(
+        "INSERT INTO media (media_url, media_path, tweet_id, position) VALUES (?, ?, ?, ?)",
+        [
+            (f"/pictures/{tweet_id}-{position}", f"/tmp/{tweet_id}-{position}", tweet_id, position)
+            for tweet_id in range(1, TWEETS + 1)
+            for position in range(MEDIA_PER_TWEET)
+        ],
+    )
+    conn.commit()
+    # Статистика для планировщика, как на рабочей базе
+    cursor.execute("ANALYZE")
+    conn.close()
+
+
+@pytest_asyncio.fixture(scope="module")
+async def plan_engine(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("plans") / "plans.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    _seed(db_path)
+    yield engine
+    await engine.dispose()
+
+
+async def _capture_statements(engine, call) -> list[tuple[str, tuple]]:
+    """
+    Выполняет метод DAL и возвращает все выполненные им запросы с параметрами.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("INSERT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with async_session() as session:
+            await call(session)
+            await session.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+async def _full_scans(engine, statement: str, parameters) -> set[str]:
+    """
+    Возвращает таблицы, которые запрос просматривает целиком (по EXPLAIN QUERY PLAN).
+    """
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        details = [row[-1] for row in result]
+
+    scans = set()
+    for detail in details:
+        match = FULL_SCAN_RE.match(detail)
+        if match and match.group(1) in TABLES:
+            scans.add(match.group(1))
+    return scans
+
+
+async def _attach_media(session):
+    # Медиафайлы уже прикреплены к твитам, поэтому DAL отклоняет запрос (400), но UPDATE выполняется
+    with contextlib.suppress(HTTPException):
+        await MediaDAL(session).update_media_ids(42, [83, 84], 7)
+
+
+# (название, вызов DAL, таблицы, полный просмотр которых допустим)
+HOT_QUERIES = [
+    # Подписчики и подписки (USER_LINKS_QUERY) и имена пользователей (UserLoader)
+    ("user_info", lambda session: ReadDAL(session).get_user_info(7), set()),
+    ("user_by_api_key", lambda session: UserDAL(session).get_user_by_api_key("key-7"), set()),
+    ("tweet_by_id", lambda session: TweetDAL(session).get_tweet_by_id(42), set()),
+    # Лента по определению читает все твиты, лайки и медиа - только по индексам.
+    # Авторы и лайкнувшие на тестовых данных - почти все пользователи, и пакетный
+    # запрос UserLoader к users планировщик выполняет просмотром таблицы
+    ("feed", lambda session: ReadDAL(session).get_feed_tweets(window=0), {"tweets", "users"}),
+    # Окно ленты ограничивает tweets и likes диапазоном tweet_id
+    ("feed_window", lambda session: ReadDAL(session).get_feed_tweets(window=100), {"users"}),
+    ("media_by_id", lambda session: MediaDAL(session).get_media_by_id(42), set()),
+    ("media_by_tweet", lambda session: MediaDAL(session).get_media_urls_by_tweet_id(42), set()),
+    ("update_media_ids", _attach_media, set()),
+    ("delete_like", lambda session: LikeDAL(session).delete_like(7, 42), set()),
+    ("delete_follower", lambda session: FollowerDAL(session).delete_follower(7, 8), set()),
+]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "name, call, allowed_scans", HOT_QUERIES, ids=[query[0] for query in HOT_QUERIES]
+)
+async def test_hot_queries_use_indexes(plan_engine, name, call, allowed_scans):
+    statements = await _capture_statements(plan_engine, call)
+    assert statements, f"{name}: запросы не перехвачены"
+
+    for statement, parameters in statements:
+        scans = await _full_scans(plan_engine, statement, parameters) - allowed_scans
+        assert not scans, f"{name}: полный просмотр {sorted(scans)} в запросе\n{statement}"
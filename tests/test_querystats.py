@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database.querystats import QueryStats, RepeatedQueryError, current_stats, statement_shape
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header(client, setup_database):
+    response = await client.get("/api/tweets", headers={"api-key": "111"})
+
+    assert response.status_code == 200
+    db, total = response.headers["server-timing"].split(", ")
+    assert db.startswith("db;dur=")
+    # Аутентификация закэширована или нет, лента - это несколько запросов, а не по запросу на твит
+    queries = int(db.split('desc="')[1].split(" ")[0])
+    assert 1 <= queries <= 6
+    assert total.startswith("total;dur=")
+
+
+def test_statement_shape():
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?)") == statement_shape(
+        "SELECT *\n  FROM t WHERE id IN (?)"
+    ) == "SELECT * FROM t WHERE id IN (?)"
+    assert statement_shape("SELECT * FROM t WHERE id IN ($1, $2)") == "SELECT * FROM t WHERE id IN (?)"
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_detection(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stats.db'}")
+
+    stats = QueryStats(repeat_threshold=2, raise_on_repeat=False)
+    token = current_stats.set(stats)
+    try:
+        async with engine.connect() as conn:
+            # Запрос в цикле - типичный N+1
+            for i in range(4):
+                await conn.execute(text("SELECT :i"), {"i": i})
+            await conn.execute(text("SELECT 1, 2"))
+    finally:
+        current_stats.reset(token)
+
+    assert stats.count == 5
+    assert stats.duration > 0
+    assert stats.repeated == {"SELECT ?": 4}
+
+    token = current_stats.set(QueryStats(repeat_threshold=2, raise_on_repeat=True))
+    try:
+        async with engine.connect() as conn:
+            with pytest.raises(RepeatedQueryError):
+                for i in range(3):
+                    await conn.execute(text("SELECT :i"), {"i": i})
+    finally:
+        current_stats.reset(token)
+
+    await engine.dispose()
@@ -0,0 +1,111 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select
+
+from database.db import create_engine_from_settings
+from database.func import LikeDAL, MediaDAL, TweetDAL
+from database.migrations import ensure_schema
+from database.models import Like, Media, Tweet, User
+from database.reads import ReadDAL
+from database.shards import ShardRouter
+
+
+@pytest_asyncio.fixture
+async def shards(tmp_path):
+    # Три файла SQLite вместо трех серверов базы данных
+    router = ShardRouter.from_urls(
+        [f"sqlite+aiosqlite:///{tmp_path / f'shard{i}.db'}" for i in range(3)]
+    )
+    await ensure_schema(router.primary.engine)
+    await router.prepare()
+
+    async with router.primary.session() as session:
+        await session.execute(
+            insert(User),
+            [{"user_id": i, "api_key": f"key-{i}", "name": f"User{i}"} for i in range(1, 7)],
+        )
+        await session.commit()
+    await router.mirror_users()
+
+    yield router
+
+    for shard in router.shards:
+        await shard.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_prepare_mirrors_new_users(shards):
+    # Пользователь создан на шарде 0 в обход приложения
+    async with shards.primary.session() as session:
+        session.add(User(user_id=7, api_key="key-7", name="User7"))
+        await session.commit()
+
+    await shards.prepare()
+
+    for shard in shards.shards:
+        async with shard.session() as session:
+            user_ids = (await session.execute(select(User.user_id).order_by(User.user_id))).scalars().all()
+        assert user_ids == list(range(1, 8))
+
+
+@pytest.mark.asyncio
+async def test_routing(shards):
+    assert shards.count == 3
+    assert shards.shard_for_user(4).index == 1
+    assert shards.shard_for_id(9).index == 0
+
+    for shard in shards.shards:
+        async with shard.session() as session:
+            users = (await session.execute(select(User.user_id))).scalars().all()
+        assert sorted(users) == [1, 2, 3, 4, 5, 6]
+
+
+@pytest.mark.asyncio
+async def test_content_placed_on_author_shard(shards):
+    tweet_ids = {}
+    for user_id in range(1, 7):
+        shard = shards.shard_for_user(user_id)
+        async with shard.session() as session:
+            for n in range(2):
+                tweet_id = await TweetDAL(session).save_tweet_to_database(user_id, f"Tweet {n}")
+                # Идентификатор твита указывает на шард, где он хранится
+                assert shards.shard_for_id(tweet_id) is shard
+                tweet_ids[tweet_id] = user_id
+
+            media = await MediaDAL(session).create_media_record(
+                f"/{user_id}.jpg", f"/{user_id}.jpg", user_id=user_id
+            )
+            assert shards.shard_for_id(media.media_id) is shard
+            # Вложение прикрепляется ко второму твиту автора
+            await MediaDAL(session).update_media_ids(tweet_id, [media.media_id], user_id)
+
+    assert len(tweet_ids) == 12
+
+    # Лайк хранится вместе с твитом, кто бы его ни поставил
+    tweet_id = max(tweet_id for tweet_id, author in tweet_ids.items() if author == 2)
+    async with shards.shard_for_id(tweet_id).session() as session:
+        await LikeDAL(session).create_like(1, tweet_id)
+        await LikeDAL(session).create_like(3, tweet_id)
+
+    for shard in shards.shards:
+        async with shard.session() as session:
+            authors = (await session.execute(select(Tweet.user_id))).scalars().all()
+            likes = (await session.execute(select(Like.tweet_id))).scalars().all()
+            media = (await session.execute(select(Media.media_id))).scalars().all()
+        assert {author % 3 for author in authors} == {shard.index}
+        assert all(media_id % 3 == shard.index for media_id in media)
+        assert likes == ([tweet_id, tweet_id] if shard is shards.shard_for_id(tweet_id) else [])
+
+    # Лента собирается со всех шардов и объединяется в общем порядке
+    parts = await shards.scatter(lambda session: ReadDAL(session).get_feed_rows())
+    assert [len(part) for part in parts] == [4, 4, 4]
+
+    feed = sorted(
+        (tweet for part in parts for tweet in part),
+        key=lambda tweet: (-tweet.likes_count, tweet.id),
+    )
+    assert feed[0].id == tweet_id
+    assert [like.name for like in feed[0].likes] == ["User1", "User3"]
+    assert feed[0].attachments == ["/2.jpg"]
+    assert [tweet.id for tweet in feed[1:]] == sorted(set(tweet_ids) - {tweet_id})
+    assert all(tweet.author.id == tweet_ids[tweet.id] for tweet in feed)
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from database.db import create_engine_from_settings
+from database.slowlog import SlowQueryLog
+from tests.conftest import ADMIN_HEADERS
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log(tmp_path):
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}")
+    # Порог ниже длительности любого запроса: в журнал попадает все
+    log = SlowQueryLog(threshold_ms=0.000001, size=3)
+    log.watch(engine)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        await conn.execute(text("CREATE INDEX ix_items_name ON items (name)"))
+        await conn.execute(text("INSERT INTO items (name) VALUES (:name)"), {"name": "first"})
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT id FROM items WHERE name = :name"), {"name": "first"})
+        # План снимается на движке чтения, пока единственное соединение писателя занято
+        await asyncio.wait_for(log.wait_for_explains(), timeout=5)
+
+    # Кольцевой буфер хранит последние записи
+    entries = log.recent()
+    assert len(entries) == 3
+    select_entry = next(entry for entry in entries if entry["statement"].startswith("SELECT id"))
+    assert select_entry["parameters"] == ["first"]
+    assert select_entry["duration_ms"] >= 0
+    assert "ix_items_name" in select_entry["plan"]
+
+    await log.close()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log_hides_api_keys(tmp_path):
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}")
+    log = SlowQueryLog(threshold_ms=0.000001, explain=False)
+    log.watch(engine)
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT :api_key AS api_key"), {"api_key": "secret"})
+
+    [entry] = [entry for entry in log.recent() if "api_key" in entry["statement"]]
+    assert entry["parameters"] == "***"
+    assert entry["plan"] is None
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_slow_query_log_failed_statement(tmp_path):
+    engine = create_engine_from_settings(f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}")
+    log = SlowQueryLog(threshold_ms=0.000001, explain=False)
+    log.watch(engine)
+
+    async with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(DBAPIError):
+                await conn.execute(text("SELECT * FROM missing_table"))
+        # Время начала невыполненных выражений не накапливается в соединении
+        raw = await conn.get_raw_connection()
+        assert not raw.info.get("slow_query_started")
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_slow_queries(client):
+    # Параметры запросов видны только администратору
+    response = await client.get("/internal/slow-queries")
+    assert response.status_code == 403
+
+    response = await client.get("/internal/slow-queries", headers=ADMIN_HEADERS)
+
+    assert response.status_code == 200
+    assert response.json()["result"] is True
+    assert isinstance(response.json()["queries"], list)
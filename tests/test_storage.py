@@ -0,0 +1,142 @@
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, text, update
+
+from database.func import UploadDAL
+from database.migrate_media import migrate_all_shards, migrate_media
+from database.migrations import ensure_schema
+from database.models import Media, UploadSession, User
+from database.shards import ShardRouter
+from database.storage import LocalStorage
+from database.uploads import cleanup_stale_uploads
+from tests.initdb import async_session
+
+
+def test_shard_path():
+    path = LocalStorage.shard_path("picture.jpg")
+    first, second, filename = path.split("/")
+
+    # Два уровня каталогов по два символа хэша
+    assert len(first) == 2 and len(second) == 2
+    assert filename == "picture.jpg"
+    assert LocalStorage.shard_path("picture.jpg") == path
+
+
+def test_relative_path(tmp_path):
+    storage = LocalStorage(
+        root=str(tmp_path), base_url="http://test/pictures/", api_url="http://test/api/medias/"
+    )
+
+    assert storage.relative_path(str(tmp_path / "ab" / "cd" / "1.jpg")) == "ab/cd/1.jpg"
+    assert storage.relative_path("/etc/passwd") is None
+    assert storage.url_for("ab/cd/1.jpg") == "http://test/pictures/ab/cd/1.jpg"
+    assert storage.media_url(7) == "http://test/api/medias/7"
+
+
+@pytest.mark.asyncio
+async def test_probe(tmp_path):
+    file_path = tmp_path / "picture.jpg"
+    file_path.write_bytes(b"dummy data")
+
+    info = await LocalStorage.probe(str(file_path), "application/octet-stream")
+
+    # Тип определяется по расширению, длительность только у видео и аудио
+    assert info == {"content_type": "image/jpeg", "size_bytes": 10, "duration": None}
+
+
+@pytest.mark.asyncio
+async def test_migrate_media(tmp_path, setup_database):
+    storage = LocalStorage(
+        root=str(tmp_path), base_url="http://test/pictures", api_url="http://test/api/medias"
+    )
+    flat_path = tmp_path / "flat.jpg"
+    flat_path.write_bytes(b"dummy data")
+
+    async with async_session() as session:
+        session.add(Media(media_url="http://test/pictures/flat.jpg", media_path=str(flat_path)))
+        await session.commit()
+
+    assert await migrate_media(storage, dry_run=True, session_factory=async_session) == 1
+    assert await migrate_media(storage, session_factory=async_session) == 1
+    # Повторный запуск ничего не переносит
+    assert await migrate_media(storage, session_factory=async_session) == 0
+
+    async with async_session() as session:
+        media = (
+            await session.execute(select(Media).where(Media.media_url.like("http://test/%")))
+        ).scalar_one()
+        relative_path = storage.shard_path("flat.jpg")
+        assert media.media_path == storage.absolute_path(relative_path)
+        # Ссылка ведет на эндпоинт с проверкой доступа, а не на файл
+        assert media.media_url == f"http://test/api/medias/{media.media_id}"
+        assert not flat_path.exists()
+        assert os.path.exists(media.media_path)
+
+        await session.execute(text("DELETE FROM media"))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_cleanup_stale_uploads(tmp_path):
+    router = ShardRouter.from_urls([f"sqlite+aiosqlite:///{tmp_path / 'uploads.db'}"])
+    await ensure_schema(router.primary.engine)
+    storage = LocalStorage(root=str(tmp_path))
+
+    async with router.primary.session() as session:
+        session.add(User(user_id=1, api_key="key-1", name="User1"))
+        await session.commit()
+        upload_dal = UploadDAL(session)
+        temp_paths = {}
+        for upload_id in ("stale", "active"):
+            temp_paths[upload_id] = await storage.create_upload_file(upload_id, 10)
+            await upload_dal.create_upload(upload_id, 1, "video.mp4", 10, temp_paths[upload_id])
+        await session.execute(
+            update(UploadSession)
+            .where(UploadSession.upload_id == "stale")
+            .values(updated_at=datetime(2020, 1, 1))
+        )
+        # Давно созданная, но недавно получившая часть загрузка не считается брошенной
+        await session.execute(
+            update(UploadSession)
+            .where(UploadSession.upload_id == "active")
+            .values(created_at=datetime(2020, 1, 1))
+        )
+        await session.commit()
+        assert await upload_dal.advance_offset("active", 0, 5)
+
+    assert await cleanup_stale_uploads(router, storage, max_age=3600) == 1
+
+    # Брошенная загрузка удалена вместе с временным файлом, активная осталась
+    assert not os.path.exists(temp_paths["stale"])
+    assert os.path.exists(temp_paths["active"])
+    async with router.primary.session() as session:
+        upload_ids = (await session.execute(select(UploadSession.upload_id))).scalars().all()
+    assert upload_ids == ["active"]
+
+    await router.primary.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_migrate_media_all_shards(tmp_path):
+    router = ShardRouter.from_urls(
+        [f"sqlite+aiosqlite:///{tmp_path / f'media{i}.db'}" for i in range(2)]
+    )
+    await ensure_schema(router.primary.engine)
+    await router.prepare()
+    storage = LocalStorage(root=str(tmp_path), api_url="http://test/api/medias")
+
+    # По одному файлу в плоском каталоге на каждом шарде
+    for shard in router.shards:
+        flat_path = tmp_path / f"flat{shard.index}.jpg"
+        flat_path.write_bytes(b"dummy data")
+        async with shard.session() as session:
+            session.add(Media(media_url=f"/flat{shard.index}.jpg", media_path=str(flat_path)))
+            await session.commit()
+
+    assert await migrate_all_shards(router, storage) == 2
+    assert await migrate_all_shards(router, storage) == 0
+
+    for shard in router.shards:
+        await shard.engine.dispose()
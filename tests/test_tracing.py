@@ -0,0 +1,62 @@
+import json
+from uuid import uuid4
+
+import pytest
+
+from database.tracing import JsonFileExporter, tracer, trace_id_from_request_id
+
+
+def test_trace_id_from_request_id():
+    request_id = uuid4()
+    assert trace_id_from_request_id(str(request_id)) == request_id.hex
+    assert trace_id_from_request_id("not-a-trace-id") is None
+    assert trace_id_from_request_id(None) is None
+
+
+@pytest.mark.asyncio
+async def test_request_trace(client, setup_database, tmp_path, monkeypatch):
+    exporter = JsonFileExporter(str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+
+    trace_id = uuid4()
+    request_id = str(trace_id)
+    response = await client.get("/api/tweets", headers={"api-key": "111", "X-Request-ID": request_id})
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == request_id
+    exporter.flush()
+
+    [line] = (tmp_path / "traces.jsonl").read_text(encoding="utf-8").splitlines()
+    spans = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_id = {span["spanId"]: span for span in spans}
+    names = [span["name"] for span in spans]
+
+    assert {span["traceId"] for span in spans} == {trace_id.hex}
+    root = next(span for span in spans if "parentSpanId" not in span)
+    assert root["name"] == "GET /api/tweets"
+    assert root["kind"] == 2
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in root["attributes"]
+
+    assert "handler get_tweets" in names
+    assert "auth.load_user" in names
+    assert "ReadDAL.get_feed_rows" in names
+
+    # SQL-спаны вложены в спан метода DAL, который их выполнил
+    feed_span = next(span for span in spans if span["name"] == "ReadDAL.get_feed_rows")
+    sql_spans = [span for span in spans if span["name"] == "SQL"]
+    assert any(span["parentSpanId"] == feed_span["spanId"] for span in sql_spans)
+    assert all(span["parentSpanId"] in by_id for span in spans if span is not root)
+
+
+@pytest.mark.asyncio
+async def test_unsampled_request(client, setup_database, tmp_path, monkeypatch):
+    exporter = JsonFileExporter(str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+
+    response = await client.get("/api/tweets", headers={"api-key": "111"})
+
+    assert response.status_code == 200
+    # Идентификатор запроса выдается и без трассировки
+    assert len(response.headers["x-request-id"]) == 32
+    assert not (tmp_path / "traces.jsonl").exists()